@@ -0,0 +1,7 @@
+from core.asgi import create_asgi_app
+
+app = create_asgi_app()
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host='0.0.0.0', port=8000)
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""
+Benchmark: Flask dev server (run.py) vs ASGI mode (asgi.py) under the same load
+
+Mode wsgi-pool serves every route through the Flask app in the thread pool of ASGI mode,
+so asgi vs wsgi-pool is the gain of the async read views alone.
+
+Both servers get the same seeded SQLite database with caches disabled, so every request reads the db.
+Slow clients open a connection, send half of the request and keep it open, export clients download
+GET /api/actors/export reading 1 KB per 100 ms, fast clients meanwhile send GET /api/actor and
+GET /api/actors requests in a loop.
+
+Clients use httpx, install it with: pip install -r benchmarks/requirements.txt
+Run from project root: PYTHONPATH=. python benchmarks/asgi_bench.py [--rows N] [--clients N] [--slow N] [--exports N] [--duration S]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+SERVERS = {
+    'wsgi': "from core import create_app; create_app().run(host='127.0.0.1', port={port}, threaded=True)",
+    'wsgi-pool': (
+        "import uvicorn; from a2wsgi import WSGIMiddleware; from core import create_app; "
+        "from settings.constants import ASGI_WSGI_WORKERS; "
+        "uvicorn.run(WSGIMiddleware(create_app(), workers=ASGI_WSGI_WORKERS), host='127.0.0.1', port={port}, log_level='warning')"
+    ),
+    'asgi': "import uvicorn; from asgi import app; uvicorn.run(app, host='127.0.0.1', port={port}, log_level='warning')",
+}
+
+
+def seed(db_url, rows):
+    """
+    Create database with rows actors (in a subprocess, settings are read from environment at import)
+    """
+    code = (
+        "from core import create_app; from models.actor import Actor; app = create_app(); ctx = app.app_context(); ctx.push(); "
+        f"Actor.bulk_create([dict(name=f'Actor {{i}}', gender='female', date_of_birth=None) for i in range({rows})])"
+    )
+    subprocess.run([sys.executable, '-c', code], env=dict(os.environ, DB_URL=db_url), check=True, stderr=subprocess.DEVNULL)
+
+
+def start_server(mode, db_url, port):
+    """
+    Start server and wait until it answers
+    """
+    env = dict(os.environ, DB_URL=db_url, RECORD_CACHE_SIZE='0', RESPONSE_CACHE_SIZE='0')
+    process = subprocess.Popen(
+        [sys.executable, '-c', SERVERS[mode].format(port=port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    for _ in range(100):
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/api/actor', params=dict(id=1), timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+
+    process.kill()
+    raise RuntimeError(f'{mode} server did not start')
+
+
+def server_stats(pid):
+    """
+    Get thread count and resident memory of server process
+    """
+    stats = {}
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            key, _, value = line.partition(':')
+            if key in ('Threads', 'VmRSS'):
+                stats[key] = value.strip()
+    return stats
+
+
+async def slow_client(port, opened, stop):
+    """
+    Send half of a request and keep connection open
+    """
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'GET /api/actors HTTP/1.1\r\nHost: 127.0.0.1\r\n')
+        await writer.drain()
+        opened.append(writer)
+        await stop.wait()
+        writer.close()
+    except OSError:
+        pass
+
+
+async def export_client(port, opened, stop):
+    """
+    Download export slowly, the server has to wait until the client reads the response
+    """
+    try:
+        # small receive buffer, so the server can't push the whole export into kernel buffers
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ('127.0.0.1', port))
+        reader, writer = await asyncio.open_connection(sock=sock, limit=1024)
+        writer.write(b'GET /api/actors/export HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n')
+        await writer.drain()
+        opened.append(writer)
+        while not stop.is_set() and await reader.read(1024):
+            await asyncio.sleep(0.1)
+        writer.close()
+    except OSError:
+        pass
+
+
+async def fast_client(client, port, rows, stop, latencies, errors):
+    """
+    Send requests in a loop until stopped
+    """
+    while not stop.is_set():
+        if random.random() < 0.5:
+            url, params = f'http://127.0.0.1:{port}/api/actor', dict(id=random.randint(1, rows))
+        else:
+            url, params = f'http://127.0.0.1:{port}/api/actors', dict(limit=20, after=random.randint(0, rows))
+
+        start = time.perf_counter()
+        try:
+            response = await client.get(url, params=params)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+                continue
+        except httpx.HTTPError as error:
+            errors.append(type(error).__name__)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_load(pid, port, rows, clients, slow, exports, duration):
+    """
+    Run slow, export and fast clients against server
+
+    return: tuple (held slow connections, latencies, errors, server stats under load)
+    """
+    stop = asyncio.Event()
+    opened = []
+    slow_tasks = [asyncio.create_task(slow_client(port, opened, stop)) for _ in range(slow)]
+    slow_tasks += [asyncio.create_task(export_client(port, opened, stop)) for _ in range(exports)]
+    await asyncio.sleep(1)
+
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(limits=limits, timeout=10) as client:
+        fast_tasks = [
+            asyncio.create_task(fast_client(client, port, rows, stop, latencies, errors)) for _ in range(clients)
+        ]
+        await asyncio.sleep(duration)
+        stats = server_stats(pid)
+        stop.set()
+        await asyncio.gather(*fast_tasks)
+
+    await asyncio.gather(*slow_tasks)
+    return len(opened), latencies, errors, stats
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else float('nan')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--clients', type=int, default=100)
+    parser.add_argument('--slow', type=int, default=1000)
+    parser.add_argument('--exports', type=int, default=0)
+    parser.add_argument('--duration', type=float, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_url = f'sqlite:///{directory}/bench.db'
+        seed(db_url, args.rows)
+
+        for port, mode in enumerate(SERVERS, start=8100):
+            process = start_server(mode, db_url, port)
+            try:
+                opened, latencies, errors, stats = asyncio.run(
+                    run_load(process.pid, port, args.rows, args.clients, args.slow, args.exports, args.duration)
+                )
+            finally:
+                process.terminate()
+                process.wait()
+
+            print(f'{mode}: {len(latencies) / args.duration:,.0f} req/s, '
+                  f'p50 {percentile(latencies, 0.5) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms, '
+                  f'errors {len(errors)}, slow clients held {opened}/{args.slow + args.exports}, '
+                  f'server threads {stats.get("Threads")}, rss {stats.get("VmRSS")}')
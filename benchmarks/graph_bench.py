@@ -0,0 +1,69 @@
+"""
+Microbenchmark: co-star graph load, shortest path latency and recommendations on a random catalog
+
+Run from project root: DB_URL=sqlite:// PYTHONPATH=. python benchmarks/graph_bench.py [edges]
+"""
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault('DB_URL', 'sqlite://')
+
+from core.graph import CollaborationGraph
+from core.recommend import Recommender
+
+
+def make_edges(count, seed=0):
+    """
+    Get random distinct (actor id, movie id) pairs, about 4 movies per actor and 13 actors per movie
+    """
+    rnd = random.Random(seed)
+    actors, movies = count // 4, count // 13
+    edges = set()
+    while len(edges) < count:
+        edges.add((rnd.randrange(actors), rnd.randrange(movies)))
+    return sorted(edges), actors
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)]
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    edges, actors = make_edges(count)
+
+    # db returns both orders from association indexes, so sorting is not timed
+    reverse_edges = sorted((movie, actor) for actor, movie in edges)
+
+    graph = CollaborationGraph()
+    start = time.perf_counter()
+    graph.load(edges, reverse_edges)
+    load_time = time.perf_counter() - start
+
+    rnd = random.Random(1)
+    timings = []
+    for _ in range(200):
+        source, target = rnd.randrange(actors), rnd.randrange(actors)
+        start = time.perf_counter()
+        graph.shortest_path(source, target)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    recommender = Recommender(graph)
+    start = time.perf_counter()
+    recommender.build()
+    build_time = time.perf_counter() - start
+
+    # one new relation, affected rows are recomputed on next lookup
+    start = time.perf_counter()
+    recommender.mark(graph.add_edges([(0, 0)]))
+    recommender.top('actors', 0)
+    refresh_time = (time.perf_counter() - start) * 1000
+
+    print(f'edges: {count}')
+    print(f'load: {load_time:.2f} s')
+    print(f'shortest path: p50 {percentile(timings, 0.5):.2f} ms, p95 {percentile(timings, 0.95):.2f} ms')
+
+    print(f'recommendations: build {build_time:.2f} s, refresh after one write {refresh_time:.2f} ms')
@@ -0,0 +1,373 @@
+"""
+Load test: concurrent mixed read/write workload against every /api route on a seeded catalog
+
+Seeds the database with seed_catalog.py (skipped if it already has actors), starts the server
+(run.py-style Flask or asgi.py), then clients send requests picked by weight from OPERATIONS
+for --duration seconds after --warmup seconds. Writes only delete and clear records created
+by the run, so the seeded catalog stays comparable between runs.
+
+Reports requests/sec, p50 and p99 latency per operation and in total, saves them as a JSON
+baseline (--output) and compares them with an earlier baseline (--compare, exit code 1 on
+regression beyond --tolerance).
+
+Clients use httpx, install it with: pip install -r benchmarks/requirements.txt
+Run from project root: PYTHONPATH=. python benchmarks/load_bench.py [--db-url URL]
+    [--actors N] [--movies N] [--cast-rows N] [--server wsgi|asgi] [--clients N] [--duration S]
+    [--write-share F] [--exclude NAME,...] [--output FILE] [--compare FILE] [--tolerance F] [--min-requests N]
+Without --db-url a temporary SQLite database is seeded, pass postgresql://... for local Postgres.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy.engine import make_url
+
+SERVERS = {
+    'wsgi': "from core import create_app; create_app().run(host='127.0.0.1', port={port}, threaded=True)",
+    'asgi': "import uvicorn; from asgi import app; uvicorn.run(app, host='127.0.0.1', port={port}, log_level='warning')",
+}
+
+GENRES = ['drama', 'comedy', 'horror', 'thriller', 'action', 'romance', 'documentary', 'animation', 'sci-fi', 'western']
+PREFIXES = ['a', 'bo', 'car', 'el', 'fe', 'gr', 'hu', 'in', 'jo', 'ki', 'sil', 'red', 'go', 'riv', 'win', 'sha']
+
+
+class Catalog(object):
+    """
+    Catalog sizes and records created by the run (shared by clients of one event loop)
+    """
+    def __init__(self, actors, movies):
+        self.actors = actors
+        self.movies = movies
+        self.cast_rows = 0
+        self.created = dict(actors=[], movies=[])
+        self.counter = 0
+
+    def actor(self, rng):
+        return rng.randint(1, self.actors)
+
+    def movie(self, rng):
+        return rng.randint(1, self.movies)
+
+    def name(self, prefix):
+        # unique within run and between runs on the same database
+        self.counter += 1
+        return f'{prefix} {os.getpid()}-{time.monotonic_ns() % 10 ** 9}-{self.counter}'
+
+
+def actor_record(catalog, rng):
+    return dict(name=catalog.name('Load actor'), gender=rng.choice(['female', 'male']), date_of_birth=f'{rng.randint(1, 28):02d}.{rng.randint(1, 12):02d}.{rng.randint(1920, 2005)}')
+
+
+def movie_record(catalog, rng):
+    return dict(name=catalog.name('Load movie'), genre=rng.choice(GENRES), year=str(rng.randint(1920, 2025)))
+
+
+def created(kind):
+    """
+    Get request builder taking away a record created by the run (skipped if there is none yet)
+    """
+    def build(catalog, rng):
+        records = catalog.created[kind]
+        return dict(data=dict(id=records.pop(rng.randrange(len(records))))) if records else None
+    return build
+
+
+# name -> (kind, weight, method, route, build request(catalog, rng) -> dict of httpx arguments or None to skip,
+#          track created ids of 'actors'/'movies' from response)
+OPERATIONS = {
+    # reads
+    'list_actors': ('read', 10, 'GET', '/api/actors', lambda c, r: dict(params=dict(limit=50, after=c.actor(r))), None),
+    'list_movies': ('read', 10, 'GET', '/api/movies', lambda c, r: dict(params=dict(limit=50, genre=r.choice(GENRES), sort='-year')), None),
+    'get_actor': ('read', 20, 'GET', '/api/actor', lambda c, r: dict(params=dict(id=c.actor(r))), None),
+    'get_movie': ('read', 15, 'GET', '/api/movie', lambda c, r: dict(params=dict(id=c.movie(r))), None),
+    'actor_filmography': ('read', 8, 'GET', '/api/actor-filmography', lambda c, r: dict(params=dict(id=c.actor(r), limit=50)), None),
+    'movie_cast': ('read', 8, 'GET', '/api/movie-cast', lambda c, r: dict(params=dict(id=c.movie(r), limit=50)), None),
+    'search': ('read', 10, 'GET', '/api/search', lambda c, r: dict(params=dict(q=r.choice(PREFIXES))), None),
+    'actor_path': ('read', 3, 'GET', '/api/actor-path', lambda c, r: {'params': {'from': c.actor(r), 'to': c.actor(r)}}, None),
+    'actor_costars': ('read', 4, 'GET', '/api/actor-costars', lambda c, r: dict(params=dict(id=c.actor(r))), None),
+    'similar_movies': ('read', 4, 'GET', '/api/similar-movies', lambda c, r: dict(params=dict(id=c.movie(r))), None),
+    'actor_collaborators': ('read', 4, 'GET', '/api/actor-collaborators', lambda c, r: dict(params=dict(id=c.actor(r))), None),
+    'stats': ('read', 3, 'GET', '/api/stats', lambda c, r: dict(), None),
+    # full table streams, rare
+    'export_actors': ('read', 0.05, 'GET', '/api/actors/export', lambda c, r: dict(params=dict(format='ndjson')), None),
+    'export_movies': ('read', 0.05, 'GET', '/api/movies/export', lambda c, r: dict(params=dict(format='ndjson')), None),
+    # writes
+    'create_actor': ('write', 10, 'POST', '/api/actor', lambda c, r: dict(data=actor_record(c, r)), 'actors'),
+    'create_movie': ('write', 5, 'POST', '/api/movie', lambda c, r: dict(data=movie_record(c, r)), 'movies'),
+    'bulk_actors': ('write', 2, 'POST', '/api/actors/bulk', lambda c, r: dict(json=[actor_record(c, r) for _ in range(20)]), 'actors'),
+    'bulk_movies': ('write', 1, 'POST', '/api/movies/bulk', lambda c, r: dict(json=[movie_record(c, r) for _ in range(20)]), 'movies'),
+    'update_actor': ('write', 5, 'PUT', '/api/actor', lambda c, r: dict(data=dict(id=c.actor(r), gender=r.choice(['female', 'male']))), None),
+    'update_movie': ('write', 3, 'PUT', '/api/movie', lambda c, r: dict(data=dict(id=c.movie(r), year=str(r.randint(1920, 2025)))), None),
+    'add_actor_relations': ('write', 5, 'PUT', '/api/actor-relations', lambda c, r: dict(data=dict(id=c.actor(r), relation_id=c.movie(r))), None),
+    'add_movie_relations': ('write', 3, 'PUT', '/api/movie-relations', lambda c, r: dict(data=dict(id=c.movie(r), relation_id=','.join(str(c.actor(r)) for _ in range(3)))), None),
+    'delete_actor': ('write', 3, 'DELETE', '/api/actor', created('actors'), None),
+    'delete_movie': ('write', 2, 'DELETE', '/api/movie', created('movies'), None),
+    'clear_actor_relations': ('write', 1, 'DELETE', '/api/actor-relations', created('actors'), None),
+    'clear_movie_relations': ('write', 1, 'DELETE', '/api/movie-relations', created('movies'), None),
+}
+
+
+def seed(db_url, args):
+    """
+    Seed catalog in a subprocess (settings are read from environment at import)
+    """
+    subprocess.run(
+        [sys.executable, os.path.join(os.path.dirname(__file__), 'seed_catalog.py'), '--db-url', db_url,
+         '--actors', str(args.actors), '--movies', str(args.movies), '--cast-rows', str(args.cast_rows), '--seed', str(args.seed)],
+        check=True,
+    )
+
+
+def start_server(mode, db_url, port, timeout):
+    """
+    Start server and wait until it answers (startup builds indexes and graph of the whole catalog)
+    """
+    process = subprocess.Popen(
+        [sys.executable, '-c', SERVERS[mode].format(port=port)],
+        env=dict(os.environ, DB_URL=db_url), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{mode} server exited with code {process.returncode}')
+        try:
+            return process, httpx.get(f'http://127.0.0.1:{port}/api/stats', timeout=5).json()
+        except httpx.HTTPError:
+            time.sleep(0.5)
+
+    process.kill()
+    raise RuntimeError(f'{mode} server did not start in {timeout} s')
+
+
+async def client_loop(client, base, catalog, names, weights, rng, stop, recording, results):
+    """
+    Send requests picked by weight until stopped
+    """
+    while not stop.is_set():
+        name = rng.choices(names, weights)[0]
+        kind, _, method, route, build, track = OPERATIONS[name]
+        request = build(catalog, rng)
+        if request is None:
+            continue
+
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, base + route, **request)
+            await response.aread()
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, 0
+        elapsed = time.perf_counter() - start
+
+        if track and response is not None and status == 200:
+            body = response.json()
+            catalog.created[track].extend(body['ids'] if 'ids' in body else [body['id']])
+
+        if recording.is_set():
+            latencies, errors = results[name]
+            latencies.append(elapsed)
+            if status == 0 or status >= 400:
+                errors.append(status)
+
+
+async def run_load(port, catalog, args, weights):
+    """
+    Run clients for warmup + duration seconds
+
+    return: dict operation -> (latencies, error statuses)
+    """
+    names = list(weights)
+    results = {name: ([], []) for name in names}
+    stop, recording = asyncio.Event(), asyncio.Event()
+    base = f'http://127.0.0.1:{port}'
+
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        tasks = [
+            asyncio.create_task(client_loop(
+                client, base, catalog, names, [weights[name] for name in names],
+                random.Random(args.seed * 1000 + number), stop, recording, results,
+            ))
+            for number in range(args.clients)
+        ]
+        await asyncio.sleep(args.warmup)
+        recording.set()
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    return results
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] if values else None
+
+
+def summarize(latencies, errors, duration):
+    p50, p99 = percentile(latencies, 0.5), percentile(latencies, 0.99)
+    return dict(
+        requests=len(latencies),
+        errors=len(errors),
+        rps=round(len(latencies) / duration, 2),
+        p50_ms=round(p50 * 1000, 3) if p50 is not None else None,
+        p99_ms=round(p99 * 1000, 3) if p99 is not None else None,
+    )
+
+
+def operation_weights(args):
+    """
+    Get weights of operations, reads and writes scaled to --write-share of requests
+    """
+    excluded = set(filter(None, args.exclude.split(',')))
+    unknown = excluded - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f'Unknown operations: {", ".join(sorted(unknown))}')
+
+    operations = {name: operation for name, operation in OPERATIONS.items() if name not in excluded}
+    totals = {kind: sum(weight for k, weight, *_ in operations.values() if k == kind) for kind in ('read', 'write')}
+    shares = dict(read=1 - args.write_share, write=args.write_share)
+
+    return {
+        name: shares[kind] * weight / totals[kind]
+        for name, (kind, weight, *_) in operations.items() if totals[kind] and shares[kind] > 0
+    }
+
+
+def compare(report, baseline, tolerance, min_requests):
+    """
+    Print changes against baseline
+
+    return: list of regressed operations (p99 up or requests/sec down by more than tolerance),
+    operations with fewer than min_requests requests in either run are too noisy to compare
+    """
+    regressions = []
+    print(f'\ncompared with baseline from {baseline["meta"]["created"]} (tolerance {tolerance:.0%}):')
+
+    for key in ('server', 'database', 'clients', 'write_share', 'cpus'):
+        if report['meta'][key] != baseline['meta'].get(key):
+            print(f'  warning: {key} differs ({baseline["meta"].get(key)} in baseline, {report["meta"][key]} now)')
+
+    # catalog grows a bit with every run on the same database
+    for key, size in report['meta']['catalog'].items():
+        base_size = baseline['meta']['catalog'].get(key)
+        if key != 'seed' and base_size and abs(size / base_size - 1) > 0.1:
+            print(f'  warning: catalog {key} differs by more than 10% ({base_size:,} in baseline, {size:,} now)')
+
+    rows = dict(report['operations'], total=report['total'])
+    base_rows = dict(baseline['operations'], total=baseline['total'])
+
+    for name, row in rows.items():
+        base = base_rows.get(name)
+        if not base or min(base['requests'], row['requests']) < min_requests:
+            continue
+
+        rps_change = row['rps'] / base['rps'] - 1
+        p99_change = row['p99_ms'] / base['p99_ms'] - 1 if base['p99_ms'] else 0
+        regressed = rps_change < -tolerance or p99_change > tolerance
+        if regressed:
+            regressions.append(name)
+
+        print(f'  {name:<22} rps {rps_change:+7.1%}  p99 {p99_change:+7.1%}{"  REGRESSION" if regressed else ""}')
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db-url')
+    parser.add_argument('--actors', type=int, default=100000)
+    parser.add_argument('--movies', type=int, default=20000)
+    parser.add_argument('--cast-rows', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--server', choices=list(SERVERS), default='wsgi')
+    parser.add_argument('--port', type=int, default=8300)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--startup-timeout', type=float, default=1800)
+    parser.add_argument('--write-share', type=float, default=0.1)
+    parser.add_argument('--exclude', default='', help='comma-separated operations to skip, e.g. export_actors,export_movies')
+    parser.add_argument('--output', help='save report as JSON baseline')
+    parser.add_argument('--compare', help='JSON baseline to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--min-requests', type=int, default=20)
+    args = parser.parse_args()
+
+    weights = operation_weights(args)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_url = args.db_url or f'sqlite:///{directory}/load.db'
+        seed(db_url, args)
+
+        start = time.monotonic()
+        process, stats = start_server(args.server, db_url, args.port, args.startup_timeout)
+        startup = time.monotonic() - start
+        catalog = Catalog(stats['actors']['total'], stats['movies']['total'])
+        catalog.cast_rows = sum(int(size) * count for size, count in stats['movies']['cast_size'].items())
+        print(f'{args.server} server started in {startup:.1f} s: '
+              f'{catalog.actors:,} actors, {catalog.movies:,} movies, {catalog.cast_rows:,} cast rows')
+
+        try:
+            results = asyncio.run(run_load(args.port, catalog, args, weights))
+        finally:
+            process.terminate()
+            process.wait()
+
+    report = dict(
+        meta=dict(
+            created=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            server=args.server,
+            database=make_url(db_url).get_backend_name(),
+            catalog=dict(actors=catalog.actors, movies=catalog.movies, cast_rows=catalog.cast_rows, seed=args.seed),
+            clients=args.clients,
+            duration=args.duration,
+            write_share=args.write_share,
+            startup_seconds=round(startup, 1),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            cpus=os.cpu_count(),
+        ),
+        total=summarize(
+            [latency for latencies, _ in results.values() for latency in latencies],
+            [error for _, errors in results.values() for error in errors],
+            args.duration,
+        ),
+        operations={
+            name: dict(method=OPERATIONS[name][2], route=OPERATIONS[name][3], **summarize(latencies, errors, args.duration))
+            for name, (latencies, errors) in results.items()
+        },
+    )
+
+    print(f'\n{"operation":<22} {"requests":>9} {"errors":>7} {"req/s":>9} {"p50 ms":>9} {"p99 ms":>9}')
+    for name, row in dict(report['operations'], total=report['total']).items():
+        p50 = f'{row["p50_ms"]:.1f}' if row['p50_ms'] is not None else '-'
+        p99 = f'{row["p99_ms"]:.1f}' if row['p99_ms'] is not None else '-'
+        print(f'{name:<22} {row["requests"]:>9,} {row["errors"]:>7,} {row["rps"]:>9,.1f} {p50:>9} {p99:>9}')
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2)
+        print(f'\nsaved baseline to {args.output}')
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(report, json.load(baseline), args.tolerance, args.min_requests)
+        if regressions:
+            print(f'\nregressions: {", ".join(regressions)}')
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: overhead of request metrics (METRICS_ENABLED) on the cheapest routes
+
+Measures the metrics hooks alone in a request context, then sends requests with the Flask test
+client (no network) with hooks registered and removed, in many interleaved short runs, so noise
+of the machine affects both the same way. GET /api/actor is served from the record cache,
+so the relative overhead is the worst case.
+
+Run from project root: PYTHONPATH=. python benchmarks/metrics_bench.py [--requests N] [--rounds N]
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+
+from sqlalchemy import exc as sa_exc
+warnings.filterwarnings('ignore', category=sa_exc.SAWarning)
+
+directory = tempfile.TemporaryDirectory()
+os.environ['DB_URL'] = f'sqlite:///{directory.name}/bench.db'
+os.environ['METRICS_ENABLED'] = 'true'
+
+from flask import Response
+
+from core import create_app
+from core.metrics import abort_request, finish_request, start_request
+from models.actor import Actor
+
+URLS = ['/api/actor?id=1', '/api/actors?limit=10']
+
+
+def hooks_cost(app, count):
+    """
+    Get seconds per request spent in metrics hooks
+    """
+    response = Response()
+    with app.test_request_context(URLS[0]):
+        start = time.perf_counter()
+        for _ in range(count):
+            start_request()
+            finish_request(response)
+        return (time.perf_counter() - start) / count
+
+
+def set_hooks(app, enabled):
+    """
+    Register or remove metrics hooks of app
+    """
+    hooks = ((app.before_request_funcs, start_request), (app.after_request_funcs, finish_request), (app.teardown_request_funcs, abort_request))
+    for funcs, hook in hooks:
+        funcs[None] = [func for func in funcs.get(None, []) if func is not hook]
+        if enabled:
+            funcs[None].insert(0, hook)
+
+
+def run(client, url, requests):
+    start = time.perf_counter()
+    for _ in range(requests):
+        client.get(url)
+    return requests / (time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=40)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        Actor.create(name='Metrics actor', gender='female', date_of_birth=None)
+
+    print(f'metrics hooks: {hooks_cost(app, 100000) * 1e6:.2f} us/request')
+
+    client = app.test_client()
+    for url in URLS:
+        rates = {False: [], True: []}
+        client.get(url)
+
+        for _ in range(args.rounds):
+            for enabled in (False, True):
+                set_hooks(app, enabled)
+                rates[enabled].append(run(client, url, args.requests))
+
+        # medians of interleaved runs
+        disabled, enabled = (sorted(rates[key])[len(rates[key]) // 2] for key in (False, True))
+        overhead = (1 / enabled - 1 / disabled) * 1e6
+        print(f'{url}: disabled {disabled:,.0f} req/s, enabled {enabled:,.0f} req/s, '
+              f'overhead {overhead:.1f} us/request ({(disabled / enabled - 1) * 100:.1f}%)')
+
+    set_hooks(app, True)
@@ -0,0 +1,78 @@
+"""
+Microbenchmark: __dict__ filtering + jsonify vs compiled serializers
+
+Run from project root: DB_URL=sqlite:// PYTHONPATH=. python benchmarks/serializers_bench.py [rows]
+"""
+import os
+import sys
+import time
+import warnings
+from datetime import date
+
+from sqlalchemy import exc as sa_exc
+warnings.filterwarnings('ignore', category=sa_exc.SAWarning)
+
+os.environ.setdefault('DB_URL', 'sqlite://')
+
+from flask import Flask, jsonify
+
+from core import db
+from models.actor import Actor
+from settings.constants import ACTOR_FIELDS
+from controllers.serializers import actor_serializer, dumps
+
+
+def make_actors(count):
+    """
+    Create transient actors (no database needed)
+    """
+    return [
+        Actor(id=i, name=f'Actor {i}', gender='female' if i % 2 else 'male', date_of_birth=date(1970 + i % 50, 1 + i % 12, 1 + i % 28))
+        for i in range(count)
+    ]
+
+
+def before(actors):
+    """
+    Serialization as controllers did it before (dict comprehension + jsonify)
+    """
+    data = [{k: v for k, v in actor.__dict__.items() if k in ACTOR_FIELDS} for actor in actors]
+    return jsonify(data).get_data()
+
+
+def after(actors):
+    """
+    Serialization with compiled serializer + fast encoder
+    """
+    return dumps(actor_serializer.dump_many(actors))
+
+
+def measure(func, actors, repeat=5):
+    """
+    Get best rows/sec of several runs
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(actors)
+        best = min(best, time.perf_counter() - start)
+    return len(actors) / best
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ['DB_URL']
+    db.init_app(app)
+
+    with app.app_context():
+        actors = make_actors(rows)
+
+        before_rate = measure(before, actors)
+        after_rate = measure(after, actors)
+
+        print(f'rows: {rows}')
+        print(f'before (__dict__ + jsonify): {before_rate:,.0f} rows/sec')
+        print(f'after (serializer + dumps):  {after_rate:,.0f} rows/sec')
+        print(f'speedup: {after_rate / before_rate:.1f}x')
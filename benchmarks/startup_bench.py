@@ -0,0 +1,93 @@
+"""
+Benchmark: cold start of a worker, from process start to first answered request
+
+Compares the previous startup (create_all on every start, search indexes, graph and recommendations
+loaded before serving) with fingerprint-checked schema and indexes, graph and recommendations
+loaded in background after startup.
+The catalog is seeded once with seed_catalog.py, every start is a new process.
+
+Clients use httpx, install it with: pip install -r benchmarks/requirements.txt
+Run from project root: PYTHONPATH=. python benchmarks/startup_bench.py [--actors N] [--movies N] [--cast-rows N] [--runs N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine, text
+
+PORT = 8400
+SERVER = f"from core import create_app; create_app().run(host='127.0.0.1', port={PORT}, threaded=True)"
+
+MODES = {
+    # fingerprint row is deleted before every start, so create_all runs like before
+    'before': dict(RECOMMEND_WARMUP='startup', INDEXES_WARMUP='startup'),
+    'after': dict(RECOMMEND_WARMUP='background', INDEXES_WARMUP='background'),
+}
+
+
+def cold_start(db_url, env):
+    """
+    Start server and wait for first answers
+
+    return: tuple (seconds to first /api/actor answer, seconds to first /api/similar-movies answer, startup timings)
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-c', SERVER], env=dict(os.environ, DB_URL=db_url, **env),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        first = None
+        while first is None:
+            if process.poll() is not None:
+                raise RuntimeError('server exited')
+            try:
+                httpx.get(f'http://127.0.0.1:{PORT}/api/actor', params=dict(id=1), timeout=60)
+                first = time.perf_counter() - start
+            except httpx.TransportError:
+                time.sleep(0.01)
+
+        httpx.get(f'http://127.0.0.1:{PORT}/api/similar-movies', params=dict(id=1), timeout=600)
+        recommendations = time.perf_counter() - start
+        timings = httpx.get(f'http://127.0.0.1:{PORT}/internal/startup').json()
+        return first, recommendations, timings
+
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--actors', type=int, default=100000)
+    parser.add_argument('--movies', type=int, default=20000)
+    parser.add_argument('--cast-rows', type=int, default=1000000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_url = f'sqlite:///{directory}/startup.db'
+        subprocess.run(
+            [sys.executable, os.path.join(os.path.dirname(__file__), 'seed_catalog.py'), '--db-url', db_url,
+             '--actors', str(args.actors), '--movies', str(args.movies), '--cast-rows', str(args.cast_rows)],
+            check=True, stdout=subprocess.DEVNULL,
+        )
+        engine = create_engine(db_url)
+
+        for mode, env in MODES.items():
+            results = []
+            for _ in range(args.runs):
+                if mode == 'before':
+                    with engine.begin() as connection:
+                        connection.execute(text('DELETE FROM schema_info'))
+                results.append(cold_start(db_url, env))
+
+            first = sorted(result[0] for result in results)[len(results) // 2]
+            recommendations = sorted(result[1] for result in results)[len(results) // 2]
+            print(f'{mode}: first request after {first:.2f} s, first recommendations after {recommendations:.2f} s (medians)')
+            print(f'  startup steps of last run: {results[-1][2]}')
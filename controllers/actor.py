@@ -1,34 +1,72 @@
-from flask import jsonify, make_response
-
-from datetime import datetime as dt
-from ast import literal_eval
+from flask import jsonify, make_response, request
 
+from core.routing import reads_replica
 from models.actor import Actor  
 from models.movie import Movie
-from settings.constants import ACTOR_FIELDS, DATE_FORMAT
-from .parse_request import get_request_data
+from settings.constants import ACTOR_FILTER_FIELDS, ACTOR_RANGE_FIELDS, ACTOR_SORT_FIELDS
+from .parse_request import get_request_data, get_page_params, get_request_records, get_ids, parse_int
+from .export import stream_records, EXPORT_FORMATS
+from .importer import import_upload
+from .reads import list_records, get_record, respond
+from .serializers import actor_serializer, movie_serializer, json_response, add_related
+from .schemas import actor_schema
 
 
 def get_all_actors():
     """
-    Get list of all records
-    """  
+    Get page of filtered and sorted records (keyset pagination)
+    """
     try:
-        all_actors = Actor.query.all()
-        actors = []
-
-        for actor in all_actors:
-            act = {k: v for k, v in actor.__dict__.items() if k in ACTOR_FIELDS}
-            actors.append(act)
-
-        return make_response(jsonify(actors), 200) 
+        query_fields = (ACTOR_FILTER_FIELDS, ACTOR_RANGE_FIELDS, ACTOR_SORT_FIELDS)
+        return respond(list_records(
+            Actor, actor_serializer, 'actors', query_fields, 'filmography', movie_serializer,
+            get_request_data(), request.headers.get('If-None-Match'), reads_replica(),
+        ))
     
     except Exception as error:
         return make_response(jsonify(error=str(error)), 400)
 
   
+def export_actors():
+    """
+    Stream all records as NDJSON or JSON array
+    """
+    try:
+        data = get_request_data()
+
+        # validate data ---------------------------------------------------------------------
+        fmt = data.get('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            error = f"Format must be one of: {', '.join(EXPORT_FORMATS)}."
+            return make_response(jsonify(error=error), 400)
+        # ------------------------------------------------------------------------------------
+
+        return stream_records(Actor, actor_serializer, fmt)
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 400)
+
+
+def import_actors():
+    """
+    Insert or update actors from CSV or NDJSON upload (matched by name)
+    """
+    return import_upload(actor_schema.validate, Actor)
+
+
 def get_actor_by_id():
     """Get record by id"""
+    try:
+        return respond(get_record(Actor, actor_serializer, 'filmography', movie_serializer, get_request_data(), reads_replica()))
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
+
+
+def get_actor_filmography():
+    """
+    Get page of actor's filmography (keyset pagination by id)
+    """
     try:
         data = get_request_data()
 
@@ -39,19 +77,24 @@ def get_actor_by_id():
 
         # check if id is int
         try:
-            row_id = int(data['id'])
+            row_id = parse_int(data['id'])
         except ValueError:
             return make_response(jsonify(error='Id must be an integer.'), 400)
 
-        # check record exists
-        obj = Actor.query.get(row_id)
-        if not obj:
+        try:
+            limit, after = get_page_params(data)
+            after = Movie.decode_cursor(after)
+        except ValueError as error:
+            return make_response(jsonify(error=str(error)), 400)
+        # ------------------------------------------------------------------------------------
+
+        page = Actor.get_relations_page(row_id, limit, after)
+        if page is None:
             error = f'Actor with such id {row_id} does not exist.'
             return make_response(jsonify(error=error), 400)
-        # ------------------------------------------------------------------------------------
 
-        actor = {k: v for k, v in obj.__dict__.items() if k in ACTOR_FIELDS}
-        return make_response(jsonify(actor), 200)
+        records, next_cursor = page
+        return json_response(dict(id=row_id, filmography=movie_serializer.dump_many(records), next_cursor=next_cursor), 200)
 
     except Exception as error:
         return make_response(jsonify(error=str(error)), 500)
@@ -65,31 +108,68 @@ def add_actor():
         data = get_request_data()
 
         # validate data ---------------------------------------------------------------------
-        required_fields = [field for field in ACTOR_FIELDS if field != 'id']
-        missing_fields = [field for field in required_fields if field not in data]
-
-        # check if missing fields
-        if missing_fields:
-            return make_response(jsonify(error=f"Missing required fields: {', '.join(missing_fields)}."), 400)
-
-        # check for invalid fields
-        invalid_fields = [field for field in data if field not in ACTOR_FIELDS]
-        if invalid_fields:
-            return make_response(jsonify(error=f"Invalid fields: {', '.join(invalid_fields)}."), 400)
-
-        # check date format
-        if 'date_of_birth' in data:
-            try:
-                data['date_of_birth'] = dt.strptime(data['date_of_birth'], DATE_FORMAT).date()
-            except ValueError:
-                error = f"Date must be in format {DATE_FORMAT}."
-                return make_response(jsonify(error=error), 400)
+        error = actor_schema.validate(data)
+        if error:
+            return make_response(jsonify(error=error), 400)
         # -------------------------------------------------------------------------------------
 
         new_record = Actor.create(**data)
-        new_actor = {k: v for k, v in new_record.__dict__.items() if k in ACTOR_FIELDS}
+        new_actor = actor_serializer.dump(new_record)
 
-        return make_response(jsonify(new_actor), 200)
+        return json_response(new_actor, 200)
+
+    except Exception as err:
+        return make_response(jsonify(error=str(err)), 500)
+
+
+def bulk_add_actors():
+    """
+    Add many actors in one transaction
+    """
+    try:
+        try:
+            records = get_request_records()
+        except ValueError as error:
+            return make_response(jsonify(error=str(error)), 400)
+
+        # validate data ---------------------------------------------------------------------
+        valid_records = []
+        indexes = []
+        names = set()
+        errors = []
+
+        for index, record in enumerate(records):
+            error = actor_schema.validate(record)
+
+            # check if id is left to database, bulk_create matches new ids by name
+            if not error and 'id' in record:
+                error = 'Id of new record is assigned by database.'
+
+            # check if name is unique within records
+            if not error and record['name'] in names:
+                error = f"Name {record['name']} is repeated in records."
+
+            if error:
+                errors.append(dict(index=index, error=error))
+            else:
+                valid_records.append(record)
+                indexes.append(index)
+                names.add(record['name'])
+
+        if not valid_records:
+            return make_response(jsonify(ids=[], errors=errors), 400)
+        # -------------------------------------------------------------------------------------
+
+        # records with existing names are skipped and reported
+        ids = []
+        for index, record, row_id in zip(indexes, valid_records, Actor.bulk_create(valid_records)):
+            if row_id is None:
+                errors.append(dict(index=index, error=f"Actor with such name {record['name']} already exists."))
+            else:
+                ids.append(row_id)
+
+        errors.sort(key=lambda error: error['index'])
+        return make_response(jsonify(ids=ids, errors=errors), 200 if ids else 400)
 
     except Exception as err:
         return make_response(jsonify(error=str(err)), 500)
@@ -108,38 +188,23 @@ def update_actor():
             error = 'No id specified.'
             return make_response(jsonify(error=error), 400)
 
-        # check if id is int
-        try:
-            row_id = int(data['id'])
-        except ValueError:
-            error = 'Id must be an integer.'
+        # check fields and values (id is converted as well)
+        error = actor_schema.validate(data, partial=True)
+        if error:
             return make_response(jsonify(error=error), 400)
+        row_id = data['id']
+        # -------------------------------------------------------------------------------------
 
-        # check if such actor exists
-        obj = Actor.query.filter_by(id=row_id).first()
-        if not obj:
+        try:
+            # existence is checked by the update itself
+            upd_record = Actor.update(row_id, **{k: v for k, v in data.items() if k != 'id'})
+        except ValueError:
             error = f'Actor with such id {row_id} does not exist.'
             return make_response(jsonify(error=error), 400)
 
-        # check if missing fields
-        invalid_fields = [field for field in data if field not in ACTOR_FIELDS]
-        if invalid_fields:
-            error = f"Missing required fields: {', '.join(invalid_fields)}."
-            return make_response(jsonify(error=error), 400)
-
-        # check date format
-        if 'date_of_birth' in data:
-            try:
-                data['date_of_birth'] = dt.strptime(data['date_of_birth'], DATE_FORMAT).date()
-            except ValueError:
-                error = f"Date must be in format {DATE_FORMAT}."
-                return make_response(jsonify(error=error), 400)
-        # -------------------------------------------------------------------------------------
-
-        upd_record = Actor.update(row_id, **{k: v for k, v in data.items() if k != 'id'})
-        upd_actor = {k: v for k, v in upd_record.__dict__.items() if k in ACTOR_FIELDS}
+        upd_actor = actor_serializer.dump_mapping(upd_record)
 
-        return make_response(jsonify(upd_actor), 200)
+        return json_response(upd_actor, 200)
 
     except Exception as error:
         return make_response(jsonify(error=str(error)), 500)
@@ -160,19 +225,17 @@ def delete_actor():
 
         try:
             # check if id is int
-            row_id = int(data['id'])
+            row_id = parse_int(data['id'])
         except ValueError:
             error = 'Id must be an integer.'
             return make_response(jsonify(error=error), 400)
-        
-        # check if record exists
-        obj = Actor.query.filter_by(id=row_id).first()
-        if not obj:
+        # -------------------------------------------------------------------------------------
+
+        # existence is checked by the affected rows count
+        if not Actor.delete(row_id):
             error = f'Record with such id {row_id} does not exist.'
             return make_response(jsonify(error=error), 400)
-        # -------------------------------------------------------------------------------------
 
-        Actor.delete(row_id)
         massage = 'Record successfully deleted.'
         return make_response(jsonify(message=massage), 200)
     
@@ -182,14 +245,14 @@ def delete_actor():
 
 def actor_add_relation():
     """
-    Add a movie to actor's filmography
+    Add movies to actor's filmography (relation_id is one id or a list of ids)
     """
     try:
         data = get_request_data()
 
         # validate data ---------------------------------------------------------------------
         # check if ids specified
-        if 'id' not in data:
+        if 'id' not in data or data['id'] is None:
             error = 'No actor id specified.'
             return make_response(jsonify(error=error), 400)
         if 'relation_id' not in data or data['relation_id'] is None:
@@ -197,29 +260,31 @@ def actor_add_relation():
             return make_response(jsonify(error=error), 400)
 
         try:
-            # check if ids is ints
-            actor_id = int(data['id'])
-            movie_id = int(data['relation_id'])
+            # check if ids are integers
+            actor_id = parse_int(data['id'])
+            movie_ids = get_ids(data['relation_id'])
         except ValueError:
             error = 'Ids must be integers.'
             return make_response(jsonify(error=error), 400)
         
-        # check if records exist
+        # check if record exists
         actor = Actor.query.filter_by(id=actor_id).first()
         if not actor:
             error = f'Actor with such id {actor_id} does not exist.'
             return make_response(jsonify(error=error), 400)
-        
-        movie = Movie.query.filter_by(id=movie_id).first()
-        if not movie:
-            error = f'Movie with such id {movie_id} does not exist.'
-            return make_response(jsonify(error=error), 400)
         # -------------------------------------------------------------------------------------
 
-        actor = Actor.add_relation(actor_id, movie) 
-        rel_actor = {k: v for k, v in actor.__dict__.items() if k in ACTOR_FIELDS}
-        rel_actor['filmography'] = str(actor.filmography)
-        return make_response(jsonify(rel_actor), 200)
+        rel_actor = actor_serializer.dump(actor)
+
+        try:
+            # movies existence is checked with a single query
+            added = Actor.add_relations(actor_id, movie_ids)
+        except ValueError as error:
+            return make_response(jsonify(error=str(error)), 400)
+
+        add_related([rel_actor], Actor.get_related([actor_id], movie_serializer.fields), 'filmography', movie_serializer)
+        rel_actor['added'] = added
+        return json_response(rel_actor, 200)
     
     except Exception as error:
         return make_response(jsonify(error=str(error)), 400)
@@ -240,7 +305,7 @@ def actor_clear_relations():
 
         try:
             # check if id is int
-            row_id = int(data['id'])
+            row_id = parse_int(data['id'])
         except ValueError:
             error = 'Id must be an integer.'
             return make_response(jsonify(error=error), 400)
@@ -252,10 +317,13 @@ def actor_clear_relations():
             return make_response(jsonify(error=error), 400)
         # -------------------------------------------------------------------------------------
 
-        actor = Actor.clear_relations(row_id)
-        rel_actor = {k: v for k, v in actor.__dict__.items() if k in ACTOR_FIELDS}
-        rel_actor['filmography'] = str(actor.filmography)
-        return make_response(jsonify(rel_actor), 200)
+        rel_actor = actor_serializer.dump(obj)
+        removed = Actor.clear_relations(row_id)
+
+        # collection is empty after clearing, no need to reload it
+        rel_actor['filmography'] = []
+        rel_actor['removed'] = removed
+        return json_response(rel_actor, 200)
     
     except Exception as error:
         return make_response(jsonify(error=str(error)), 400)
\ No newline at end of file
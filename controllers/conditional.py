@@ -0,0 +1,58 @@
+import hashlib
+
+from flask import Response, request
+
+from core.cache import LRUCache
+from core.routing import may_cache, reads_replica
+from models.base import Model
+from settings.constants import RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL
+from .serializers import dumps
+
+# encoded JSON bodies, keys include versions of the tables the response depends on
+response_cache = LRUCache(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL)
+
+
+def response_key(tables, versions, params):
+    """
+    Get cache key and ETag of response
+
+    Versions are stored in the database and bumped in the transaction of every write,
+    so a write through any worker (or the import command) changes keys and ETags of all workers
+    (within VERSIONS_TTL, see Model.current_versions).
+
+    tables: tuple of table names the response depends on
+    versions: tuple of current versions of tables (see Model.current_versions)
+    params: tuple of request parameters the response depends on
+    return: tuple (key, etag)
+    """
+    key = (tables, versions, params)
+    etag = hashlib.sha1(repr(key).encode()).hexdigest()
+    return key, etag
+
+
+def cached_json_response(tables, params, build):
+    """
+    Get JSON response with strong ETag, served from encoded responses cache
+
+    tables: tuple of table names the response depends on
+    params: tuple of request parameters the response depends on
+    build: function returning data for response (called only on cache miss)
+    return: response (304 Not Modified without building data if client copy is current)
+    """
+    # versions are read at most once per VERSIONS_TTL, data only if client copy or cached body is outdated
+    key, etag = response_key(tables, Model.current_versions(tables), params)
+
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    body = response_cache.get(key)
+    if body is None:
+        body = dumps(build())
+        if may_cache(Model.versions, tables, reads_replica()):
+            response_cache.set(key, body)
+
+    response = Response(body, status=200, mimetype='application/json')
+    response.set_etag(etag)
+    return response
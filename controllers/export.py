@@ -0,0 +1,46 @@
+from flask import Response, stream_with_context
+from sqlalchemy import select
+
+from core import db
+from settings.constants import EXPORT_BATCH_SIZE
+from .serializers import dumps
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+
+
+def stream_records(model, serializer, fmt):
+    """
+    Stream all records of model as NDJSON or as a JSON array
+
+    model: model class
+    serializer: model serializer
+    fmt: 'ndjson' or 'json'
+    return: streamed response, rows are fetched through a server-side cursor
+    """
+    columns = [getattr(model, field) for field in serializer.fields]
+    stmt = select(*columns).order_by(model.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    def generate():
+        result = db.session.execute(stmt)
+        first = True
+
+        if fmt == 'json':
+            yield b'['
+
+        # write one chunk per fetched batch instead of one per row
+        for batch in result.partitions():
+            rows = [dumps(serializer.from_values(row)) for row in batch]
+
+            if fmt == 'ndjson':
+                yield b'\n'.join(rows) + b'\n'
+            else:
+                yield (b'' if first else b',') + b','.join(rows)
+            first = False
+
+        if fmt == 'json':
+            yield b']'
+
+    return Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt])
@@ -0,0 +1,117 @@
+from flask import jsonify, make_response
+
+from models.actor import Actor
+from models.movie import Movie
+from models.base import Model
+from settings.constants import GRAPH_MAX_DEPTH
+from .parse_request import get_request_data, get_page_params, parse_int
+from .serializers import json_response
+
+
+def get_actor_path():
+    """
+    Get shortest collaboration path between two actors (served from in-memory graph)
+    """
+    try:
+        data = get_request_data()
+
+        # validate data ---------------------------------------------------------------------
+        # check if ids specified
+        if 'from' not in data or 'to' not in data:
+            return make_response(jsonify(error='No actor ids specified.'), 400)
+
+        # check if ids are integers
+        try:
+            source = parse_int(data['from'])
+            target = parse_int(data['to'])
+        except ValueError:
+            return make_response(jsonify(error='Ids must be integers.'), 400)
+
+        # check if max depth is positive int
+        try:
+            max_depth = min(parse_int(data.get('max_depth', GRAPH_MAX_DEPTH)), GRAPH_MAX_DEPTH)
+        except ValueError:
+            return make_response(jsonify(error='Max depth must be an integer.'), 400)
+
+        if max_depth < 1:
+            return make_response(jsonify(error='Max depth must be a positive integer.'), 400)
+
+        # check if actors exist
+        for row_id in (source, target):
+            if not Actor.get_by_id(row_id):
+                error = f'Actor with such id {row_id} does not exist.'
+                return make_response(jsonify(error=error), 400)
+        # ------------------------------------------------------------------------------------
+
+        path = Model.graph.shortest_path(source, target, max_depth)
+        if path is None:
+            # not connected within max depth
+            return json_response(dict(degrees=None, path=None), 200)
+
+        # path alternates actors and movies, names come from search indexes
+        steps = [
+            dict(type='actor', id=row_id, name=Actor.search_index.name(row_id)) if i % 2 == 0
+            else dict(type='movie', id=row_id, name=Movie.search_index.name(row_id))
+            for i, row_id in enumerate(path)
+        ]
+        return json_response(dict(degrees=len(path) // 2, path=steps), 200)
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
+
+
+def get_actor_costars():
+    """
+    Get page of actors who appeared in a movie with actor (keyset pagination by id)
+    """
+    try:
+        data = get_request_data()
+
+        # validate data ---------------------------------------------------------------------
+        # check if id specified
+        if 'id' not in data:
+            return make_response(jsonify(error='No id specified.'), 400)
+
+        # check if id is int
+        try:
+            row_id = parse_int(data['id'])
+        except ValueError:
+            return make_response(jsonify(error='Id must be an integer.'), 400)
+
+        try:
+            limit, after = get_page_params(data)
+            after = Actor.decode_cursor(after)
+        except ValueError as error:
+            return make_response(jsonify(error=str(error)), 400)
+
+        # check if actor exists
+        if not Actor.get_by_id(row_id):
+            error = f'Actor with such id {row_id} does not exist.'
+            return make_response(jsonify(error=error), 400)
+        # ------------------------------------------------------------------------------------
+
+        costar_ids = sorted(Model.graph.costars(row_id))
+        if after is not None:
+            costar_ids = [costar_id for costar_id in costar_ids if costar_id > after]
+
+        next_cursor = None
+        if len(costar_ids) > limit:
+            costar_ids = costar_ids[:limit]
+            next_cursor = costar_ids[-1]
+
+        costars = [dict(id=costar_id, name=Actor.search_index.name(costar_id)) for costar_id in costar_ids]
+        return json_response(dict(id=row_id, costars=costars, next_cursor=next_cursor), 200)
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
+
+
+def get_graph_stats():
+    """
+    Get co-star graph size
+    """
+    try:
+        return make_response(jsonify(Model.graph.stats()), 200)
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
@@ -0,0 +1,263 @@
+import codecs
+import csv
+import json
+from functools import partial
+
+from flask import jsonify, make_response, request
+
+from core.queries import current_log
+from models.actor import Actor
+from models.movie import Movie
+from settings.constants import RELATION_FIELDS, IMPORT_BATCH_SIZE, IMPORT_CHUNK_SIZE, IMPORT_MAX_ERRORS
+from .parse_request import parse_int
+
+IMPORT_FORMATS = ['csv', 'ndjson']
+
+
+def read_lines(stream):
+    """
+    Read UTF-8 text lines from binary stream in chunks of IMPORT_CHUNK_SIZE bytes
+
+    stream: binary file-like object (request body, uploaded or opened file)
+    return: generator of lines (with line ends)
+    """
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    tail = ''
+
+    while True:
+        chunk = stream.read(IMPORT_CHUNK_SIZE)
+        lines = (tail + decoder.decode(chunk, final=not chunk)).split('\n')
+        tail = lines.pop()
+
+        for line in lines:
+            yield line + '\n'
+
+        if not chunk:
+            break
+
+    if tail:
+        yield tail
+
+
+def read_records(stream, fmt):
+    """
+    Read records from CSV (with header row) or NDJSON stream one at a time
+
+    stream: binary file-like object
+    fmt: 'csv' or 'ndjson'
+    return: generator of tuples (line number, record, error), record is None if line can't be parsed,
+            raises UnicodeDecodeError or csv.Error if stream is not a valid file
+    """
+    lines = read_lines(stream)
+
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            if None in record:
+                yield reader.line_num, None, 'More values than fields in header.'
+            else:
+                # missing values are missing fields
+                yield reader.line_num, {key: value for key, value in record.items() if value is not None}, None
+
+    elif fmt == 'ndjson':
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                yield number, None, 'Invalid JSON.'
+                continue
+
+            if isinstance(record, dict):
+                yield number, record, None
+            else:
+                yield number, None, 'Record must be a JSON object.'
+
+
+def validate_relation(data):
+    """
+    Validate association row, records are given by id (actor_id, movie_id) or by name (actor, movie)
+
+    data: dict with relation fields
+    return: error message or None if data is valid (ids are converted in place)
+    """
+    # check for invalid fields
+    invalid_fields = [field for field in data if field not in RELATION_FIELDS]
+    if invalid_fields:
+        return f"Invalid fields: {', '.join(invalid_fields)}."
+
+    # empty CSV cells are fields not given (rows may give one record by id and the other by name)
+    for field in [field for field, value in data.items() if value == '']:
+        del data[field]
+
+    for name in ('actor', 'movie'):
+        # check if record specified
+        if f'{name}_id' not in data and name not in data:
+            return f'No {name}_id or {name} specified.'
+
+        # check if id is int
+        if f'{name}_id' in data:
+            try:
+                data[f'{name}_id'] = parse_int(data[f'{name}_id'])
+            except (TypeError, ValueError):
+                return f'{name.capitalize()} id must be an integer.'
+
+    return None
+
+
+def new_report():
+    """
+    Get empty import report
+    """
+    return dict(rows=0, inserted=0, updated=0, unchanged=0, failed=0, errors=[])
+
+
+def add_error(report, line, error):
+    """
+    Count failed row, only the first IMPORT_MAX_ERRORS errors are listed
+    """
+    report['failed'] += 1
+    if len(report['errors']) < IMPORT_MAX_ERRORS:
+        report['errors'].append(dict(line=line, error=error))
+
+
+def flush_records(model, batch, report):
+    """
+    Insert or update batch of records matched by name
+
+    batch: dict name -> (line number, record)
+    """
+    inserted, updated = model.import_records({name: record for name, (_, record) in batch.items()})
+    report['inserted'] += inserted
+    report['updated'] += updated
+
+
+def flush_relations(batch, report):
+    """
+    Add batch of association rows, names are resolved to ids first
+
+    batch: dict (actor id or name, movie id or name) -> line number
+    """
+    actor_ids = Actor.ids_by_name(actor for actor, _ in batch if isinstance(actor, str))
+    movie_ids = Movie.ids_by_name(movie for _, movie in batch if isinstance(movie, str))
+    pairs = {}
+
+    for (actor, movie), line in batch.items():
+        actor_id = actor_ids.get(actor) if isinstance(actor, str) else actor
+        movie_id = movie_ids.get(movie) if isinstance(movie, str) else movie
+
+        if actor_id is None:
+            add_error(report, line, f'Actor {actor} not found.')
+        elif movie_id is None:
+            add_error(report, line, f'Movie {movie} not found.')
+        else:
+            pairs[(actor_id, movie_id)] = line
+
+    added, missing = Actor.import_relations(set(pairs))
+    report['inserted'] += added
+
+    for actor_id, movie_id in sorted(missing, key=pairs.get):
+        add_error(report, pairs[(actor_id, movie_id)], f'Actor ID {actor_id} or movie ID {movie_id} not found.')
+
+
+def import_stream(stream, fmt, validate, model=None, report=None):
+    """
+    Import records of model (association rows if model is None) from CSV or NDJSON stream
+
+    Rows are written in batches of IMPORT_BATCH_SIZE, one transaction per batch,
+    so memory doesn't grow with the size of the file.
+    Records are matched by unique name, later rows of the same name (or pair) replace earlier ones.
+
+    stream: binary file-like object
+    fmt: 'csv' or 'ndjson'
+    validate: function validating record in place (actor_schema.validate, movie_schema.validate, validate_relation)
+    model: Actor, Movie or None
+    report: report to fill (see new_report), committed batches stay counted if import fails
+    return: report
+    """
+    report = new_report() if report is None else report
+    flush = flush_relations if model is None else partial(flush_records, model)
+    batch = {}
+
+    for line, record, error in read_records(stream, fmt):
+        report['rows'] += 1
+
+        if error is None:
+            # ids are assigned by database, records are matched by name
+            if model is not None:
+                record.pop('id', None)
+            error = validate(record)
+
+        if error:
+            add_error(report, line, error)
+            continue
+
+        if model is not None:
+            batch[record['name']] = (line, record)
+        else:
+            batch[(record.get('actor_id', record.get('actor')), record.get('movie_id', record.get('movie')))] = line
+
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            flush(batch, report)
+            batch = {}
+
+    if batch:
+        flush(batch, report)
+
+    report['unchanged'] = report['rows'] - report['failed'] - report['inserted'] - report['updated']
+    return report
+
+
+def import_upload(validate, model=None):
+    """
+    Import request body (or file uploaded as form field "file") as CSV or NDJSON
+
+    validate: function validating record in place
+    model: Actor, Movie or None for association rows
+    """
+    report = new_report()
+
+    try:
+        # validate data ---------------------------------------------------------------------
+        # parameters come from query string, request.form would read the whole body
+        fmt = request.args.get('format', 'csv')
+        if fmt not in IMPORT_FORMATS:
+            error = f"Format must be one of: {', '.join(IMPORT_FORMATS)}."
+            return make_response(jsonify(error=error), 400)
+
+        # uploaded files are spooled to disk by werkzeug, raw bodies are read as they arrive
+        if request.mimetype == 'multipart/form-data':
+            upload = request.files.get('file')
+            if upload is None:
+                return make_response(jsonify(error='No file uploaded.'), 400)
+            stream = upload.stream
+        else:
+            stream = request.stream
+        # ------------------------------------------------------------------------------------
+
+        # batches repeat the same statements, they are not N+1 queries
+        log = current_log.get()
+        if log is not None:
+            log.repeat_threshold = None
+
+        try:
+            import_stream(stream, fmt, validate, model, report)
+        except (UnicodeDecodeError, csv.Error) as error:
+            return make_response(jsonify(error=f'Invalid {fmt} file: {error}', **report), 400)
+
+        if report['rows'] and report['failed'] == report['rows']:
+            return make_response(jsonify(report), 400)
+
+        return make_response(jsonify(report), 200)
+
+    except Exception as err:
+        return make_response(jsonify(error=str(err), **report), 500)
+
+
+def import_relations():
+    """
+    Add association rows from CSV or NDJSON upload (existing pairs are skipped)
+    """
+    return import_upload(validate_relation)
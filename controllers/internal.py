@@ -0,0 +1,52 @@
+from flask import Response, current_app, jsonify, make_response
+
+from core.metrics import metrics
+from core.pool import engines, pool_stats
+from models.base import Model
+from .conditional import response_cache
+
+
+def get_cache_stats():
+    """
+    Get get-by-id and list responses cache counters
+    """
+    try:
+        stats = dict(records=Model.cache.stats(), responses=response_cache.stats())
+        return make_response(jsonify(stats), 200)
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
+
+
+def get_pool_stats():
+    """
+    Get connection pools state and checkout counters
+    """
+    try:
+        stats = {name: pool_stats(engine) for name, engine in engines.items()}
+        return make_response(jsonify(stats), 200)
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
+
+
+def get_metrics():
+    """
+    Get request metrics in Prometheus text format
+    """
+    try:
+        return Response(metrics.render(), status=200, mimetype='text/plain; version=0.0.4')
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
+
+
+def get_startup_timings():
+    """
+    Get durations of startup steps
+    """
+    try:
+        return make_response(jsonify(current_app.config['STARTUP_TIMINGS']), 200)
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
\ No newline at end of file
@@ -1,35 +1,73 @@
-from flask import jsonify, make_response
-
-from ast import literal_eval
+from flask import jsonify, make_response, request
 
+from core.routing import reads_replica
 from models.actor import Actor  
 from models.movie import Movie
-from settings.constants import MOVIE_FIELDS, DATE_FORMAT
-from .parse_request import get_request_data
+from settings.constants import MOVIE_FILTER_FIELDS, MOVIE_RANGE_FIELDS, MOVIE_SORT_FIELDS
+from .parse_request import get_request_data, get_page_params, get_request_records, get_ids, parse_int
+from .export import stream_records, EXPORT_FORMATS
+from .importer import import_upload
+from .reads import list_records, get_record, respond
+from .serializers import actor_serializer, movie_serializer, json_response, add_related
+from .schemas import movie_schema
 
 
 def get_all_movies():
     """
-    Get list of all records
+    Get page of filtered and sorted records (keyset pagination)
     """
     try:
-        all_movies = Movie.query.all()
-        movies = []
-
-        for movie in all_movies:
-            act = {k: v for k, v in movie.__dict__.items() if k in MOVIE_FIELDS}
-            movies.append(act)
+        query_fields = (MOVIE_FILTER_FIELDS, MOVIE_RANGE_FIELDS, MOVIE_SORT_FIELDS)
+        return respond(list_records(
+            Movie, movie_serializer, 'movies', query_fields, 'cast', actor_serializer,
+            get_request_data(), request.headers.get('If-None-Match'), reads_replica(),
+        ))
 
-        return make_response(jsonify(movies), 200) 
-    
     except Exception as error:
         return make_response(jsonify(error=str(error)), 400)
     
 
+def export_movies():
+    """
+    Stream all records as NDJSON or JSON array
+    """
+    try:
+        data = get_request_data()
+
+        # validate data ---------------------------------------------------------------------
+        fmt = data.get('format', 'ndjson')
+        if fmt not in EXPORT_FORMATS:
+            error = f"Format must be one of: {', '.join(EXPORT_FORMATS)}."
+            return make_response(jsonify(error=error), 400)
+        # ------------------------------------------------------------------------------------
+
+        return stream_records(Movie, movie_serializer, fmt)
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 400)
+
+
+def import_movies():
+    """
+    Insert or update movies from CSV or NDJSON upload (matched by name)
+    """
+    return import_upload(movie_schema.validate, Movie)
+
+
 def get_movie_by_id():
     """
     Get record by id
     """
+    try:
+        return respond(get_record(Movie, movie_serializer, 'cast', actor_serializer, get_request_data(), reads_replica()))
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
+
+def get_movie_cast():
+    """
+    Get page of movie's cast (keyset pagination by id)
+    """
     try:
         data = get_request_data()
 
@@ -40,23 +78,30 @@ def get_movie_by_id():
 
         # check if id is int
         try:
-            row_id = int(data['id'])
+            row_id = parse_int(data['id'])
         except ValueError:
             return make_response(jsonify(error='Id must be an integer.'), 400)
 
-        # check if movie exists
-        obj = Movie.query.get(row_id)
-        if not obj:
+        try:
+            limit, after = get_page_params(data)
+            after = Actor.decode_cursor(after)
+        except ValueError as error:
+            return make_response(jsonify(error=str(error)), 400)
+        # ------------------------------------------------------------------------------------
+
+        page = Movie.get_relations_page(row_id, limit, after)
+        if page is None:
             error = f'Movie with such id {row_id} does not exist.'
             return make_response(jsonify(error=error), 400)
-        # ------------------------------------------------------------------------------------
 
-        movie = {k: v for k, v in obj.__dict__.items() if k in MOVIE_FIELDS}
-        return make_response(jsonify(movie), 200)
+        records, next_cursor = page
+        return json_response(dict(id=row_id, cast=actor_serializer.dump_many(records), next_cursor=next_cursor), 200)
 
     except Exception as error:
         return make_response(jsonify(error=str(error)), 500)
 
+
+
 def add_movie():
     """
     Add new movie
@@ -65,29 +110,68 @@ def add_movie():
         data = get_request_data()
 
         # validate data ---------------------------------------------------------------------
-        required_fields = [field for field in MOVIE_FIELDS if field != 'id']
-        missing_fields = [field for field in required_fields if field not in data]
+        error = movie_schema.validate(data)
+        if error:
+            return make_response(jsonify(error=error), 400)
+        # -------------------------------------------------------------------------------------
 
-        # check if missing fields
-        if missing_fields:
-            return make_response(jsonify(error=f"Missing required fields: {', '.join(missing_fields)}."), 400)
+        new_record = Movie.create(**data)
+        new_movie = movie_serializer.dump(new_record)
 
-        # check for invalid fields
-        invalid_fields = [field for field in data if field not in MOVIE_FIELDS]
-        if invalid_fields:
-            return make_response(jsonify(error=f"Invalid fields: {', '.join(invalid_fields)}."), 400)
+        return json_response(new_movie, 200)
 
-        # check if year is int
+    except Exception as err:
+        return make_response(jsonify(error=str(err)), 500)
+
+
+def bulk_add_movies():
+    """
+    Add many movies in one transaction
+    """
+    try:
         try:
-            data['year'] = int(data['year'])
-        except ValueError:
-            return make_response(jsonify(error='Year must be an integer.'), 400)
+            records = get_request_records()
+        except ValueError as error:
+            return make_response(jsonify(error=str(error)), 400)
+
+        # validate data ---------------------------------------------------------------------
+        valid_records = []
+        indexes = []
+        names = set()
+        errors = []
+
+        for index, record in enumerate(records):
+            error = movie_schema.validate(record)
+
+            # check if id is left to database, bulk_create matches new ids by name
+            if not error and 'id' in record:
+                error = 'Id of new record is assigned by database.'
+
+            # check if name is unique within records
+            if not error and record['name'] in names:
+                error = f"Name {record['name']} is repeated in records."
+
+            if error:
+                errors.append(dict(index=index, error=error))
+            else:
+                valid_records.append(record)
+                indexes.append(index)
+                names.add(record['name'])
+
+        if not valid_records:
+            return make_response(jsonify(ids=[], errors=errors), 400)
         # -------------------------------------------------------------------------------------
 
-        new_record = Movie.create(**data)
-        new_movie = {k: v for k, v in new_record.__dict__.items() if k in MOVIE_FIELDS}
+        # records with existing names are skipped and reported
+        ids = []
+        for index, record, row_id in zip(indexes, valid_records, Movie.bulk_create(valid_records)):
+            if row_id is None:
+                errors.append(dict(index=index, error=f"Movie with such name {record['name']} already exists."))
+            else:
+                ids.append(row_id)
 
-        return make_response(jsonify(new_movie), 200)
+        errors.sort(key=lambda error: error['index'])
+        return make_response(jsonify(ids=ids, errors=errors), 200 if ids else 400)
 
     except Exception as err:
         return make_response(jsonify(error=str(err)), 500)
@@ -106,38 +190,23 @@ def update_movie():
             error = 'No id specified.'
             return make_response(jsonify(error=error), 400)
 
-        # check if id is int
-        try:
-            row_id = int(data['id'])
-        except ValueError:
-            error = 'Id must be an integer.'
+        # check fields and values (id is converted as well)
+        error = movie_schema.validate(data, partial=True)
+        if error:
             return make_response(jsonify(error=error), 400)
+        row_id = data['id']
+        # -------------------------------------------------------------------------------------
 
-        # check if movie exists
-        obj = Movie.query.filter_by(id=row_id).first()
-        if not obj:
+        try:
+            # existence is checked by the update itself
+            upd_record = Movie.update(row_id, **{k: v for k, v in data.items() if k != 'id'})
+        except ValueError:
             error = f'Movie with such id {row_id} does not exist.'
             return make_response(jsonify(error=error), 400)
-        
-        # check if missing fields
-        invalid_fields = [field for field in data if field not in MOVIE_FIELDS]
-        if invalid_fields:
-            error = f"Missing required fields: {', '.join(invalid_fields)}."
-            return make_response(jsonify(error=error), 400)
-
-        if 'year' in data:
-        # check if year is int
-            try:
-                year = int(data['year'])
-            except ValueError:
-                error = 'Year must be an integer.'
-                return make_response(jsonify(error=error), 400)
-        # -------------------------------------------------------------------------------------
 
-        upd_record = Movie.update(row_id, **{k: v for k, v in data.items() if k != 'id'})
-        upd_movie = {k: v for k, v in upd_record.__dict__.items() if k in MOVIE_FIELDS}
+        upd_movie = movie_serializer.dump_mapping(upd_record)
 
-        return make_response(jsonify(upd_movie), 200)
+        return json_response(upd_movie, 200)
 
     except Exception as error:
         return make_response(jsonify(error=str(error)), 500)
@@ -158,19 +227,17 @@ def delete_movie():
 
         try:
             # check if id is int
-            row_id = int(data['id'])
+            row_id = parse_int(data['id'])
         except ValueError:
             error = 'Id must be an integer.'
             return make_response(jsonify(error=error), 400)
-        
-        # check if record exists
-        obj = Movie.query.filter_by(id=row_id).first()
-        if not obj:
+        # -------------------------------------------------------------------------------------
+
+        # existence is checked by the affected rows count
+        if not Movie.delete(row_id):
             error = f'Movie with such id {row_id} does not exist.'
             return make_response(jsonify(error=error), 400)
-        # -------------------------------------------------------------------------------------
 
-        Movie.delete(row_id)
         massage = 'Record successfully deleted.'
         return make_response(jsonify(message=massage), 200)
     
@@ -180,7 +247,7 @@ def delete_movie():
     
 def movie_add_relation():
     """
-    Add an actor to movie's cast
+    Add actors to movie's cast (relation_id is one id or a list of ids)
     """
     try:
         data = get_request_data()
@@ -196,28 +263,30 @@ def movie_add_relation():
 
         try:
             # check if ids are integers
-            movie_id = int(data['id'])
-            actor_id = int(data['relation_id'])
+            movie_id = parse_int(data['id'])
+            actor_ids = get_ids(data['relation_id'])
         except ValueError:
             error = 'Ids must be integers.'
             return make_response(jsonify(error=error), 400)
         
-        # check if records exist
+        # check if record exists
         movie = Movie.query.filter_by(id=movie_id).first()
         if not movie:
             error = f'Movie with such id {movie_id} does not exist.'
             return make_response(jsonify(error=error), 400)
-        
-        actor = Actor.query.filter_by(id=actor_id).first()
-        if not actor:
-            error = f'Actor with such id {actor_id} does not exist.'
-            return make_response(jsonify(error=error), 400)
         # -------------------------------------------------------------------------------------
 
-        movie = Movie.add_relation(movie_id, actor) 
-        rel_movie = {k: v for k, v in movie.__dict__.items() if k in MOVIE_FIELDS}
-        rel_movie['cast'] = str(movie.cast)
-        return make_response(jsonify(rel_movie), 200)
+        rel_movie = movie_serializer.dump(movie)
+
+        try:
+            # actors existence is checked with a single query
+            added = Movie.add_relations(movie_id, actor_ids)
+        except ValueError as error:
+            return make_response(jsonify(error=str(error)), 400)
+
+        add_related([rel_movie], Movie.get_related([movie_id], actor_serializer.fields), 'cast', actor_serializer)
+        rel_movie['added'] = added
+        return json_response(rel_movie, 200)
     
     except Exception as error:
         return make_response(jsonify(error=str(error)), 500)
@@ -238,7 +307,7 @@ def movie_clear_relations():
 
         try:
             # check if id is int
-            row_id = int(data['id'])
+            row_id = parse_int(data['id'])
         except ValueError:
             error = 'Id must be an integer.'
             return make_response(jsonify(error=error), 400)
@@ -250,10 +319,13 @@ def movie_clear_relations():
             return make_response(jsonify(error=error), 400)
         # -------------------------------------------------------------------------------------
 
-        movie = Movie.clear_relations(row_id)
-        rel_movie = {k: v for k, v in movie.__dict__.items() if k in MOVIE_FIELDS}
-        rel_movie['cast'] = str(movie.cast)
-        return make_response(jsonify(rel_movie), 200)
+        rel_movie = movie_serializer.dump(obj)
+        removed = Movie.clear_relations(row_id)
+
+        # collection is empty after clearing, no need to reload it
+        rel_movie['cast'] = []
+        rel_movie['removed'] = removed
+        return json_response(rel_movie, 200)
     
     except Exception as error:
         return make_response(jsonify(error=str(error)), 400)
\ No newline at end of file
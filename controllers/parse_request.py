@@ -1,13 +1,352 @@
-from flask import request
+from flask import g, jsonify, make_response, request
+
+import json
+from ast import literal_eval
+from datetime import datetime as dt
+from functools import lru_cache
+from sqlalchemy import Date, Integer, String
+
+from settings.constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DATE_FORMAT
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# content types of MessagePack bodies
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack', 'application/vnd.msgpack')
+
+# endpoints reading request stream as it arrives (imports), their bodies are not decoded up front
+STREAMED_ENDPOINTS = ('actors_import', 'movies_import', 'relations_import')
+
+
+def body_format(mimetype):
+    """
+    Get format of request body by content type
+
+    mimetype: content type without parameters
+    return: 'json', 'msgpack' or None for other bodies (form data, files)
+    """
+    if mimetype == 'application/json' or (mimetype.startswith('application/') and mimetype.endswith('+json')):
+        return 'json'
+
+    if mimetype in MSGPACK_MIMETYPES:
+        return 'msgpack'
+
+    return None
+
+
+def decode_body(fmt, body):
+    """
+    Decode JSON or MessagePack body
+
+    fmt: 'json' or 'msgpack' (see body_format)
+    body: raw body bytes
+    return: decoded body (None if body is empty), raises ValueError if body can't be decoded
+    """
+    if not body:
+        return None
+
+    if fmt == 'json':
+        try:
+            return orjson.loads(body) if orjson is not None else json.loads(body)
+        except ValueError:
+            raise ValueError('Invalid JSON body.')
+
+    if msgpack is None:
+        raise ValueError('MessagePack bodies are not supported, msgpack is not installed.')
+
+    try:
+        return msgpack.unpackb(body)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid MessagePack body.')
+
+
+def get_request_body():
+    """
+    Get decoded JSON or MessagePack body of request, selected by content type (decoded once per request)
+
+    return: decoded body or None for other content types, raises ValueError if body can't be decoded
+    """
+    if 'request_body' not in g:
+        fmt = body_format(request.mimetype)
+        # form bodies are left to request.form, reading them here would leave it empty
+        g.request_body = decode_body(fmt, request.get_data(cache=True)) if fmt else None
+
+    return g.request_body
+
+
+def parse_request_body():
+    """
+    Decode JSON or MessagePack body before the view (before_request hook), bodies that can't be decoded are answered with 400
+    """
+    # decoding would buffer the whole upload, imports read it line by line
+    if request.endpoint in STREAMED_ENDPOINTS:
+        return
+
+    try:
+        get_request_body()
+    except ValueError as error:
+        return make_response(jsonify(error=str(error)), 400)
+
 
 def get_request_data():
     """
-    Get keys & values from request (Note that this method should parse requests with content type "application/x-www-form-urlencoded")
+    Get keys & values from request (query string, urlencoded or multipart form, JSON or MessagePack object body)
     """
     data = {}
 
+    if request.args:
+        for key, value in request.args.items():
+            data[key] = value
+
     if request.form:
         for key, value in request.form.items():
             data[key] = value
-            
-    return data
\ No newline at end of file
+
+    # array bodies are batches, they are read by get_request_records
+    body = get_request_body()
+    if isinstance(body, dict):
+        data.update(body)
+
+    return data
+
+
+def get_page_params(data):
+    """
+    Get pagination parameters (limit, after) from request data
+
+    data: dict with request data
+    return: tuple (limit, after), raises ValueError if parameters are invalid
+            (after is a raw cursor, it is decoded by Model.decode_cursor)
+    """
+    try:
+        limit = parse_int(data.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('Limit must be an integer.')
+
+    if limit < 1:
+        raise ValueError('Limit must be a positive integer.')
+
+    # server-enforced page size
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    after = data.get('after')
+    if after == '':
+        after = None
+
+    return limit, after
+
+
+@lru_cache(maxsize=65536)
+def parse_date(value):
+    """
+    Parse date in DATE_FORMAT (cached, imports repeat the same dates a lot)
+
+    value: date string
+    return: date, raises ValueError (TypeError for non-string values)
+    """
+    return dt.strptime(value, DATE_FORMAT).date()
+
+
+def parse_int(value):
+    """
+    Parse integer request value (strings of forms, numbers of JSON and MessagePack bodies)
+
+    value: request value
+    return: int, raises ValueError if value is not an integer (bools and fractions are not)
+    """
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f'{value!r} is not an integer.')
+
+    try:
+        return int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f'{value!r} is not an integer.')
+
+
+def column_converter(column):
+    """
+    Get function converting request value to python type of column (type is checked once, not per value)
+
+    column: model column
+    return: function value -> converted value, raises ValueError if value can't be converted
+            (NULL is accepted only by nullable columns)
+    """
+    name = column.name.capitalize()
+
+    if isinstance(column.type, Integer):
+        error = f'{name} must be an integer.'
+
+        def convert(value):
+            try:
+                return parse_int(value)
+            except ValueError:
+                raise ValueError(error)
+
+    elif isinstance(column.type, Date):
+        error = f'Date must be in format {DATE_FORMAT}.'
+
+        def convert(value):
+            try:
+                return parse_date(value)
+            except (TypeError, ValueError):
+                raise ValueError(error)
+
+    elif isinstance(column.type, String):
+        length = column.type.length
+
+        def convert(value):
+            if not isinstance(value, str):
+                raise ValueError(f'{name} must be a string.')
+            if length is not None and len(value) > length:
+                raise ValueError(f'{name} must be at most {length} characters.')
+            return value
+
+    else:
+        def convert(value):
+            return value
+
+    if column.nullable:
+        return lambda value: None if value is None else convert(value)
+
+    def convert_required(value):
+        if value is None:
+            raise ValueError(f'{name} must not be null.')
+        return convert(value)
+
+    return convert_required
+
+
+def convert_value(column, value):
+    """
+    Convert request value to python type of column
+
+    column: model column
+    value: request value
+    return: converted value, raises ValueError if value can't be converted
+    """
+    return column_converter(column)(value)
+
+
+def get_query_params(data, model, filter_fields, range_fields, sort_fields):
+    """
+    Get filtering and sorting parameters from request data
+
+    data: dict with request data
+    model: model class
+    filter_fields: fields filtered by equality (?genre=horror)
+    range_fields: fields filtered by range (?year_from=2010&year_to=2019)
+    sort_fields: fields allowed for sorting (?sort=year, ?sort=-year for descending)
+    return: tuple (filters, ranges, sort), raises ValueError if parameters are invalid
+            filters: dict field -> value
+            ranges: dict field -> (from, to), any bound may be None
+            sort: tuple (field, descending)
+    """
+    table = model.__table__
+    filters = {}
+    ranges = {}
+
+    for field in filter_fields:
+        if field in data:
+            filters[field] = convert_value(table.c[field], data[field])
+
+    for field in range_fields:
+        low = data.get(f'{field}_from')
+        high = data.get(f'{field}_to')
+        if low is not None or high is not None:
+            ranges[field] = (
+                convert_value(table.c[field], low) if low is not None else None,
+                convert_value(table.c[field], high) if high is not None else None,
+            )
+
+    sort = data.get('sort', 'id')
+    if not isinstance(sort, str):
+        raise ValueError('Sort must be a string.')
+
+    descending = sort.startswith('-')
+    field = sort.lstrip('-')
+    if field not in sort_fields:
+        raise ValueError(f"Sort must be one of: {', '.join(sort_fields)} (prefix with - for descending).")
+
+    return filters, ranges, (field, descending)
+
+
+def get_expand(data, relation):
+    """
+    Check if related records are expanded in response (?expand=cast)
+
+    data: dict with request data
+    relation: name of relation the records have (cast or filmography)
+    return: True if relation is expanded, raises ValueError for other relations
+    """
+    expand = data.get('expand', '')
+    if not isinstance(expand, str):
+        raise ValueError('Expand must be a string.')
+
+    expand = [name.strip() for name in expand.split(',') if name.strip()]
+
+    invalid = [name for name in expand if name != relation]
+    if invalid:
+        raise ValueError(f'Expand must be {relation}.')
+
+    return relation in expand
+
+
+def get_request_records(key='records'):
+    """
+    Get list of records from request (JSON or MessagePack array body or form field with a list literal)
+
+    key: form field (or key of object body) with the list of records
+    return: list of dicts, raises ValueError if records are not a list of dicts
+    """
+    if body_format(request.mimetype):
+        records = get_request_body()
+        if isinstance(records, dict):
+            records = records.get(key)
+    else:
+        try:
+            records = literal_eval(request.form.get(key, ''))
+        except (ValueError, SyntaxError):
+            raise ValueError(f'{key.capitalize()} must be a list of records.')
+
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        raise ValueError(f'{key.capitalize()} must be a list of records.')
+
+    return records
+
+
+def get_ids(value):
+    """
+    Get list of ids from request value (single id, "1,2,3", "[1, 2, 3]" or list)
+
+    value: request value
+    return: list of ints, raises ValueError if some id is not an integer
+    """
+    if isinstance(value, str):
+        value = value.strip()
+        if value.startswith('['):
+            try:
+                value = literal_eval(value)
+            except (ValueError, SyntaxError):
+                raise ValueError('Ids must be integers.')
+        else:
+            value = value.split(',')
+
+    if not isinstance(value, (list, tuple)):
+        value = [value]
+
+    try:
+        ids = [parse_int(item) for item in value]
+    except (TypeError, ValueError):
+        raise ValueError('Ids must be integers.')
+
+    if not ids:
+        raise ValueError('Ids must be integers.')
+
+    return ids
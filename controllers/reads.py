@@ -0,0 +1,182 @@
+from flask import Response
+
+from core import db
+from core.routing import may_cache
+from models.summary import table_versions, versions_statement
+from .conditional import response_cache, response_key
+from .parse_request import get_expand, get_page_params, get_query_params, parse_int
+from .serializers import add_related, dumps
+
+# Read views shared by Flask routes and async views of core.asgi. Handlers are generators:
+# they yield statements, get back results and return (status, JSON body or None, ETag or None),
+# so the same code runs on db.session here (run) and on async sessions in core.asgi.
+
+
+def etag_matches(header, etag):
+    """
+    Check if ETag is in If-None-Match header
+
+    header: value of If-None-Match header or None
+    etag: current ETag
+    """
+    if not header:
+        return False
+
+    tags = [tag.strip().removeprefix('W/').strip('"') for tag in header.split(',')]
+    return etag in tags or '*' in tags
+
+
+def error_result(error, status=400):
+    """
+    Get handler result with error message
+    """
+    return status, dumps(dict(error=error)), None
+
+
+def related_records(model, row_ids, relation, rel_serializer, records):
+    """
+    Add related records to serialized records with one query (same as Model.get_related)
+    """
+    if not row_ids:
+        return
+
+    rows = yield model.related_statement(row_ids, rel_serializer.fields)
+    add_related(records, model.group_related(rows, row_ids), relation, rel_serializer)
+
+
+def list_records(model, serializer, name, query_fields, relation, rel_serializer, data, etag_header, replica):
+    """
+    Handle request for page of filtered and sorted records (keyset pagination)
+
+    Unchanged pages are served from cache (or as 304) without touching db,
+    expanded pages change with related records as well.
+
+    model: Actor or Movie
+    serializer: serializer of model records
+    name: key of records in response
+    query_fields: tuple (filter fields, range fields, sort fields)
+    relation: name of related records (filmography or cast), expanded with ?expand=
+    rel_serializer: serializer of related records
+    data: dict with request data
+    etag_header: value of If-None-Match header or None
+    replica: True if statements run on a replica
+    return: generator of statements, returns (status, body, etag)
+    """
+    # validate data ---------------------------------------------------------------------
+    try:
+        limit, after = get_page_params(data)
+        filters, ranges, sort = get_query_params(data, model, *query_fields)
+        after = model.decode_cursor(after, sort)
+        expand = get_expand(data, relation)
+    except ValueError as error:
+        return error_result(str(error))
+    # ------------------------------------------------------------------------------------
+
+    tables = (model.__tablename__,) + (model.related_tables() if expand else ())
+    params = (limit, after, tuple(sorted(filters.items())), tuple(sorted(ranges.items())), sort, expand)
+
+    # versions are read at most once per VERSIONS_TTL (see Model.current_versions)
+    versions_key = model.versions_key(tables)
+    versions = model.versions_cache.get(versions_key)
+    if versions is None:
+        versions = table_versions((yield versions_statement(tables)), tables)
+        model.versions_cache.set(versions_key, versions)
+    key, etag = response_key(tables, versions, params)
+
+    if etag_matches(etag_header, etag):
+        return 304, None, etag
+
+    body = response_cache.get(key)
+    if body is None:
+        page = (yield model.page_statement(limit, after, filters, ranges, sort)).scalars().all()
+        if len(page) <= limit:
+            stmt = model.null_page_statement(limit - len(page), after, filters, ranges, sort)
+            if stmt is not None:
+                page += (yield stmt).scalars().all()
+
+        page, next_cursor = model.split_page(page, limit, sort)
+        records = serializer.dump_many(page)
+
+        # related records of the whole page are loaded with one query
+        if expand:
+            yield from related_records(model, [record['id'] for record in records], relation, rel_serializer, records)
+
+        body = dumps({name: records, 'next_cursor': next_cursor})
+        if may_cache(model.versions, tables, replica):
+            response_cache.set(key, body)
+
+    return 200, body, etag
+
+
+def get_record(model, serializer, relation, rel_serializer, data, replica):
+    """
+    Handle request for record by id (read-through cache, same as Model.get_by_id)
+
+    model: Actor or Movie
+    serializer: serializer of model records
+    relation: name of related records (filmography or cast), expanded with ?expand=
+    rel_serializer: serializer of related records
+    data: dict with request data
+    replica: True if statements run on a replica
+    return: generator of statements, returns (status, body, None)
+    """
+    # validate data ---------------------------------------------------------------------
+    # check if id specified
+    if 'id' not in data:
+        return error_result('No id specified.')
+
+    # check if id is int
+    try:
+        row_id = parse_int(data['id'])
+    except ValueError:
+        return error_result('Id must be an integer.')
+
+    try:
+        expand = get_expand(data, relation)
+    except ValueError as error:
+        return error_result(str(error))
+
+    # check record exists
+    versions_key = model.versions_key((model.__tablename__,))
+    record = model.cached_record(row_id, versions_key)
+    if record is None:
+        row = (yield model.record_statement(row_id)).first()
+        if row is not None:
+            record = model.cache_record(row, versions_key, replica)
+
+    if record is None:
+        return error_result(f'{model.__name__} with such id {row_id} does not exist.')
+    # ------------------------------------------------------------------------------------
+
+    record = serializer.dump_mapping(record)
+    if expand:
+        yield from related_records(model, [row_id], relation, rel_serializer, [record])
+
+    return 200, dumps(record), None
+
+
+def run(handler):
+    """
+    Run statements of handler on db.session (core.asgi runs them on async sessions)
+
+    return: value returned by handler
+    """
+    try:
+        stmt = next(handler)
+        while True:
+            stmt = handler.send(db.session.execute(stmt))
+    except StopIteration as stop:
+        return stop.value
+
+
+def respond(handler):
+    """
+    Get response of handler for Flask views
+    """
+    status, body, etag = run(handler)
+
+    response = Response(body, status=status, mimetype='application/json') if body is not None else Response(status=status)
+    if etag:
+        response.set_etag(etag)
+    return response
+
@@ -0,0 +1,76 @@
+from flask import jsonify, make_response
+
+from models.actor import Actor
+from models.movie import Movie
+from models.base import Model
+from settings.constants import RECOMMEND_TOP_K
+from .parse_request import get_request_data, parse_int
+from .serializers import json_response
+
+
+def get_recommendations(model, kind, count_name):
+    """
+    Get top-K records sharing most relations with record (served from memory)
+
+    model: Actor or Movie
+    kind: 'actors' or 'movies' (recommender table)
+    count_name: response key for shared count
+    """
+    data = get_request_data()
+
+    # validate data ---------------------------------------------------------------------
+    # check if id specified
+    if 'id' not in data:
+        return make_response(jsonify(error='No id specified.'), 400)
+
+    # check if id is int
+    try:
+        row_id = parse_int(data['id'])
+    except ValueError:
+        return make_response(jsonify(error='Id must be an integer.'), 400)
+
+    # check if limit is int
+    try:
+        limit = parse_int(data.get('limit', RECOMMEND_TOP_K))
+    except ValueError:
+        return make_response(jsonify(error='Limit must be an integer.'), 400)
+
+    # check if limit is positive
+    if limit < 1:
+        return make_response(jsonify(error='Limit must be a positive integer.'), 400)
+
+    limit = min(limit, RECOMMEND_TOP_K)
+
+    # check if record exists
+    if not model.get_by_id(row_id):
+        error = f'{model.__name__} with such id {row_id} does not exist.'
+        return make_response(jsonify(error=error), 400)
+    # ------------------------------------------------------------------------------------
+
+    found = [
+        {'id': rel_id, 'name': model.search_index.name(rel_id), count_name: count}
+        for rel_id, count in Model.recommender.top(kind, row_id, limit)
+    ]
+    return json_response({'id': row_id, kind: found}, 200)
+
+
+def get_similar_movies():
+    """
+    Get movies sharing most cast with movie
+    """
+    try:
+        return get_recommendations(Movie, 'movies', 'shared_cast')
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
+
+
+def get_frequent_collaborators():
+    """
+    Get actors appearing most often with actor
+    """
+    try:
+        return get_recommendations(Actor, 'actors', 'shared_movies')
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
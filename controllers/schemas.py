@@ -0,0 +1,55 @@
+from models.actor import Actor
+from models.movie import Movie
+from settings.constants import ACTOR_FIELDS, MOVIE_FIELDS
+from .parse_request import column_converter
+
+
+class Schema(object):
+    """
+    Request data validation compiled once per model from its fields and mapped column types
+    """
+    def __init__(self, model, fields):
+        """
+        model: model class
+        fields: list of accepted fields (all but id are required for new records)
+        """
+        self.fields = frozenset(fields)
+        self.required = tuple(field for field in fields if field != 'id')
+        self._required_set = frozenset(self.required)
+
+        # converter per field, chosen by column type
+        self._converters = tuple(
+            (column.name, column_converter(column)) for column in model.__table__.columns if column.name in self.fields
+        )
+
+    def validate(self, data, partial=False):
+        """
+        Validate record data (values are converted to column types in place)
+
+        data: dict with record fields
+        partial: check only given fields (updates), otherwise all fields but id are required
+        return: error message or None if data is valid
+        """
+        # check if missing fields
+        if not partial and not data.keys() >= self._required_set:
+            missing_fields = [field for field in self.required if field not in data]
+            return f"Missing required fields: {', '.join(missing_fields)}."
+
+        # check for invalid fields
+        if not self.fields.issuperset(data):
+            invalid_fields = [field for field in data if field not in self.fields]
+            return f"Invalid fields: {', '.join(invalid_fields)}."
+
+        # check values
+        try:
+            for field, convert in self._converters:
+                if field in data:
+                    data[field] = convert(data[field])
+        except ValueError as error:
+            return str(error)
+
+        return None
+
+
+actor_schema = Schema(Actor, ACTOR_FIELDS)
+movie_schema = Schema(Movie, MOVIE_FIELDS)
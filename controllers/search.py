@@ -0,0 +1,56 @@
+from flask import jsonify, make_response
+
+from models.actor import Actor
+from models.movie import Movie
+from settings.constants import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT
+from .parse_request import get_request_data, parse_int
+from .serializers import json_response
+
+SEARCH_MODELS = {
+    'actors': Actor,
+    'movies': Movie,
+}
+
+
+def search_names():
+    """
+    Get actors and movies whose names start with query (served from in-memory index)
+    """
+    try:
+        data = get_request_data()
+
+        # validate data ---------------------------------------------------------------------
+        # check if query specified
+        query = data.get('q', '')
+        if not isinstance(query, str):
+            return make_response(jsonify(error='Query must be a string.'), 400)
+
+        query = query.strip()
+        if not query:
+            return make_response(jsonify(error='No query specified.'), 400)
+
+        # check if limit is int
+        try:
+            limit = min(parse_int(data.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+        except ValueError:
+            return make_response(jsonify(error='Limit must be an integer.'), 400)
+
+        if limit < 1:
+            return make_response(jsonify(error='Limit must be a positive integer.'), 400)
+
+        # check if type exists
+        types = data.get('type', ','.join(SEARCH_MODELS))
+        if not isinstance(types, str):
+            return make_response(jsonify(error='Type must be a string.'), 400)
+
+        types = types.split(',')
+        invalid_types = [name for name in types if name not in SEARCH_MODELS]
+        if invalid_types:
+            return make_response(jsonify(error=f"Invalid types: {', '.join(invalid_types)}."), 400)
+        # ------------------------------------------------------------------------------------
+
+        found = {name: SEARCH_MODELS[name].search_index.search(query, limit) for name in types}
+        return json_response(found, 200)
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
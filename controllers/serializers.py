@@ -0,0 +1,111 @@
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+
+from flask import Response, current_app
+from sqlalchemy import Date, DateTime
+from werkzeug.http import http_date
+
+from models.actor import Actor
+from models.movie import Movie
+from settings.constants import ACTOR_FIELDS, MOVIE_FIELDS, JSON_ENCODER
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# dates repeat a lot, so formatted values are cached
+date_to_http = lru_cache(maxsize=65536)(http_date)
+
+
+class Serializer(object):
+    """
+    Record serializer compiled once per model from its mapped columns
+    """
+    def __init__(self, model, fields):
+        """
+        model: model class
+        fields: list of fields to serialize
+        """
+        columns = [column for column in model.__table__.columns if column.name in fields]
+        self.fields = tuple(column.name for column in columns)
+
+        # attrgetter/itemgetter return a tuple only for several fields
+        self._attrs = attrgetter(*self.fields) if len(self.fields) > 1 else lambda obj: (getattr(obj, self.fields[0]),)
+        self._items = itemgetter(*self.fields) if len(self.fields) > 1 else lambda row: (row[self.fields[0]],)
+
+        # dates are written as HTTP dates, the same way flask json provider does
+        self._converters = tuple(
+            (index, date_to_http) for index, column in enumerate(columns) if isinstance(column.type, (Date, DateTime))
+        )
+
+    def from_values(self, values):
+        """
+        Get dict from column values (in order of fields)
+        """
+        if self._converters:
+            values = list(values)
+            for index, convert in self._converters:
+                if values[index] is not None:
+                    values[index] = convert(values[index])
+        return dict(zip(self.fields, values))
+
+    def dump(self, obj):
+        """
+        Get dict from model object
+        """
+        try:
+            # loaded values are read from instance state, skipping attribute instrumentation
+            values = self._items(obj.__dict__)
+        except KeyError:
+            values = self._attrs(obj)
+        return self.from_values(values)
+
+    def dump_mapping(self, row):
+        """
+        Get dict from mapping with record columns (e.g. result of Model.get_by_id)
+        """
+        return self.from_values(self._items(row))
+
+    def dump_many(self, objs):
+        """
+        Get list of dicts from model objects
+        """
+        return [self.dump(obj) for obj in objs]
+
+
+actor_serializer = Serializer(Actor, ACTOR_FIELDS)
+movie_serializer = Serializer(Movie, MOVIE_FIELDS)
+
+
+def add_related(records, related, relation, serializer):
+    """
+    Add related records to serialized records (in place)
+
+    records: list of dicts with id
+    related: dict record id -> list of related columns tuples in order of serializer fields (Model.get_related)
+    relation: key of related records (cast or filmography)
+    serializer: serializer of related records
+    return: records
+    """
+    for record in records:
+        record[relation] = [serializer.from_values(values) for values in related.get(record['id'], ())]
+
+    return records
+
+
+def dumps(data):
+    """
+    Encode data to JSON bytes (orjson if installed and enabled, flask json provider otherwise)
+    """
+    if orjson is not None and JSON_ENCODER == 'orjson':
+        return orjson.dumps(data)
+
+    return current_app.json.dumps(data).encode()
+
+
+def json_response(data, status=200):
+    """
+    Get JSON response encoded with dumps
+    """
+    return Response(dumps(data), status=status, mimetype='application/json')
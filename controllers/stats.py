@@ -0,0 +1,34 @@
+from flask import jsonify, make_response
+
+from models.actor import Actor
+from models.movie import Movie
+from models.relations import association
+from models.summary import CAST_SIZE, get_summary
+from .conditional import cached_json_response
+
+
+def get_stats():
+    """
+    Get catalog statistics (served from summary counters, no full-table aggregates)
+    """
+    try:
+        def build():
+            counters = get_summary()
+            stats = {}
+
+            for model in (Actor, Movie):
+                table = model.__tablename__
+                fields = {field: counters.get(f'{table}.{field}', {}) for field in model.summary_fields}
+
+                # every record is counted once per field, so any field gives the total
+                stats[table] = dict(total=sum(fields[model.summary_fields[0]].values()), **fields)
+
+            stats[Movie.__tablename__]['cast_size'] = counters.get(CAST_SIZE, {})
+            return stats
+
+        # counters change only with writes to these tables
+        tables = (Actor.__tablename__, Movie.__tablename__, association.name)
+        return cached_json_response(tables, (), build)
+
+    except Exception as error:
+        return make_response(jsonify(error=str(error)), 500)
@@ -1,22 +1,126 @@
+import threading
+import time
+
+# import of flask, sqlalchemy and the modules below is part of startup time (STARTUP_TIMINGS)
+IMPORT_STARTED = time.perf_counter()
+
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine
 
-from settings.constants import DB_URL
+from settings.constants import DB_URL, DB_POOL_WARMUP, DB_REPLICA_URLS, INDEXES_WARMUP, METRICS_ENABLED
+from controllers.parse_request import parse_request_body
+from core.metrics import abort_request, finish_request, start_request
+from core.queries import finish_query_log, start_query_log, stop_query_log
+from core.pool import engine_options, engines, warm_up
+from core.routing import RoutingSession, replicas, route_request, stick_to_primary
+from core.schema import ensure_schema, schema_table
+from core.startup import StartupTimer
 
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options=dict(class_=RoutingSession))
+# schema fingerprint, create_all runs only when models changed
+schema_info = schema_table(db.metadata)
 
 def create_app():
     """Construct the core application."""
+    timer = StartupTimer()
     app = Flask(__name__, instance_relative_config=False)
     app.config['SQLALCHEMY_DATABASE_URI'] = DB_URL
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(DB_URL)
     
     db.init_app(app)
 
+    # per-route request counters and latency histograms for /metrics
+    if METRICS_ENABLED:
+        app.before_request(start_request)
+        app.after_request(finish_request)
+        app.teardown_request(abort_request)
+
+    # statements per request, headers in debug mode, warnings for repeated statements (N+1)
+    app.before_request(start_query_log)
+    app.after_request(finish_query_log)
+    app.teardown_request(stop_query_log)
+
+    # GET requests read from replicas, clients that just wrote read from primary
+    replicas[:] = [create_engine(url, **engine_options(url)) for url in DB_REPLICA_URLS]
+    app.before_request(route_request)
+    app.after_request(stick_to_primary)
+
+    # JSON and MessagePack bodies are decoded once, malformed bodies never reach the views
+    app.before_request(parse_request_body)
+    timer.step('app')
+
     with app.app_context():
         from . import routes
+        from .cli import import_data
+        from models.actor import Actor
+        from models.movie import Movie
+        from models.summary import build_summary
+        app.cli.add_command(import_data)
+        timer.step('imports')
+
+        # open pool connections before the first requests, stats are served by /internal/pool
+        engines['primary'] = db.engine
+        warm_up(db.engine, DB_POOL_WARMUP)
+
+        for number, replica in enumerate(replicas):
+            engines[f'replica-{number}'] = replica
+            warm_up(replica, DB_POOL_WARMUP)
+        timer.step('pool')
+
+        schema_created = ensure_schema(db.engine, db.metadata)
+        timer.step('schema')
+
+        # counters for /api/stats, aggregated only by the first start
+        build_summary([Actor, Movie])
+        timer.step('summary')
+
+        # served by /internal/startup, completed when indexes are loaded
+        extra = dict(import_time=IMPORT_TIME, schema_created=schema_created)
+
+        if INDEXES_WARMUP == 'startup':
+            load_indexes(app, timer, extra)
+        else:
+            for index in (Actor.search_index, Movie.search_index, Actor.graph):
+                index.loading()
+            threading.Thread(target=load_indexes, args=(app, timer, extra), name='indexes-warm-up', daemon=True).start()
+
+        app.config.setdefault('STARTUP_TIMINGS', timer.report(indexes_loaded=False, **extra))
+        app.logger.info('Started in %.3f s: %s', timer.total(), app.config['STARTUP_TIMINGS'])
+
+        return app
+
+
+def load_indexes(app, timer, extra):
+    """
+    Load in-memory name indexes for /api/search and co-star graph for /api/actor-path, /api/actor-costars
+    and recommendations (before serving or in background thread, see INDEXES_WARMUP)
+
+    app: application
+    timer: StartupTimer of create_app
+    extra: values added to startup timings
+    """
+    from models.actor import Actor
+    from models.movie import Movie
+
+    with app.app_context():
+        try:
+            Actor.build_search_index()
+            Movie.build_search_index()
+            timer.step('search_index')
+
+            Actor.build_graph()
+            timer.step('graph')
+        except Exception:
+            app.logger.exception('Loading search indexes and graph failed')
+        finally:
+            # lookups don't wait forever if loading failed
+            for index in (Actor.search_index, Movie.search_index, Actor.graph):
+                index.ready()
+
+    app.config['STARTUP_TIMINGS'] = timer.report(indexes_loaded=True, **extra)
 
-        db.create_all()
 
-        return app
\ No newline at end of file
+IMPORT_TIME = time.perf_counter() - IMPORT_STARTED
\ No newline at end of file
@@ -0,0 +1,248 @@
+import random
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qsl
+
+from a2wsgi import WSGIMiddleware
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+
+from controllers.parse_request import body_format, decode_body
+from core import create_app
+from core.metrics import metrics
+from core.pool import engine_options, engines
+from core.queries import QueryLog, current_log, warn_repeated
+from core.routing import use_replica
+from settings.constants import (
+    DB_URL, ASYNC_DB_URL, ASGI_WSGI_WORKERS, DB_POOL_WARMUP, DB_REPLICA_URLS, METRICS_ENABLED, QUERY_DEBUG,
+    ACTOR_FILTER_FIELDS, ACTOR_RANGE_FIELDS, ACTOR_SORT_FIELDS,
+    MOVIE_FILTER_FIELDS, MOVIE_RANGE_FIELDS, MOVIE_SORT_FIELDS,
+)
+
+# async drivers for sync database URLs
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg',
+}
+
+
+def async_db_url(url):
+    """
+    Get async driver URL of database URL (postgresql://... -> postgresql+asyncpg://...)
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No async driver for {backend} database.')
+
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+async def get_request_data(request):
+    """
+    Get keys & values from query string, urlencoded, JSON or MessagePack body (same as parse_request.get_request_data)
+    """
+    data = dict(request.query_params)
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    fmt = body_format(mimetype)
+
+    if mimetype == 'application/x-www-form-urlencoded':
+        body = await request.body()
+        data.update(parse_qsl(body.decode(), keep_blank_values=True))
+
+    elif fmt:
+        body = decode_body(fmt, await request.body())
+        if isinstance(body, dict):
+            data.update(body)
+
+    return data
+
+
+def create_asgi_app():
+    """
+    Construct the core application for ASGI servers (uvicorn asgi:app)
+
+    GET list and get-by-id views run on async SQLAlchemy sessions, so waiting on the database
+    or on slow clients doesn't hold a thread. They run the same request handlers as the Flask
+    views (controllers.reads), only statements are executed on async sessions. All other routes
+    are served by the Flask app from create_app in a thread pool. Both share the process caches,
+    indexes and graph.
+    """
+    flask_app = create_app()
+
+    # imported after create_app, models and controllers need the app to be set up
+    from models.actor import Actor
+    from models.movie import Movie
+    from controllers.reads import list_records, get_record
+    from controllers.serializers import actor_serializer, movie_serializer, dumps
+
+    url = ASYNC_DB_URL or async_db_url(DB_URL)
+    engine = create_async_engine(url, **engine_options(url, asyncio=True))
+    engines['async'] = engine.sync_engine
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    # async engines of read replicas (routes served by Flask use replicas set up by create_app)
+    replica_engines = []
+    for number, replica_url in enumerate(DB_REPLICA_URLS):
+        replica_url = async_db_url(replica_url)
+        replica_engines.append(create_async_engine(replica_url, **engine_options(replica_url, asyncio=True)))
+        engines[f'async-replica-{number}'] = replica_engines[-1].sync_engine
+    replica_factories = [async_sessionmaker(replica, expire_on_commit=False) for replica in replica_engines]
+
+    def choose_session(request):
+        """
+        Get session factory of request (same routing as core.routing.route_request)
+
+        return: tuple (session factory, True if it reads from a replica)
+        """
+        if replica_factories and use_replica(request.method, request.cookies):
+            return random.choice(replica_factories), True
+
+        return session_factory, False
+
+    def json_response(data, status=200):
+        # flask json provider (used without orjson) needs app context
+        with flask_app.app_context():
+            body = dumps(data)
+
+        return Response(body, status_code=status, media_type='application/json')
+
+    async def run(handler, factory):
+        """
+        Run statements of request handler on one async session (see controllers.reads.run),
+        the session is opened only if the handler needs the database
+        """
+        session = None
+        try:
+            stmt = next(handler)
+            while True:
+                if session is None:
+                    session = factory()
+                stmt = handler.send(await session.execute(stmt))
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            if session is not None:
+                await session.close()
+
+    async def respond(handler, factory):
+        """
+        Get response of request handler
+        """
+        # flask json provider (used without orjson) needs app context
+        with flask_app.app_context():
+            status, body, etag = await run(handler, factory)
+
+        headers = {'ETag': f'"{etag}"'} if etag else None
+        return Response(body, status_code=status, media_type='application/json' if body is not None else None, headers=headers)
+
+    def list_view(model, serializer, name, query_fields, relation, rel_serializer):
+        """
+        Get async view with page of filtered and sorted records (see controllers.reads.list_records)
+        """
+        async def view(request):
+            try:
+                try:
+                    data = await get_request_data(request)
+                except ValueError as error:
+                    return json_response(dict(error=str(error)), 400)
+
+                factory, replica = choose_session(request)
+                handler = list_records(
+                    model, serializer, name, query_fields, relation, rel_serializer,
+                    data, request.headers.get('if-none-match'), replica,
+                )
+                return await respond(handler, factory)
+
+            except Exception as error:
+                return json_response(dict(error=str(error)), 400)
+
+        return view
+
+    def record_view(model, serializer, relation, rel_serializer):
+        """
+        Get async view with record by id (see controllers.reads.get_record)
+        """
+        async def view(request):
+            try:
+                try:
+                    data = await get_request_data(request)
+                except ValueError as error:
+                    return json_response(dict(error=str(error)), 400)
+
+                factory, replica = choose_session(request)
+                handler = get_record(model, serializer, relation, rel_serializer, data, replica)
+                return await respond(handler, factory)
+
+            except Exception as error:
+                return json_response(dict(error=str(error)), 500)
+
+        return view
+
+    def instrumented(route, view):
+        """
+        Record requests of async view in request metrics (routes served by Flask are recorded by its hooks)
+        """
+        if not METRICS_ENABLED:
+            return view
+
+        async def wrapper(request):
+            metrics.start(route, request.method)
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = await view(request)
+                status = response.status_code
+                return response
+            finally:
+                metrics.finish(route, request.method, status, time.perf_counter() - start)
+
+        return wrapper
+
+    def query_logged(view):
+        """
+        Count statements of async view (same as core.queries hooks of routes served by Flask)
+        """
+        async def wrapper(request):
+            token = current_log.set(QueryLog())
+            try:
+                response = await view(request)
+                log = current_log.get()
+
+                with flask_app.app_context():
+                    warn_repeated(log, request.url.path)
+                if QUERY_DEBUG or flask_app.debug:
+                    response.headers.update(log.headers())
+
+                return response
+            finally:
+                current_log.reset(token)
+
+        return wrapper
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # open pool connections before the first requests
+        for async_engine in [engine] + replica_engines:
+            size = async_engine.pool.size() if hasattr(async_engine.pool, 'size') else 1
+            connections = [await async_engine.connect() for _ in range(min(DB_POOL_WARMUP, size))]
+            for connection in connections:
+                await connection.close()
+
+        yield
+        for async_engine in [engine] + replica_engines:
+            await async_engine.dispose()
+
+    routes = [
+        Route('/api/actors', instrumented('/api/actors', query_logged(list_view(Actor, actor_serializer, 'actors', (ACTOR_FILTER_FIELDS, ACTOR_RANGE_FIELDS, ACTOR_SORT_FIELDS), 'filmography', movie_serializer))), methods=['GET']),
+        Route('/api/movies', instrumented('/api/movies', query_logged(list_view(Movie, movie_serializer, 'movies', (MOVIE_FILTER_FIELDS, MOVIE_RANGE_FIELDS, MOVIE_SORT_FIELDS), 'cast', actor_serializer))), methods=['GET']),
+        Route('/api/actor', instrumented('/api/actor', query_logged(record_view(Actor, actor_serializer, 'filmography', movie_serializer))), methods=['GET']),
+        Route('/api/movie', instrumented('/api/movie', query_logged(record_view(Movie, movie_serializer, 'cast', actor_serializer))), methods=['GET']),
+        # everything else (writes, exports, search, graph, stats, other methods of routes above)
+        Mount('/', app=WSGIMiddleware(flask_app, workers=ASGI_WSGI_WORKERS)),
+    ]
+
+    return Starlette(routes=routes, lifespan=lifespan)
@@ -0,0 +1,130 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    Bounded LRU cache with TTL and hit/miss/eviction counters (thread-safe)
+
+    Any object with the same get/set/delete/clear/stats methods can be used instead
+    (e.g. a wrapper around a shared cache server).
+    """
+    def __init__(self, maxsize=1024, ttl=60):
+        """
+        maxsize: max number of entries (0 disables caching)
+        ttl: seconds an entry stays valid
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        """
+        Get value by key (default if key is missing or expired)
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """
+        Set value by key, evict least recently used entries over maxsize
+        """
+        if self.maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """
+        Remove entry by key if present
+        """
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """
+        Remove all entries
+        """
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Get cache counters
+        """
+        with self._lock:
+            return dict(
+                size=len(self._data),
+                maxsize=self.maxsize,
+                ttl=self.ttl,
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                expirations=self.expirations,
+            )
+
+
+class TableVersions(object):
+    """
+    Per-table version counters and times of writes, bumped after every committed write (thread-safe)
+
+    Counters live in process memory and see only writes of this worker, they guard reads from
+    replicas (core.routing.may_cache). Cached records, keys of cached responses and ETags use versions
+    stored in the database (Model.current_versions), which see writes of all workers.
+    """
+    def __init__(self):
+        self._versions = {}
+        self._changed = {}
+        self._lock = threading.Lock()
+
+    def get(self, *tables):
+        """
+        Get current versions of tables
+        """
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def bump(self, *tables):
+        """
+        Increase versions of tables
+        """
+        with self._lock:
+            now = time.monotonic()
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+                self._changed[table] = now
+
+    def age(self, *tables):
+        """
+        Get seconds since the last bump of any of tables (infinity if none was bumped)
+        """
+        with self._lock:
+            changed = [self._changed[table] for table in tables if table in self._changed]
+
+        return time.monotonic() - max(changed) if changed else float('inf')
@@ -0,0 +1,43 @@
+import json
+
+import click
+from flask.cli import with_appcontext
+
+from controllers.importer import IMPORT_FORMATS, import_stream, new_report, validate_relation
+from controllers.schemas import actor_schema, movie_schema
+from models.actor import Actor
+from models.movie import Movie
+
+# table argument -> (validation, model), association rows have no model
+IMPORT_TABLES = {
+    'actors': (actor_schema.validate, Actor),
+    'movies': (movie_schema.validate, Movie),
+    'relations': (validate_relation, None),
+}
+
+
+@click.command('import-data')
+@click.argument('table', type=click.Choice(list(IMPORT_TABLES)))
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default='csv', show_default=True)
+@with_appcontext
+def import_data(table, file, fmt):
+    """
+    Import actors, movies or relations from CSV or NDJSON file ("-" for stdin)
+
+    Example: flask --app run import-data actors actors.csv
+
+    Cached records, responses and ETags of running servers follow the import (table versions are shared
+    through database), but their in-memory search index, collaboration graph and recommendations
+    pick up imported rows only after restart.
+    """
+    validate, model = IMPORT_TABLES[table]
+    report = new_report()
+
+    try:
+        import_stream(file, fmt, validate, model, report)
+    except Exception as error:
+        click.echo(json.dumps(report))
+        raise click.ClickException(str(error))
+
+    click.echo(json.dumps(report))
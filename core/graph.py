@@ -0,0 +1,400 @@
+import threading
+from array import array
+from bisect import bisect_left
+
+
+def build_csr(rows):
+    """
+    Build CSR adjacency from (source, target) rows sorted by source
+
+    rows: iterable of (source id, target id) sorted by source id
+    return: tuple (offsets, targets), neighbours of node i are targets[offsets[i]:offsets[i + 1]]
+    """
+    targets = array('q')
+    counts = array('q')
+
+    for source, target in rows:
+        if source >= len(counts):
+            counts.extend(array('q', [0]) * (source + 1 - len(counts)))
+        counts[source] += 1
+        targets.append(target)
+
+    offsets = array('q', [0]) * (len(counts) + 1)
+    total = 0
+    for node, count in enumerate(counts):
+        total += count
+        offsets[node + 1] = total
+
+    return offsets, targets
+
+
+def merge_csr(offsets, targets, added, removed):
+    """
+    Build CSR arrays of graph arrays with pairs added and removed (neighbours stay sorted)
+
+    offsets, targets: CSR arrays (see build_csr)
+    added: set of (source id, target id) pairs missing in arrays
+    removed: set of (source id, target id) pairs present in arrays
+    return: tuple (offsets, targets)
+    """
+    added_by, removed_by = {}, {}
+    for source, target in added:
+        added_by.setdefault(source, []).append(target)
+    for source, target in removed:
+        removed_by.setdefault(source, set()).add(target)
+
+    nodes = max(len(offsets) - 1, max(added_by, default=-1) + 1)
+    new_offsets, new_targets = array('q', [0]), array('q')
+
+    for node in range(nodes):
+        # unchanged neighbours are copied as array slices
+        current = targets[offsets[node]:offsets[node + 1]] if node + 1 < len(offsets) else array('q')
+        if node in added_by or node in removed_by:
+            gone = removed_by.get(node, ())
+            current = array('q', sorted([target for target in current if target not in gone] + added_by.get(node, [])))
+
+        new_targets.extend(current)
+        new_offsets.append(len(new_targets))
+
+    return new_offsets, new_targets
+
+
+class CollaborationGraph(object):
+    """
+    Actor-movie bipartite graph in compact CSR arrays with an overlay of incremental changes (thread-safe)
+
+    Edges added or removed after loading are kept in the overlay and merged into new CSR arrays
+    once the overlay grows past compact_ratio of the graph. Merging runs on a background thread,
+    readers and writers wait only for the swap of arrays. The graph lives in process memory
+    and sees only writes made through this process. While it's loaded in background (see loading),
+    lookups and changes wait for the load.
+    """
+    def __init__(self, compact_ratio=0.1):
+        self.compact_ratio = compact_ratio
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._compacting = None   # thread merging overlay into new arrays
+        self._generation = 0      # bumped by load, so merges of replaced content are dropped
+        self._ready = threading.Event()
+        self._ready.set()
+        self._reset()
+
+    def _reset(self):
+        self._actor_offsets, self._actor_movies = array('q', [0]), array('q')
+        self._movie_offsets, self._movie_actors = array('q', [0]), array('q')
+        self._added_movies = {}   # actor -> set of movies
+        self._added_actors = {}   # movie -> set of actors
+        self._removed = set()     # (actor, movie) pairs removed from CSR arrays
+        self._overlay = 0         # number of added and removed pairs
+        self._edges = 0
+
+    def loading(self):
+        """
+        Mark graph as being loaded, lookups and changes wait until load (or ready) is called
+        """
+        self._ready.clear()
+
+    def ready(self):
+        """
+        Let lookups and changes through (called by load, or when load failed)
+        """
+        self._ready.set()
+
+    def load(self, actor_rows, movie_rows):
+        """
+        Replace graph content
+
+        actor_rows: iterable of (actor id, movie id) sorted by actor id
+        movie_rows: iterable of (movie id, actor id) sorted by movie id
+        """
+        with self._lock:
+            self._reset()
+            self._actor_offsets, self._actor_movies = build_csr(actor_rows)
+            self._movie_offsets, self._movie_actors = build_csr(movie_rows)
+            self._edges = len(self._actor_movies)
+            self._generation += 1
+            self.loaded = True
+
+        self.ready()
+
+    @staticmethod
+    def _slice(offsets, targets, node):
+        if node + 1 >= len(offsets):
+            return ()
+        return targets[offsets[node]:offsets[node + 1]]
+
+    @staticmethod
+    def _contains(offsets, targets, node, target):
+        """
+        Check if target is a neighbour of node in CSR arrays (binary search, neighbours are sorted)
+        """
+        if node + 1 >= len(offsets):
+            return False
+        end = offsets[node + 1]
+        index = bisect_left(targets, target, offsets[node], end)
+        return index < end and targets[index] == target
+
+    def movies_of(self, actor_id):
+        """
+        Get movies of actor
+        """
+        self._ready.wait()
+        with self._lock:
+            movies = [
+                movie for movie in self._slice(self._actor_offsets, self._actor_movies, actor_id)
+                if (actor_id, movie) not in self._removed
+            ]
+            movies.extend(self._added_movies.get(actor_id, ()))
+            return movies
+
+    def actors_of(self, movie_id):
+        """
+        Get actors of movie
+        """
+        self._ready.wait()
+        with self._lock:
+            actors = [
+                actor for actor in self._slice(self._movie_offsets, self._movie_actors, movie_id)
+                if (actor, movie_id) not in self._removed
+            ]
+            actors.extend(self._added_actors.get(movie_id, ()))
+            return actors
+
+    def add_edges(self, pairs):
+        """
+        Add (actor id, movie id) pairs, existing pairs are ignored
+
+        return: list of added pairs
+        """
+        changed = []
+
+        self._ready.wait()
+        with self._lock:
+            if not self.loaded:
+                return changed
+
+            for actor_id, movie_id in pairs:
+                if (actor_id, movie_id) in self._removed:
+                    self._removed.discard((actor_id, movie_id))
+                    self._overlay -= 1
+                elif not self._contains(self._actor_offsets, self._actor_movies, actor_id, movie_id):
+                    added = self._added_movies.setdefault(actor_id, set())
+                    if movie_id in added:
+                        continue
+                    added.add(movie_id)
+                    self._added_actors.setdefault(movie_id, set()).add(actor_id)
+                    self._overlay += 1
+                else:
+                    continue
+
+                self._edges += 1
+                changed.append((actor_id, movie_id))
+
+            self._maybe_compact()
+
+        return changed
+
+    def remove_edges(self, pairs):
+        """
+        Remove (actor id, movie id) pairs, missing pairs are ignored
+
+        return: list of removed pairs
+        """
+        changed = []
+
+        self._ready.wait()
+        with self._lock:
+            if not self.loaded:
+                return changed
+
+            for actor_id, movie_id in pairs:
+                added = self._added_movies.get(actor_id)
+                if added and movie_id in added:
+                    added.discard(movie_id)
+                    self._added_actors[movie_id].discard(actor_id)
+                    self._overlay -= 1
+                elif (actor_id, movie_id) not in self._removed and \
+                        self._contains(self._actor_offsets, self._actor_movies, actor_id, movie_id):
+                    self._removed.add((actor_id, movie_id))
+                    self._overlay += 1
+                else:
+                    continue
+
+                self._edges -= 1
+                changed.append((actor_id, movie_id))
+
+            self._maybe_compact()
+
+        return changed
+
+    def remove_actor(self, actor_id):
+        """
+        Remove all edges of actor
+
+        return: list of removed pairs
+        """
+        self._ready.wait()
+        with self._lock:
+            return self.remove_edges([(actor_id, movie_id) for movie_id in self.movies_of(actor_id)])
+
+    def remove_movie(self, movie_id):
+        """
+        Remove all edges of movie
+
+        return: list of removed pairs
+        """
+        self._ready.wait()
+        with self._lock:
+            return self.remove_edges([(actor_id, movie_id) for actor_id in self.actors_of(movie_id)])
+
+    def _added_pairs(self):
+        return {(actor_id, movie_id) for actor_id, movies in self._added_movies.items() for movie_id in movies}
+
+    def _maybe_compact(self):
+        if self._compacting is None and self._overlay > max(self._edges, 1000) * self.compact_ratio:
+            self._compacting = threading.Thread(target=self._compact, name='graph-compact', daemon=True)
+            self._compacting.start()
+
+    def _compact(self):
+        """
+        Merge overlay into new CSR arrays (background thread), then swap them in
+
+        Changes made while merging stay in the overlay, computed against the new arrays.
+        """
+        try:
+            with self._lock:
+                generation = self._generation
+                actor_csr = self._actor_offsets, self._actor_movies
+                movie_csr = self._movie_offsets, self._movie_actors
+                added, removed = self._added_pairs(), set(self._removed)
+
+            # arrays are never changed in place, so they are read without the lock
+            actor_csr = merge_csr(*actor_csr, added, removed)
+            movie_csr = merge_csr(
+                *movie_csr, {(movie, actor) for actor, movie in added}, {(movie, actor) for actor, movie in removed}
+            )
+
+            with self._lock:
+                if generation != self._generation:
+                    return
+
+                live_added, live_removed = self._added_pairs(), self._removed
+                # pairs of current graph missing in new arrays, and pairs of new arrays gone since
+                next_added = (live_added - added) | (removed - live_removed)
+                next_removed = (added - live_added) | (live_removed - removed)
+
+                self._actor_offsets, self._actor_movies = actor_csr
+                self._movie_offsets, self._movie_actors = movie_csr
+                self._added_movies, self._added_actors = {}, {}
+                for actor_id, movie_id in next_added:
+                    self._added_movies.setdefault(actor_id, set()).add(movie_id)
+                    self._added_actors.setdefault(movie_id, set()).add(actor_id)
+                self._removed = next_removed
+                self._overlay = len(next_added) + len(next_removed)
+        finally:
+            with self._lock:
+                self._compacting = None
+
+    def snapshot(self):
+        """
+        Get CSR arrays and overlay (arrays are replaced, never changed in place, so they can be shared)
+
+        return: tuple (actor offsets, actor movies, movie offsets, movie actors, added pairs, removed pairs)
+        """
+        self._ready.wait()
+        with self._lock:
+            added = list(self._added_pairs())
+            return (
+                self._actor_offsets, self._actor_movies,
+                self._movie_offsets, self._movie_actors,
+                added, list(self._removed),
+            )
+
+    def costars(self, actor_id):
+        """
+        Get ids of actors who appeared in a movie with actor
+        """
+        self._ready.wait()
+        with self._lock:
+            found = set()
+            for movie_id in self.movies_of(actor_id):
+                found.update(self.actors_of(movie_id))
+            found.discard(actor_id)
+            return found
+
+    def shortest_path(self, source, target, max_depth=6):
+        """
+        Get shortest collaboration path between two actors (bidirectional BFS)
+
+        source: actor id
+        target: actor id
+        max_depth: max number of movies in path
+        return: list of alternating actor and movie ids starting with source and ending with target,
+                or None if actors are not connected within max_depth
+        """
+        self._ready.wait()
+        with self._lock:
+            if source == target:
+                return [source]
+
+            # parents[side][actor] = (previous actor, movie) towards source/target
+            parents = ({source: None}, {target: None})
+            frontiers = ([source], [target])
+            seen_movies = (set(), set())
+
+            for _ in range(max_depth):
+                # expand the smaller frontier by one actor-movie-actor hop
+                side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+                other = 1 - side
+                next_frontier = []
+
+                for actor_id in frontiers[side]:
+                    for movie_id in self.movies_of(actor_id):
+                        if movie_id in seen_movies[side]:
+                            continue
+                        seen_movies[side].add(movie_id)
+
+                        for costar_id in self.actors_of(movie_id):
+                            if costar_id in parents[side]:
+                                continue
+                            parents[side][costar_id] = (actor_id, movie_id)
+
+                            if costar_id in parents[other]:
+                                return self._join_path(parents, costar_id)
+                            next_frontier.append(costar_id)
+
+                if not next_frontier:
+                    return None
+                frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+
+            return None
+
+    @staticmethod
+    def _join_path(parents, meeting):
+        """
+        Join halves of path found from both ends at meeting actor
+        """
+        path = [meeting]
+        node = meeting
+        while parents[0][node] is not None:
+            node, movie_id = parents[0][node]
+            path[:0] = [node, movie_id]
+
+        node = meeting
+        while parents[1][node] is not None:
+            node, movie_id = parents[1][node]
+            path.extend([movie_id, node])
+
+        return path
+
+    def stats(self):
+        """
+        Get graph size
+        """
+        with self._lock:
+            return dict(
+                loaded=self.loaded,
+                edges=self._edges,
+                overlay=self._overlay,
+                compacting=self._compacting is not None,
+            )
@@ -0,0 +1,188 @@
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request
+
+from settings.constants import METRICS_BUCKETS
+
+# route label of requests not matching any route (404), keeps number of series bounded
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class RouteMetrics(object):
+    """
+    Counters and latency histogram of one (route, method)
+    """
+    __slots__ = ('requests', 'errors', 'in_flight', 'buckets', 'duration', 'statuses')
+
+    def __init__(self, buckets):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        # non-cumulative counts, last one for durations above all bounds (+Inf)
+        self.buckets = [0] * (buckets + 1)
+        self.duration = 0.0
+        self.statuses = {}
+
+
+class RequestMetrics(object):
+    """
+    Request count, error count (5xx), per-status counts, in-flight gauge and latency histogram
+    per route and method (thread-safe)
+
+    Recording a request is a bisect and a few increments under a lock,
+    cumulative buckets and text format are built only when metrics are scraped.
+    """
+    def __init__(self, buckets):
+        self.bounds = sorted(buckets)
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def _route(self, route, method):
+        """
+        Get metrics of route (caller holds lock)
+        """
+        metrics = self._routes.get((route, method))
+        if metrics is None:
+            metrics = self._routes[(route, method)] = RouteMetrics(len(self.bounds))
+        return metrics
+
+    def start(self, route, method):
+        """
+        Count request as in flight
+        """
+        with self._lock:
+            self._route(route, method).in_flight += 1
+
+    def finish(self, route, method, status, duration):
+        """
+        Record finished request
+
+        route: route rule, e.g. '/api/actor'
+        method: HTTP method
+        status: response status code
+        duration: seconds from start of request
+        """
+        # le bounds are inclusive
+        bucket = bisect_left(self.bounds, duration)
+
+        with self._lock:
+            metrics = self._route(route, method)
+            metrics.in_flight -= 1
+            metrics.requests += 1
+            metrics.errors += status >= 500
+            metrics.buckets[bucket] += 1
+            metrics.duration += duration
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def snapshot(self):
+        """
+        Get copy of metrics
+
+        return: dict (route, method) -> dict with counters, cumulative buckets (list of (bound, count)) and statuses
+        """
+        with self._lock:
+            routes = {
+                key: (metrics.requests, metrics.errors, metrics.in_flight, list(metrics.buckets), metrics.duration, dict(metrics.statuses))
+                for key, metrics in self._routes.items()
+            }
+
+        found = {}
+        for key, (requests, errors, in_flight, buckets, duration, statuses) in sorted(routes.items()):
+            total, cumulative = 0, []
+            for bound, count in zip(self.bounds + [float('inf')], buckets):
+                total += count
+                cumulative.append((bound, total))
+
+            found[key] = dict(
+                requests=requests, errors=errors, in_flight=in_flight,
+                buckets=cumulative, duration=duration, statuses=statuses,
+            )
+
+        return found
+
+    def render(self):
+        """
+        Get metrics in Prometheus text format (version 0.0.4)
+        """
+        routes = self.snapshot()
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def labels(route, method, **extra):
+            pairs = dict(route=route, method=method, **extra)
+            return ','.join(f'{key}="{escape(value)}"' for key, value in pairs.items())
+
+        family('http_requests_total', 'counter', 'Finished requests by route and method.')
+        for (route, method), metrics in routes.items():
+            lines.append(f'http_requests_total{{{labels(route, method)}}} {metrics["requests"]}')
+
+        family('http_request_errors_total', 'counter', 'Requests answered with 5xx status by route and method.')
+        for (route, method), metrics in routes.items():
+            lines.append(f'http_request_errors_total{{{labels(route, method)}}} {metrics["errors"]}')
+
+        family('http_responses_total', 'counter', 'Finished requests by route, method and status code.')
+        for (route, method), metrics in routes.items():
+            for status, count in sorted(metrics['statuses'].items()):
+                lines.append(f'http_responses_total{{{labels(route, method, status=str(status))}}} {count}')
+
+        family('http_requests_in_flight', 'gauge', 'Requests being processed by route and method.')
+        for (route, method), metrics in routes.items():
+            lines.append(f'http_requests_in_flight{{{labels(route, method)}}} {metrics["in_flight"]}')
+
+        family('http_request_duration_seconds', 'histogram', 'Request latency by route and method.')
+        for (route, method), metrics in routes.items():
+            for bound, count in metrics['buckets']:
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(f'http_request_duration_seconds_bucket{{{labels(route, method, le=le)}}} {count}')
+            lines.append(f'http_request_duration_seconds_sum{{{labels(route, method)}}} {metrics["duration"]!r}')
+            lines.append(f'http_request_duration_seconds_count{{{labels(route, method)}}} {metrics["requests"]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value):
+    """
+    Escape Prometheus label value
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = RequestMetrics(METRICS_BUCKETS)
+
+
+def start_request():
+    """
+    Count request as in flight (before_request hook)
+    """
+    # every access through request proxy looks up the context, resolve it once
+    current = request._get_current_object()
+    route = current.url_rule.rule if current.url_rule is not None else UNMATCHED_ROUTE
+    g.metrics_request = route, current.method, time.perf_counter()
+    metrics.start(route, current.method)
+
+
+def finish_request(response):
+    """
+    Record status and latency of request (after_request hook)
+    """
+    started = g.pop('metrics_request', None)
+    if started is not None:
+        route, method, start = started
+        metrics.finish(route, method, response.status_code, time.perf_counter() - start)
+
+    return response
+
+
+def abort_request(error):
+    """
+    Record request ended by unhandled exception as 500 (teardown_request hook)
+    """
+    started = g.pop('metrics_request', None)
+    if started is not None:
+        route, method, start = started
+        metrics.finish(route, method, 500, time.perf_counter() - start)
@@ -0,0 +1,155 @@
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from settings.constants import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+)
+
+# engines shown by /internal/pool, name -> engine
+engines = {}
+
+
+class PoolMetrics(object):
+    """
+    Pool checkout counters (thread-safe)
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.connects = 0
+        self.invalidations = 0
+
+    def checkout(self, wait):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_time += wait
+            self.max_wait_time = max(self.max_wait_time, wait)
+
+    def timeout(self, wait):
+        with self._lock:
+            self.timeouts += 1
+            self.wait_time += wait
+            self.max_wait_time = max(self.max_wait_time, wait)
+
+    def connect(self, *args):
+        with self._lock:
+            self.connects += 1
+
+    def invalidate(self, *args):
+        with self._lock:
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                checkouts=self.checkouts,
+                timeouts=self.timeouts,
+                wait_time=round(self.wait_time, 6),
+                max_wait_time=round(self.max_wait_time, 6),
+                connects=self.connects,
+                invalidations=self.invalidations,
+            )
+
+
+class InstrumentedPoolMixin(object):
+    """
+    Pool mixin measuring time spent waiting for a connection and counting timeouts
+    """
+    def __init__(self, *args, **kwargs):
+        recreated = '_dispatch' in kwargs
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+        # new DBAPI connections and connections dropped by pre-ping or errors
+        # (listeners are copied to pools made by recreate, which keep the same metrics)
+        if not recreated:
+            event.listen(self, 'connect', self.metrics.connect)
+            event.listen(self, 'invalidate', self.metrics.invalidate)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.timeout(time.perf_counter() - start)
+            raise
+
+        self.metrics.checkout(time.perf_counter() - start)
+        return connection
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(url, asyncio=False):
+    """
+    Get create_engine options with pool settings from constants
+
+    url: database URL
+    asyncio: options for async engine
+    return: dict with options (empty for in-memory SQLite, it has a single connection)
+    """
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}
+
+    return dict(
+        poolclass=InstrumentedAsyncQueuePool if asyncio else InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+
+
+def warm_up(engine, count):
+    """
+    Open pool connections ahead of the first requests
+
+    engine: sync engine
+    count: number of connections (at most pool size)
+    """
+    size = engine.pool.size() if isinstance(engine.pool, QueuePool) else 1
+    connections = [engine.connect() for _ in range(min(count, size))]
+
+    for connection in connections:
+        connection.close()
+
+
+def pool_stats(engine):
+    """
+    Get pool state and checkout counters of engine
+    """
+    pool = engine.pool
+    stats = dict(pool=type(pool).__name__)
+
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+
+    if isinstance(pool, InstrumentedPoolMixin):
+        stats.update(pool.metrics.stats())
+
+    return stats
@@ -0,0 +1,118 @@
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from flask import current_app, g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from settings.constants import QUERY_DEBUG, QUERY_REPEAT_THRESHOLD
+
+# statements of current request (None outside requests), context variable works for threads and async views
+current_log = ContextVar('query_log', default=None)
+
+
+class QueryLog(object):
+    """
+    Statements executed while handling one request
+    """
+    __slots__ = ('count', 'duration', 'statements', 'repeat_threshold')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        # None when statements are repeated on purpose (e.g. batches of import)
+        self.repeat_threshold = QUERY_REPEAT_THRESHOLD
+
+    def record(self, statement, duration):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+    def repeated(self):
+        """
+        Get statements executed at least repeat_threshold times (same SQL, any parameters, usually N+1 queries)
+
+        return: list of tuples (statement, count), most repeated first
+        """
+        threshold = self.repeat_threshold
+        if threshold is None:
+            return []
+
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def headers(self):
+        """
+        Get debug response headers
+        """
+        return {
+            'X-Query-Count': str(self.count),
+            'X-Query-Time': f'{self.duration * 1000:.3f}',
+            'X-Query-Repeated': str(len(self.repeated())),
+        }
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_log.get() is not None:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = current_log.get()
+    starts = conn.info.get('query_start')
+    if log is not None and starts:
+        log.record(statement, time.perf_counter() - starts.pop())
+
+
+@event.listens_for(Engine, 'handle_error')
+def handle_error(context):
+    # failed statements have no after_cursor_execute, their start is dropped here
+    log = current_log.get()
+    connection = context.connection
+    if log is None or connection is None or context.execution_context is None:
+        return
+
+    starts = connection.info.get('query_start')
+    if starts:
+        log.record(context.statement, time.perf_counter() - starts.pop())
+
+
+def warn_repeated(log, route):
+    """
+    Log statements repeated within one request
+    """
+    for statement, count in log.repeated():
+        current_app.logger.warning('%s ran the same statement %d times (N+1?): %s', route, count, ' '.join(statement.split()))
+
+
+def start_query_log():
+    """
+    Start counting statements of request (before_request hook)
+    """
+    g.query_log_token = current_log.set(QueryLog())
+
+
+def finish_query_log(response):
+    """
+    Add query headers in debug mode and warn about repeated statements (after_request hook)
+    """
+    log = current_log.get()
+    if log is not None:
+        warn_repeated(log, request.path)
+
+        if QUERY_DEBUG or current_app.debug:
+            response.headers.update(log.headers())
+
+    return response
+
+
+def stop_query_log(error):
+    """
+    Stop counting statements, threads serving requests are reused (teardown_request hook)
+    """
+    token = g.pop('query_log_token', None)
+    if token is not None:
+        current_log.reset(token)
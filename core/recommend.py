@@ -0,0 +1,315 @@
+import threading
+
+# numpy and scipy take most of the app import time, they are imported by the first build
+np = sparse = None
+
+
+def load_modules():
+    """
+    Import numpy and scipy.sparse on first use
+    """
+    global np, sparse
+    if sparse is None:
+        import numpy
+        from scipy import sparse as scipy_sparse
+        np, sparse = numpy, scipy_sparse
+
+
+def csr_view(offsets, targets, shape):
+    """
+    Wrap CSR arrays of graph into sparse matrix of ones without copying them
+
+    offsets: array with row offsets (rows past the end of offsets are empty)
+    targets: array with column indices
+    shape: matrix shape, may be larger than arrays
+    """
+    load_modules()
+    indptr = np.frombuffer(offsets, dtype=np.int64) if len(offsets) else np.zeros(1, dtype=np.int64)
+    indices = np.frombuffer(targets, dtype=np.int64) if len(targets) else np.zeros(0, dtype=np.int64)
+
+    if shape[0] + 1 > len(indptr):
+        indptr = np.concatenate([indptr, np.full(shape[0] + 1 - len(indptr), indptr[-1], dtype=np.int64)])
+
+    data = np.ones(len(indices), dtype=np.int32)
+    return sparse.csr_matrix((data, indices, indptr), shape=shape)
+
+
+class Recommender(object):
+    """
+    Top-K similar movies (most shared cast) and frequent collaborators (most shared movies) (thread-safe)
+
+    Counts are rows of incidence matrix products A.T @ A and A @ A.T (A is actors x movies),
+    computed for batches of rows with sparse products. A is the CSR arrays of collaboration graph
+    plus its overlay as a +1/-1 delta matrix, so changed relations only mark affected rows dirty
+    and dirty rows are recomputed in one batch before the next lookup. A batch holds rows with
+    at most batch_nnz (row, shared, related) triples, which bounds the size of its product.
+
+    All rows are computed by the first lookup after reset, or ahead of it by warm_up. Full builds
+    fill new arrays and swap them in, so lookups keep using the previous rows meanwhile.
+    """
+    def __init__(self, graph, top_k=20, batch_nnz=1000000):
+        self.graph = graph
+        self.top_k = top_k
+        self.batch_nnz = batch_nnz
+        # rows lock (lookups and refresh), build lock (one full build at a time),
+        # marking changed rows takes only the changes lock, so writes never wait for the others
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._changes_lock = threading.Lock()
+        self._base = None
+        self._changed_actors = set()
+        self._changed_movies = set()
+        # row id -> top ids / counts, ids padded with -1 (None until built)
+        self._top = None
+        # incremented by reset, a build started before it is dropped
+        self._generation = 0
+        # rows refreshed while a full build runs (None when no build runs), marked again after swap
+        self._refreshed = None
+
+    def _matrices(self, min_actors=0, min_movies=0):
+        """
+        Get current incidence matrices
+
+        min_actors, min_movies: minimal shape, marked rows may be past graph arrays and overlay
+            (e.g. actor added and cleared since last compaction)
+        return: tuple (base A, base A.T, delta of A), current A is base A + delta
+        """
+        actor_offsets, actor_movies, movie_offsets, movie_actors, added, removed = self.graph.snapshot()
+        changes = added + removed
+
+        actors = max(len(actor_offsets) - 1, max((pair[0] + 1 for pair in changes), default=0), min_actors)
+        movies = max(len(movie_offsets) - 1, max((pair[1] + 1 for pair in changes), default=0), min_movies)
+
+        # base matrices are rebuilt only when graph arrays were replaced or catalog grew
+        key = (id(actor_movies), id(movie_actors), actors, movies)
+        cached = self._base
+        if cached is None or cached[0] != key:
+            cached = key, (
+                csr_view(actor_offsets, actor_movies, (actors, movies)),
+                csr_view(movie_offsets, movie_actors, (movies, actors)),
+            )
+            self._base = cached
+        base, base_t = cached[1]
+
+        values = np.concatenate([np.ones(len(added), dtype=np.int32), np.full(len(removed), -1, dtype=np.int32)])
+        pairs = np.array(changes, dtype=np.int64).reshape(-1, 2)
+        delta = sparse.csr_matrix((values, (pairs[:, 0], pairs[:, 1])), shape=(actors, movies))
+
+        return base, base_t, delta
+
+    def _store(self, top, kind, rows, counts):
+        """
+        Store top-K of counts rows
+
+        top: dict kind -> (top ids, top counts) arrays
+        kind: 'actors' or 'movies'
+        rows: ids of rows in counts
+        counts: sparse matrix, counts[i, j] is number of shared movies (or actors) of rows[i] and j
+        """
+        top_ids, top_counts = top[kind]
+        size = counts.shape[1]
+
+        if len(top_ids) < size:
+            extra = size - len(top_ids)
+            top_ids = np.concatenate([top_ids, np.full((extra, self.top_k), -1, dtype=np.int32)])
+            top_counts = np.concatenate([top_counts, np.zeros((extra, self.top_k), dtype=np.int32)])
+            top[kind] = top_ids, top_counts
+
+        counts = counts.tocoo()
+        row, col, data = counts.row, counts.col, counts.data
+
+        # drop self pairs and pairs cancelled by delta
+        keep = (col != rows[row]) & (data > 0)
+        row, col, data = row[keep], col[keep], data[keep]
+
+        # order every row by count desc, id asc (one int64 key sorts faster than lexsort)
+        # and keep first top_k of each row
+        row = row.astype(np.int64)
+        most = int(data.max(initial=0))
+        key = (row * (most + 1) + (most - data)) * size + col
+        order = np.argsort(key)
+        row, col, data = row[order], col[order], data[order]
+
+        starts = np.concatenate([[0], np.cumsum(np.bincount(row, minlength=len(rows)))[:-1]])
+        rank = np.arange(len(row)) - starts[row]
+        keep = rank < self.top_k
+
+        top_ids[rows] = -1
+        top_counts[rows] = 0
+        top_ids[rows[row[keep]], rank[keep]] = col[keep]
+        top_counts[rows[row[keep]], rank[keep]] = data[keep]
+
+    def _batches(self, rows, base, delta, sizes):
+        """
+        Split rows into batches of at most batch_nnz triples (a single heavier row is its own batch)
+
+        rows: row ids
+        base, delta: incidence matrices of rows' kind (A and its delta for actors, A.T and its delta for movies)
+        sizes: current number of entries of every column (cast size of movie, movie count of actor)
+        return: generator of tuples (row ids, current incidence rows)
+        """
+        incidence = base[rows] + delta[rows]
+        # triples of a row bound nnz of its product row and its product work
+        costs = np.cumsum(incidence @ sizes)
+        start = 0
+        while start < len(rows):
+            before = costs[start - 1] if start else 0
+            end = max(int(np.searchsorted(costs, before + self.batch_nnz, side='right')), start + 1)
+            yield rows[start:end], incidence[start:end]
+            start = end
+
+    def _compute(self, top, actors, movies):
+        """
+        Recompute top-K rows of actors and movies in batches
+        """
+        base, base_t, delta = self._matrices(int(actors.max(initial=-1)) + 1, int(movies.max(initial=-1)) + 1)
+        delta_t = delta.T.tocsr()
+        cast_sizes = np.diff(base_t.indptr) + np.asarray(delta.sum(axis=0)).ravel()
+        filmography_sizes = np.diff(base.indptr) + np.asarray(delta.sum(axis=1)).ravel()
+
+        for rows, incidence in self._batches(actors, base, delta, cast_sizes):
+            self._store(top, 'actors', rows, incidence @ base_t + incidence @ delta_t)
+
+        for rows, incidence in self._batches(movies, base_t, delta_t, filmography_sizes):
+            self._store(top, 'movies', rows, incidence @ base + incidence @ delta)
+
+    def _build(self):
+        """
+        Compute top-K of all actors and movies into new arrays and swap them in (caller holds build lock)
+        """
+        load_modules()
+
+        with self._lock:
+            generation = self._generation
+            self._refreshed = set(), set()
+
+        try:
+            # changes marked from now on are in the graph snapshot or recomputed by next refresh
+            with self._changes_lock:
+                self._changed_actors.clear()
+                self._changed_movies.clear()
+
+            top = {
+                kind: (np.full((0, self.top_k), -1, dtype=np.int32), np.zeros((0, self.top_k), dtype=np.int32))
+                for kind in ('actors', 'movies')
+            }
+            base, base_t, _ = self._matrices()
+            self._compute(top, np.arange(base.shape[0]), np.arange(base_t.shape[0]))
+
+        except Exception:
+            with self._lock:
+                self._requeue()
+            raise
+
+        with self._lock:
+            self._requeue()
+            if self._generation == generation:
+                self._top = top
+
+    def _requeue(self):
+        """
+        Mark rows refreshed in previous arrays during a build as changed again (caller holds lock)
+        """
+        refreshed_actors, refreshed_movies = self._refreshed
+        self._refreshed = None
+        with self._changes_lock:
+            self._changed_actors |= refreshed_actors
+            self._changed_movies |= refreshed_movies
+
+    def build(self):
+        """
+        Precompute top-K of all actors and movies
+        """
+        with self._build_lock:
+            self._build()
+
+    def reset(self):
+        """
+        Drop computed rows after graph was reloaded, they are computed again by the next lookup
+        """
+        with self._lock:
+            self._top = None
+            self._base = None
+            self._generation += 1
+
+    def warm_up(self):
+        """
+        Compute all rows in a background thread, lookups meanwhile wait for it (or use previous rows)
+        """
+        def run():
+            with self._build_lock:
+                if self._top is None:
+                    self._build()
+
+        threading.Thread(target=run, name='recommender-warm-up', daemon=True).start()
+
+    def mark(self, pairs):
+        """
+        Mark rows affected by added or removed (actor id, movie id) pairs
+        """
+        with self._changes_lock:
+            for actor_id, movie_id in pairs:
+                self._changed_actors.add(actor_id)
+                self._changed_movies.add(movie_id)
+
+    def _refresh(self):
+        """
+        Recompute rows affected by changes since last refresh (caller holds lock)
+        """
+        with self._changes_lock:
+            changed_actors, changed_movies = self._changed_actors, self._changed_movies
+            self._changed_actors, self._changed_movies = set(), set()
+
+        if not changed_actors and not changed_movies:
+            return
+
+        # a running build may have read the graph before these changes
+        if self._refreshed is not None:
+            self._refreshed[0].update(changed_actors)
+            self._refreshed[1].update(changed_movies)
+
+        try:
+            actor_rows = np.array(sorted(changed_actors), dtype=np.int64)
+            movie_rows = np.array(sorted(changed_movies), dtype=np.int64)
+            base, base_t, delta = self._matrices(int(actor_rows.max(initial=-1)) + 1, int(movie_rows.max(initial=-1)) + 1)
+
+            # counts change for changed actors and current cast of changed movies (and vice versa)
+            cast = (base_t[movie_rows] + delta.T.tocsr()[movie_rows]).tocoo()
+            filmography = (base[actor_rows] + delta[actor_rows]).tocoo()
+            actors = np.union1d(actor_rows, cast.col[cast.data > 0])
+            movies = np.union1d(movie_rows, filmography.col[filmography.data > 0])
+
+            self._compute(self._top, actors, movies)
+
+        except Exception:
+            # rows stay dirty, the next lookup recomputes them
+            with self._changes_lock:
+                self._changed_actors |= changed_actors
+                self._changed_movies |= changed_movies
+            raise
+
+    def top(self, kind, row_id, limit=None):
+        """
+        Get top-K related records
+
+        kind: 'actors' (frequent collaborators of actor) or 'movies' (similar movies of movie)
+        row_id: actor or movie id
+        limit: max number of records (at most top_k)
+        return: list of tuples (id, shared count), most shared first
+        """
+        while True:
+            with self._lock:
+                if self._top is not None:
+                    self._refresh()
+
+                    top_ids, top_counts = self._top[kind]
+                    if row_id < 0 or row_id >= len(top_ids):
+                        return []
+
+                    found = [(int(rel_id), int(count)) for rel_id, count in zip(top_ids[row_id], top_counts[row_id]) if rel_id >= 0]
+                    return found[:limit]
+
+            # not computed yet, build it (or wait for the running build)
+            with self._build_lock:
+                if self._top is None:
+                    self._build()
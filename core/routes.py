@@ -3,6 +3,12 @@ from flask import current_app as app
 
 from controllers.actor import *
 from controllers.movie import *
+from controllers.search import *
+from controllers.graph import *
+from controllers.recommendations import *
+from controllers.stats import *
+from controllers.internal import *
+from controllers.importer import *
 
 
 @app.route('/api/actors', methods=['GET'])  
@@ -21,6 +27,62 @@ def movies():
     return get_all_movies()  
   
   
+@app.route('/api/actors/export', methods=['GET'])
+def actors_export():
+    """
+    Stream all actors in db (NDJSON or JSON array)
+    """
+    return export_actors()
+
+
+@app.route('/api/movies/export', methods=['GET'])
+def movies_export():
+    """
+    Stream all movies in db (NDJSON or JSON array)
+    """
+    return export_movies()
+
+
+@app.route('/api/actors/import', methods=['POST'])
+def actors_import():
+    """
+    Insert or update actors from CSV or NDJSON upload
+    """
+    return import_actors()
+
+
+@app.route('/api/movies/import', methods=['POST'])
+def movies_import():
+    """
+    Insert or update movies from CSV or NDJSON upload
+    """
+    return import_movies()
+
+
+@app.route('/api/relations/import', methods=['POST'])
+def relations_import():
+    """
+    Add actor-movie relations from CSV or NDJSON upload
+    """
+    return import_relations()
+
+
+@app.route('/api/actors/bulk', methods=['POST'])
+def actors_bulk():
+    """
+    Add many actors in one request
+    """
+    return bulk_add_actors()
+
+
+@app.route('/api/movies/bulk', methods=['POST'])
+def movies_bulk():
+    """
+    Add many movies in one request
+    """
+    return bulk_add_movies()
+
+
 @app.route('/api/actor', methods=['GET', 'POST', 'PUT', 'DELETE'])  
 def actor():  
     if request.method == 'GET':
@@ -66,4 +128,108 @@ def movie_relation():
         return movie_add_relation()
     
     elif request.method == 'DELETE':
-        return movie_clear_relations()
\ No newline at end of file
+        return movie_clear_relations()
+
+
+@app.route('/api/actor-filmography', methods=['GET'])
+def actor_filmography():
+    """
+    Get page of actor's movies
+    """
+    return get_actor_filmography()
+
+
+@app.route('/api/movie-cast', methods=['GET'])
+def movie_cast():
+    """
+    Get page of movie's actors
+    """
+    return get_movie_cast()
+
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    """
+    Prefix search over actor and movie names
+    """
+    return search_names()
+
+
+@app.route('/api/actor-path', methods=['GET'])
+def actor_path():
+    """
+    Get shortest collaboration path between two actors
+    """
+    return get_actor_path()
+
+
+@app.route('/api/actor-costars', methods=['GET'])
+def actor_costars():
+    """
+    Get page of actors who worked with actor
+    """
+    return get_actor_costars()
+
+
+@app.route('/api/similar-movies', methods=['GET'])
+def similar_movies():
+    """
+    Get movies sharing most cast with movie
+    """
+    return get_similar_movies()
+
+
+@app.route('/api/actor-collaborators', methods=['GET'])
+def actor_collaborators():
+    """
+    Get actors appearing most often with actor
+    """
+    return get_frequent_collaborators()
+
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """
+    Get counts of movies per genre, year and cast size and actors per gender
+    """
+    return get_stats()
+
+
+@app.route('/internal/cache', methods=['GET'])
+def cache_stats():
+    """
+    Get get-by-id and list responses cache counters (hits, misses, evictions)
+    """
+    return get_cache_stats()
+
+
+@app.route('/internal/graph', methods=['GET'])
+def graph_stats():
+    """
+    Get co-star graph size (edges, pending overlay changes)
+    """
+    return get_graph_stats()
+
+
+@app.route('/internal/pool', methods=['GET'])
+def connection_pools():
+    """
+    Get connection pools state (checked out, overflow) and counters (wait time, timeouts)
+    """
+    return get_pool_stats()
+
+
+@app.route('/internal/startup', methods=['GET'])
+def startup_timings():
+    """
+    Get startup time per step (imports, pool, schema, summary, indexes, graph)
+    """
+    return get_startup_timings()
+
+
+@app.route('/metrics', methods=['GET'])
+def request_metrics():
+    """
+    Get request counts, errors and latency histograms per route (Prometheus text format)
+    """
+    return get_metrics()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import math
+import random
+import time
+
+from flask import g, has_app_context, request
+from flask_sqlalchemy.session import Session
+
+from settings.constants import DB_REPLICA_STICKY_SECONDS, DB_REPLICA_MAX_LAG
+
+# read replica engines, set up by create_app from DB_REPLICA_URLS
+replicas = []
+
+# cookie with time until which reads of the client go to primary
+STICKY_COOKIE = 'primary_until'
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingSession(Session):
+    """
+    Session reading from the replica chosen for current request, writes and flushes go to primary
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = g.get('replica') if has_app_context() else None
+
+        if replica is not None and bind is None and not self._flushing:
+            return replica
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def use_replica(method, cookies):
+    """
+    Check if request may read from a replica
+
+    method: HTTP method
+    cookies: request cookies
+    return: True for reads of clients without a write in the sticky window
+    """
+    if method not in READ_METHODS:
+        return False
+
+    try:
+        return float(cookies.get(STICKY_COOKIE, 0)) <= time.time()
+    except ValueError:
+        return True
+
+
+def reads_replica():
+    """
+    Check if current request reads from a replica
+    """
+    return has_app_context() and g.get('replica') is not None
+
+
+def may_cache(versions, tables, replica):
+    """
+    Check if data read for request may be put into shared caches
+
+    versions: TableVersions
+    tables: tables the data was read from
+    replica: data was read from a replica
+    return: False if replica may still lag behind a recent write to tables
+    """
+    return not replica or versions.age(*tables) >= DB_REPLICA_MAX_LAG
+
+
+def route_request():
+    """
+    Choose database of request (before_request hook)
+    """
+    g.replica = random.choice(replicas) if replicas and use_replica(request.method, request.cookies) else None
+
+
+def stick_to_primary(response):
+    """
+    Keep reads of client on primary for the sticky window after a successful write (after_request hook)
+    """
+    if replicas and request.method not in READ_METHODS and response.status_code < 400:
+        response.set_cookie(
+            STICKY_COOKIE, f'{time.time() + DB_REPLICA_STICKY_SECONDS:.3f}',
+            max_age=math.ceil(DB_REPLICA_STICKY_SECONDS), httponly=True, samesite='Lax',
+        )
+
+    return response
@@ -0,0 +1,94 @@
+import hashlib
+
+from sqlalchemy import Column, String, Table, delete, exc, inspect, insert, select
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+FINGERPRINT_KEY = 'fingerprint'
+
+
+def schema_table(metadata):
+    """
+    Get table with schema fingerprint, added to metadata so drop_all drops it with the other tables
+    """
+    if 'schema_info' in metadata.tables:
+        return metadata.tables['schema_info']
+
+    return Table('schema_info', metadata,
+                 Column('key', String(50), primary_key = True),
+                 Column('value', String(64), nullable = False)
+                 )
+
+
+def schema_fingerprint(metadata, dialect):
+    """
+    Get hash of DDL of all tables and indexes in metadata
+
+    metadata: MetaData
+    dialect: dialect DDL is compiled for
+    return: hex sha256
+    """
+    ddl = []
+    for name, table in sorted(metadata.tables.items()):
+        ddl.append(str(CreateTable(table).compile(dialect=dialect)).strip())
+        for index in sorted(table.indexes, key=lambda index: index.name or ''):
+            ddl.append(str(CreateIndex(index).compile(dialect=dialect)).strip())
+
+    return hashlib.sha256('\n'.join(ddl).encode()).hexdigest()
+
+
+def create_indexes(engine, metadata):
+    """
+    Create indexes of metadata missing in database (e.g. indexes added to models of existing tables)
+
+    engine: engine to create indexes with
+    metadata: MetaData
+    """
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                with engine.begin() as connection:
+                    index.create(connection, checkfirst=True)
+            except exc.DBAPIError:
+                # worker starting at the same time created it first
+                names = {found['name'] for found in inspect(engine).get_indexes(table.name)}
+                if index.name not in names:
+                    raise
+
+
+def ensure_schema(engine, metadata):
+    """
+    Create missing tables unless fingerprint stored in database matches metadata
+
+    A match skips create_all and its per-table introspection queries, so starting workers costs one select.
+    Otherwise missing tables are created, and missing indexes of existing tables as well
+    (create_all creates indexes only with new tables). Changed tables and indexes are not altered.
+
+    engine: engine to create tables with
+    metadata: MetaData with all tables (including schema_table)
+    return: True if create_all ran
+    """
+    info = schema_table(metadata)
+    fingerprint = schema_fingerprint(metadata, engine.dialect)
+
+    try:
+        with engine.connect() as connection:
+            stored = connection.execute(select(info.c.value).where(info.c.key == FINGERPRINT_KEY)).scalar()
+    except exc.DBAPIError:
+        # no schema_info table yet
+        stored = None
+
+    if stored == fingerprint:
+        return False
+
+    metadata.create_all(engine)
+    create_indexes(engine, metadata)
+
+    try:
+        with engine.begin() as connection:
+            connection.execute(delete(info).where(info.c.key == FINGERPRINT_KEY))
+            connection.execute(insert(info).values(key=FINGERPRINT_KEY, value=fingerprint))
+    except exc.IntegrityError:
+        # worker starting at the same time stored it first
+        pass
+
+    return True
@@ -0,0 +1,127 @@
+import threading
+from bisect import bisect_left, insort
+
+
+class PrefixIndex(object):
+    """
+    In-memory sorted index over names for prefix (type-ahead) lookups (thread-safe)
+
+    Entries are kept sorted by case-folded name, so a lookup is a binary search plus a short scan.
+    The index lives in process memory and sees only writes made through this process.
+    While it's built in background (see loading), lookups and changes wait for the build.
+    """
+    def __init__(self):
+        self._entries = []  # sorted (folded name, id, name)
+        self._names = {}    # id -> name
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._ready.set()
+
+    def loading(self):
+        """
+        Mark index as being built, lookups and changes wait until build (or ready) is called
+        """
+        self._ready.clear()
+
+    def ready(self):
+        """
+        Let lookups and changes through (called by build, or when build failed)
+        """
+        self._ready.set()
+
+    def build(self, rows):
+        """
+        Replace index content
+
+        rows: iterable of (id, name)
+        """
+        names = {row_id: name for row_id, name in rows if name is not None}
+        entries = sorted((name.casefold(), row_id, name) for row_id, name in names.items())
+
+        with self._lock:
+            self._names = names
+            self._entries = entries
+
+        self.ready()
+
+    def add(self, row_id, name):
+        """
+        Add record name (replaces previous name of the record)
+        """
+        self._ready.wait()
+        with self._lock:
+            self._remove(row_id)
+            if name is not None:
+                self._names[row_id] = name
+                insort(self._entries, (name.casefold(), row_id, name))
+
+    def add_many(self, rows):
+        """
+        Add many record names at once (one merge instead of an insert per name)
+
+        rows: iterable of (id, name)
+        """
+        added = sorted((name.casefold(), row_id, name) for row_id, name in rows if name is not None)
+
+        self._ready.wait()
+        with self._lock:
+            for _, row_id, name in added:
+                self._remove(row_id)
+                self._names[row_id] = name
+
+            # both parts are sorted, timsort merges them in linear time
+            entries = self._entries + added
+            entries.sort()
+            self._entries = entries
+
+    def remove(self, row_id):
+        """
+        Remove record from index if present
+        """
+        self._ready.wait()
+        with self._lock:
+            self._remove(row_id)
+
+    def _remove(self, row_id):
+        name = self._names.pop(row_id, None)
+        if name is None:
+            return
+
+        entry = (name.casefold(), row_id, name)
+        index = bisect_left(self._entries, entry)
+        if index < len(self._entries) and self._entries[index] == entry:
+            del self._entries[index]
+
+    def name(self, row_id):
+        """
+        Get indexed name of record (None if record is not indexed)
+        """
+        self._ready.wait()
+        with self._lock:
+            return self._names.get(row_id)
+
+    def search(self, prefix, limit=10):
+        """
+        Get records whose names start with prefix (case-insensitive), in name order
+
+        prefix: name prefix
+        limit: max number of records
+        return: list of dicts with id and name
+        """
+        prefix = prefix.casefold()
+        found = []
+
+        self._ready.wait()
+        with self._lock:
+            index = bisect_left(self._entries, (prefix,))
+            while index < len(self._entries) and len(found) < limit:
+                folded, row_id, name = self._entries[index]
+                if not folded.startswith(prefix):
+                    break
+                found.append(dict(id=row_id, name=name))
+                index += 1
+
+        return found
+
+    def __len__(self):
+        return len(self._entries)
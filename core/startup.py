@@ -0,0 +1,30 @@
+import time
+
+
+class StartupTimer(object):
+    """
+    Durations of create_app steps
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.steps = {}
+
+    def step(self, name):
+        """
+        Record time since previous step as step name
+        """
+        now = time.perf_counter()
+        self.steps[name] = now - self._last
+        self._last = now
+
+    def total(self):
+        return self._last - self.started
+
+    def report(self, **extra):
+        """
+        Get durations in seconds (rounded to ms) with extra values
+        """
+        report = dict(steps={name: round(duration, 3) for name, duration in self.steps.items()}, total=round(self.total(), 3))
+        report.update({key: round(value, 3) if isinstance(value, float) else value for key, value in extra.items()})
+        return report
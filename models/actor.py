@@ -1,17 +1,31 @@
 from datetime import datetime as dt
 
 from core import db
+from core.search import PrefixIndex
 from models.relations import association
 from models.base import Model
 
 class Actor(Model, db.Model):
     __tablename__ = 'actors'
 
+    # names index for prefix search, built at startup
+    search_index = PrefixIndex()
+    # columns counted in summary table for /api/stats
+    summary_fields = ['gender']
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
     gender = db.Column(db.String(11))
     date_of_birth = db.Column(db.Date)
 
+    # (column, id) indexes give keyset pages of filtered and sorted lists as range scans
+    __table_args__ = (
+        db.Index('ix_actors_name_id', 'name', 'id'),
+        db.Index('ix_actors_gender_id', 'gender', 'id'),
+        db.Index('ix_actors_date_of_birth_id', 'date_of_birth', 'id'),
+        db.Index('ix_actors_gender_date_of_birth_id', 'gender', 'date_of_birth', 'id'),
+    )
+
     movies = db.relationship('Movie', 
                             secondary=association,
                             backref=db.backref('cast', uselist=True), 
@@ -1,4 +1,26 @@
+import io
+import json
+from collections import Counter
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+
+from sqlalchemy import bindparam, delete, func, insert, select, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
 from core import db
+from core.cache import LRUCache, TableVersions
+from core.graph import CollaborationGraph
+from core.recommend import Recommender
+from core.routing import may_cache, reads_replica
+from models.relations import association
+from models.summary import (
+    CAST_SIZE, apply_counts, cast_size_counts, cast_sizes, get_versions, lock_movies, summary_key,
+    version_column, version_counts,
+)
+from settings.constants import (
+    BULK_BATCH_SIZE, EXPORT_BATCH_SIZE, RECORD_CACHE_SIZE, RECORD_CACHE_TTL, GRAPH_COMPACT_RATIO,
+    RECOMMEND_TOP_K, RECOMMEND_BATCH_NNZ, RECOMMEND_WARMUP, RESPONSE_CACHE_SIZE, VERSIONS_TTL,
+)
 
 
 def commit(obj):
@@ -11,7 +33,684 @@ def commit(obj):
     return obj
 
 
+def insert_ignore(table):
+    """
+    Get INSERT statement that skips rows conflicting with existing keys
+
+    table: table to insert into
+    return: insert statement or None if dialect has no ON CONFLICT support
+    """
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+
+    elif dialect == 'sqlite':
+        return sqlite.insert(table).on_conflict_do_nothing()
+
+    return None
+
+
+# escapes of COPY text format
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def copy_records(table_name, records):
+    """
+    Insert records with COPY FROM STDIN in current transaction (Postgres only, through psycopg2 cursor)
+
+    table_name: table to insert into
+    records: list of dicts with the same keys
+    """
+    columns = list(records[0])
+    buffer = io.StringIO()
+
+    for record in records:
+        values = (record[column] for column in columns)
+        buffer.write('\t'.join(
+            '\\N' if value is None else
+            value.isoformat() if isinstance(value, date) else
+            str(value).translate(COPY_ESCAPES)
+            for value in values
+        ) + '\n')
+    buffer.seek(0)
+
+    with db.session.connection().connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {table_name} ({", ".join(columns)}) FROM STDIN', buffer)
+
+
 class Model(object):
+    # read-through cache for get_by_id, shared by all models (keys are (table, id), values are
+    # (record, table versions it was read at), so writes of other workers invalidate records too)
+    cache = LRUCache(RECORD_CACHE_SIZE, RECORD_CACHE_TTL)
+    # per-table versions of this process, bumped by every write (times of writes guard replica reads,
+    # cached records, responses and ETags use versions shared through summary table)
+    versions = TableVersions()
+    # versions read from the database, reused for VERSIONS_TTL (see current_versions)
+    versions_cache = LRUCache(RESPONSE_CACHE_SIZE, VERSIONS_TTL)
+    # actor-movie graph for co-star and path queries, shared by all models
+    graph = CollaborationGraph(GRAPH_COMPACT_RATIO)
+    # similar movies and frequent collaborators, computed from graph
+    recommender = Recommender(graph, RECOMMEND_TOP_K, RECOMMEND_BATCH_NNZ)
+
+    @classmethod
+    def relation_columns(cls):
+        """
+        Get association columns and related class
+
+        cls: class
+        return: tuple (own column, related column, related class)
+        """
+        if cls.__name__ == 'Actor':
+            return association.c.actor_id, association.c.movie_id, cls.movies.property.mapper.class_
+
+        elif cls.__name__ == 'Movie':
+            return association.c.movie_id, association.c.actor_id, cls.actors.property.mapper.class_
+
+    @classmethod
+    def invalidate(cls, *row_ids):
+        """
+        Drop cached records and bump table version after records were changed
+
+        cls: class
+        row_ids: changed records ids
+        """
+        cls.versions.bump(cls.__tablename__)
+
+        for row_id in row_ids:
+            cls.cache.delete((cls.__tablename__, row_id))
+
+    @classmethod
+    def versions_key(cls, tables):
+        """
+        Get key of versions_cache
+
+        Keys include versions of this worker, so its own writes are seen at once,
+        writes of other workers (or the import command) after VERSIONS_TTL at most.
+
+        cls: class
+        tables: tuple of table names
+        return: key
+        """
+        return tables, cls.versions.get(*tables)
+
+    @classmethod
+    def current_versions(cls, tables):
+        """
+        Get versions of tables, read from the database at most once per VERSIONS_TTL
+
+        cls: class
+        tables: tuple of table names
+        return: tuple of versions
+        """
+        key = cls.versions_key(tables)
+        versions = cls.versions_cache.get(key)
+        if versions is None:
+            versions = get_versions(tables)
+            cls.versions_cache.set(key, versions)
+
+        return versions
+
+    @classmethod
+    def get_by_id(cls, row_id):
+        """
+        Get record columns by id (read-through cache)
+
+        cls: class
+        row_id: record id
+        return: dict with record columns or None if record does not exist
+        """
+        versions_key = cls.versions_key((cls.__tablename__,))
+        record = cls.cached_record(row_id, versions_key)
+
+        if record is None:
+            row = db.session.execute(cls.record_statement(row_id)).first()
+            if row is None:
+                return None
+
+            record = cls.cache_record(row, versions_key, reads_replica())
+
+        # copy, so callers can't change the cached record
+        return dict(record)
+
+    @classmethod
+    def cached_record(cls, row_id, versions_key):
+        """
+        Get cached record columns if they were read at current version of table
+
+        cls: class
+        row_id: record id
+        versions_key: versions_key of table, taken before the record is read
+        return: dict with record columns or None (not cached, outdated or version not known)
+        """
+        versions = cls.versions_cache.get(versions_key)
+        if versions is None:
+            return None
+
+        entry = cls.cache.get((cls.__tablename__, row_id))
+        if entry is None or entry[1] != versions:
+            return None
+
+        return entry[0]
+
+    @classmethod
+    def record_statement(cls, row_id):
+        """
+        Get SELECT of record columns by id with current version of table (column table_version),
+        executed by get_by_id or controllers.reads.get_record
+
+        cls: class
+        row_id: record id
+        return: select statement
+        """
+        table = cls.__table__
+        return select(table, version_column(table.name).label('table_version')).where(table.c.id == row_id)
+
+    @classmethod
+    def cache_record(cls, row, versions_key, replica=False):
+        """
+        Cache record read by record_statement together with version of table
+
+        cls: class
+        row: row of record_statement
+        versions_key: versions_key of table, taken before the record was read
+        replica: True if row was read from a replica
+        return: dict with record columns
+        """
+        record = dict(row._mapping)
+        versions = (record.pop('table_version'),)
+        cls.versions_cache.set(versions_key, versions)
+
+        if may_cache(cls.versions, (cls.__tablename__,), replica):
+            cls.cache.set((cls.__tablename__, record['id']), (record, versions))
+
+        return record
+
+    @classmethod
+    def existing_ids(cls, row_ids):
+        """
+        Get ids of existing records (IN queries of BULK_BATCH_SIZE ids)
+
+        cls: class
+        row_ids: records ids
+        return: set of ids
+        """
+        row_ids = sorted(set(row_ids))
+        found = set()
+
+        for start in range(0, len(row_ids), BULK_BATCH_SIZE):
+            stmt = select(cls.id).where(cls.id.in_(row_ids[start:start + BULK_BATCH_SIZE]))
+            found.update(db.session.execute(stmt).scalars())
+
+        return found
+
+    @classmethod
+    def ids_by_name(cls, names):
+        """
+        Get ids of records by unique names (IN queries of BULK_BATCH_SIZE names)
+
+        cls: class
+        names: records names
+        return: dict name -> id (names not found are left out)
+        """
+        names = sorted(set(names))
+        found = {}
+
+        for start in range(0, len(names), BULK_BATCH_SIZE):
+            stmt = select(cls.name, cls.id).where(cls.name.in_(names[start:start + BULK_BATCH_SIZE]))
+            found.update(db.session.execute(stmt).all())
+
+        return found
+
+    @classmethod
+    def build_search_index(cls):
+        """
+        Load all names into search index
+
+        cls: class
+        """
+        stmt = select(cls.id, cls.name).execution_options(yield_per=EXPORT_BATCH_SIZE)
+        cls.search_index.build(db.session.execute(stmt))
+
+    @classmethod
+    def build_graph(cls):
+        """
+        Load association table into collaboration graph and schedule recommendations (RECOMMEND_WARMUP)
+
+        cls: class
+        """
+        def rows(*columns):
+            stmt = select(*columns).order_by(*columns).execution_options(yield_per=EXPORT_BATCH_SIZE)
+            yield from db.session.execute(stmt)
+
+        # both orders are served by association indexes, no sorting in db
+        cls.graph.load(
+            rows(association.c.actor_id, association.c.movie_id),
+            rows(association.c.movie_id, association.c.actor_id),
+        )
+
+        if RECOMMEND_WARMUP == 'startup':
+            cls.recommender.build()
+        else:
+            cls.recommender.reset()
+            if RECOMMEND_WARMUP == 'background':
+                cls.recommender.warm_up()
+
+    @classmethod
+    def graph_edges(cls, row_id, rel_ids):
+        """
+        Get graph edges between record and related records
+
+        cls: class
+        row_id: record id
+        rel_ids: related records ids
+        return: list of (actor id, movie id)
+        """
+        if cls.__name__ == 'Actor':
+            return [(row_id, rel_id) for rel_id in rel_ids]
+
+        elif cls.__name__ == 'Movie':
+            return [(rel_id, row_id) for rel_id in rel_ids]
+
+    @classmethod
+    def graph_add(cls, row_id, rel_ids):
+        """
+        Add graph edges between record and related records (existing edges are skipped)
+
+        cls: class
+        row_id: record id
+        rel_ids: related records ids
+        """
+        cls.recommender.mark(cls.graph.add_edges(cls.graph_edges(row_id, rel_ids)))
+
+    @classmethod
+    def graph_remove(cls, row_id, rel_ids=None):
+        """
+        Remove graph edges between record and related records
+
+        cls: class
+        row_id: record id
+        rel_ids: related records ids (all edges of record if None)
+        """
+        if rel_ids is not None:
+            removed = cls.graph.remove_edges(cls.graph_edges(row_id, rel_ids))
+
+        elif cls.__name__ == 'Actor':
+            removed = cls.graph.remove_actor(row_id)
+
+        elif cls.__name__ == 'Movie':
+            removed = cls.graph.remove_movie(row_id)
+
+        cls.recommender.mark(removed)
+
+    @classmethod
+    def summary_counts(cls, record, sign=1, cast_size=0):
+        """
+        Get summary counters changes for added or removed record
+
+        cls: class
+        record: dict with record columns
+        sign: 1 for added record, -1 for removed record
+        cast_size: cast size of movie (movies only)
+        return: Counter (name, key) -> change
+        """
+        counts = Counter()
+
+        for field in cls.summary_fields:
+            counts[(f'{cls.__tablename__}.{field}', summary_key(record.get(field)))] += sign
+
+        if cls.__name__ == 'Movie':
+            counts[(CAST_SIZE, summary_key(cast_size))] += sign
+
+        return counts
+
+    @classmethod
+    def summary_aggregates(cls):
+        """
+        Get summary counters from full-table aggregates (used only to fill empty summary table)
+
+        cls: class
+        return: Counter (name, key) -> count
+        """
+        table = cls.__table__
+        counts = Counter()
+
+        for field in cls.summary_fields:
+            stmt = select(table.c[field], func.count()).group_by(table.c[field])
+            for value, count in db.session.execute(stmt):
+                counts[(f'{table.name}.{field}', summary_key(value))] += count
+
+        if cls.__name__ == 'Movie':
+            # movies without cast have no association rows, they are counted as 0
+            sizes = (
+                select(association.c.movie_id, func.count().label('size'))
+                .group_by(association.c.movie_id)
+                .subquery()
+            )
+            size = func.coalesce(sizes.c.size, 0)
+            stmt = select(size, func.count()).select_from(
+                table.outerjoin(sizes, table.c.id == sizes.c.movie_id)
+            ).group_by(size)
+            for value, count in db.session.execute(stmt):
+                counts[(CAST_SIZE, summary_key(value))] += count
+
+        return counts
+
+    @classmethod
+    def cast_movie_ids(cls, row_id, rel_ids=None):
+        """
+        Get ids of movies whose cast changes with relations of record
+
+        cls: class
+        row_id: record id
+        rel_ids: changed related records ids (all relations of record if None)
+        return: list of movies ids
+        """
+        if cls.__name__ == 'Movie':
+            return [row_id]
+
+        elif cls.__name__ == 'Actor':
+            if rel_ids is not None:
+                return list(rel_ids)
+
+            stmt = select(association.c.movie_id).where(association.c.actor_id == row_id)
+            return db.session.execute(stmt).scalars().all()
+
+    @classmethod
+    def delete_relations(cls, row_id):
+        """
+        Delete all association rows of record in current transaction (caller commits)
+
+        Movies found beforehand are locked first, in the same order as other cast changes.
+        Rows added after they were read are found by DELETE ... RETURNING, their movies are locked then.
+
+        cls: class
+        row_id: record id
+        return: tuple (number of removed rows, Counter with cast size counter changes)
+        """
+        own_col, _, _ = cls.relation_columns()
+        whole_cast = cls.__name__ == 'Movie'
+
+        if whole_cast:
+            # movie loses its whole cast, its size before is the number of removed rows
+            lock_movies([row_id])
+            before = {}
+        else:
+            before = cast_sizes(cls.cast_movie_ids(row_id))
+
+        stmt = association.delete().where(own_col == row_id)
+        if db.session.get_bind().dialect.delete_returning:
+            removed = Counter(db.session.execute(stmt.returning(association.c.movie_id)).scalars())
+        else:
+            # no RETURNING support, rows are read again right before delete
+            removed = Counter(db.session.execute(select(association.c.movie_id).where(own_col == row_id)).scalars())
+            db.session.execute(stmt)
+
+        # sizes counted after the delete, removed rows were part of them before
+        extra = set(removed) - set(before)
+        for movie_id, size in (dict.fromkeys(extra, 0) if whole_cast else cast_sizes(extra)).items():
+            before[movie_id] = size + removed[movie_id]
+
+        # movies are locked, so sizes after follow from removed rows without counting again
+        after = {movie_id: size - removed[movie_id] for movie_id, size in before.items()}
+        return sum(removed.values()), cast_size_counts(before, after)
+
+    @classmethod
+    def encode_cursor(cls, record, sort=('id', False)):
+        """
+        Get cursor pointing after record
+
+        cls: class
+        record: last record of the page
+        sort: tuple (field, descending)
+        return: id when sorted by id, else opaque string with (sort value, id)
+        """
+        field, _ = sort
+        if field == 'id':
+            return record.id
+
+        value = getattr(record, field)
+        if isinstance(value, date):
+            value = value.isoformat()
+
+        return urlsafe_b64encode(json.dumps([value, record.id]).encode()).decode()
+
+    @classmethod
+    def decode_cursor(cls, cursor, sort=('id', False)):
+        """
+        Get position from cursor made by encode_cursor
+
+        cls: class
+        cursor: cursor from request (or None)
+        sort: tuple (field, descending)
+        return: id or tuple (sort value, id), raises ValueError if cursor is invalid
+        """
+        if cursor is None:
+            return None
+
+        field, _ = sort
+        if field == 'id':
+            try:
+                return int(cursor)
+            except (TypeError, ValueError):
+                raise ValueError('After must be an integer.')
+
+        try:
+            value, row_id = json.loads(urlsafe_b64decode(str(cursor).encode()))
+            if value is not None and isinstance(cls.__table__.c[field].type, db.Date):
+                value = date.fromisoformat(value)
+            return value, int(row_id)
+        except (TypeError, ValueError):
+            raise ValueError('Invalid cursor.')
+
+    @classmethod
+    def page_statement(cls, limit, after=None, filters=None, ranges=None, sort=('id', False)):
+        """
+        Get SELECT of one page of filtered records (keyset pagination), executed by controllers.reads.list_records
+
+        cls: class
+        limit: max number of records in page
+        after: position after the last record of the previous page (see decode_cursor)
+        filters: dict field -> value, records are filtered by equality
+        ranges: dict field -> (from, to), records are filtered by inclusive range
+        sort: tuple (field, descending), ties are ordered by id, NULLs go last
+        return: select statement (with one extra row to know if there is a next page, see split_page)
+
+        Sorted lists are read in two segments, records with values then records with NULL,
+        so each page is one range of a (column, id) index (see null_page_statement).
+        """
+        stmt = cls.filtered_statement(filters, ranges)
+        field, descending = sort
+        column = getattr(cls, field)
+
+        if field == 'id':
+            stmt = stmt.order_by(cls.id.desc() if descending else cls.id)
+            if after is not None:
+                stmt = stmt.where(cls.id < after if descending else cls.id > after)
+
+        elif after is not None and after[0] is None:
+            # cursor is in NULL segment already
+            stmt = stmt.where(column.is_(None)).order_by(cls.id.desc() if descending else cls.id)
+            stmt = stmt.where(cls.id < after[1] if descending else cls.id > after[1])
+
+        else:
+            if column.nullable:
+                stmt = stmt.where(column.is_not(None))
+
+            if descending:
+                stmt = stmt.order_by(column.desc(), cls.id.desc())
+            else:
+                stmt = stmt.order_by(column, cls.id)
+
+            if after is not None:
+                position = tuple_(column, cls.id)
+                stmt = stmt.where(position < tuple_(*after) if descending else position > tuple_(*after))
+
+        return stmt.limit(limit + 1)
+
+    @classmethod
+    def null_page_statement(cls, limit, after=None, filters=None, ranges=None, sort=('id', False)):
+        """
+        Get SELECT of the start of NULL segment, to fill page whose page_statement ran out of records with values
+
+        cls: class
+        limit: max number of records left in page
+        after: position page_statement started after
+        filters: dict field -> value, records are filtered by equality
+        ranges: dict field -> (from, to), records are filtered by inclusive range
+        sort: tuple (field, descending)
+        return: select statement or None if page_statement covers NULL segment too
+        """
+        field, descending = sort
+        column = getattr(cls, field)
+
+        if field == 'id' or not column.nullable or (after is not None and after[0] is None):
+            return None
+
+        stmt = cls.filtered_statement(filters, ranges).where(column.is_(None))
+        return stmt.order_by(cls.id.desc() if descending else cls.id).limit(limit + 1)
+
+    @classmethod
+    def filtered_statement(cls, filters=None, ranges=None):
+        """
+        Get SELECT of records filtered by equality and inclusive ranges
+
+        cls: class
+        filters: dict field -> value
+        ranges: dict field -> (from, to), None for open end
+        return: select statement
+        """
+        stmt = select(cls)
+
+        for field, value in (filters or {}).items():
+            stmt = stmt.where(getattr(cls, field) == value)
+
+        for field, (low, high) in (ranges or {}).items():
+            if low is not None:
+                stmt = stmt.where(getattr(cls, field) >= low)
+            if high is not None:
+                stmt = stmt.where(getattr(cls, field) <= high)
+
+        return stmt
+
+    @classmethod
+    def split_page(cls, records, limit, sort=('id', False)):
+        """
+        Get page and cursor from records selected by page_statement
+
+        cls: class
+        records: list of records
+        limit: max number of records in page
+        sort: tuple (field, descending)
+        return: tuple (records, next_cursor), next_cursor is None on the last page
+        """
+        if len(records) > limit:
+            records = records[:limit]
+            return records, cls.encode_cursor(records[-1], sort)
+
+        return records, None
+
+    @classmethod
+    def get_relations_page(cls, row_id, limit, after=None):
+        """
+        Get one page of related records ordered by id (actor's filmography or movie's cast)
+
+        cls: class
+        row_id: record id
+        limit: max number of related records in page
+        after: id of the last related record of the previous page
+        return: tuple (records, next_cursor) or None if record does not exist
+        """
+        obj = db.session.get(cls, row_id)
+        if obj is None:
+            return None
+
+        _, rel_col, _ = cls.relation_columns()
+
+        if cls.__name__ == 'Actor':
+            query = obj.movies
+
+        elif cls.__name__ == 'Movie':
+            query = obj.actors
+
+        # order by association column, so the (own id, related id) index gives the order
+        query = query.order_by(rel_col)
+        if after is not None:
+            query = query.filter(rel_col > after)
+
+        # fetch one extra row to know if there is a next page
+        records = query.limit(limit + 1).all()
+        if len(records) > limit:
+            records = records[:limit]
+            return records, records[-1].id
+
+        return records, None
+
+    @classmethod
+    def related_statement(cls, row_ids, fields):
+        """
+        Get SELECT of related records of many records at once (one IN query per page instead of one query per record)
+
+        cls: class
+        row_ids: records ids
+        fields: columns of related records to select
+        return: select statement of (record id, *related columns), ordered by record id and related id
+        """
+        own_col, rel_col, rel_cls = cls.relation_columns()
+        rel_table = rel_cls.__table__
+
+        # (own id, related id) indexes of association give the order
+        return (
+            select(own_col, *(rel_table.c[field] for field in fields))
+            .join_from(association, rel_table, rel_col == rel_table.c.id)
+            .where(own_col.in_(sorted(set(row_ids))))
+            .order_by(own_col, rel_col)
+        )
+
+    @classmethod
+    def group_related(cls, rows, row_ids):
+        """
+        Group rows of related_statement by record
+
+        cls: class
+        rows: rows of related_statement
+        row_ids: records ids
+        return: dict record id -> list of related columns tuples (empty for records without relations)
+        """
+        related = {row_id: [] for row_id in row_ids}
+
+        for row_id, *values in rows:
+            related[row_id].append(values)
+
+        return related
+
+    @classmethod
+    def related_tables(cls):
+        """
+        Get tables that responses with expanded related records depend on as well
+
+        cls: class
+        return: tuple of table names (association and related table)
+        """
+        _, _, rel_cls = cls.relation_columns()
+        return association.name, rel_cls.__tablename__
+
+    @classmethod
+    def get_related(cls, row_ids, fields):
+        """
+        Get related records of many records in one query (actors' filmographies or movies' casts)
+
+        cls: class
+        row_ids: records ids
+        fields: columns of related records
+        return: dict record id -> list of related columns tuples (in order of fields)
+        """
+        if not row_ids:
+            return {}
+
+        rows = db.session.execute(cls.related_statement(row_ids, fields))
+        return cls.group_related(rows, row_ids)
+
     @classmethod
     def create(cls, **kwargs):
         """
@@ -21,44 +720,235 @@ class Model(object):
         kwargs: dict with object parameters
         """
         obj = cls(**kwargs)
-        return commit(obj)
+
+        try:
+            # counters and table version change in the same transaction as the record
+            counts = cls.summary_counts(kwargs)
+            counts.update(version_counts(cls.__tablename__))
+            apply_counts(counts)
+            obj = commit(obj)
+        except Exception:
+            db.session.rollback()
+            raise
+
+        cls.invalidate()
+        cls.search_index.add(obj.id, obj.name)
+        return obj
+
+    @classmethod
+    def bulk_create(cls, records):
+        """
+        Create many records in one transaction with batched multi-row inserts,
+        records whose unique name already exists are skipped (INSERT ... ON CONFLICT DO NOTHING where supported)
+
+        cls: class
+        records: list of dicts with object parameters except id (names are unique within records)
+        return: list of new ids in the order of records (None for skipped records)
+        """
+        table = cls.__table__
+        stmt = insert_ignore(table)
+        added = {}
+
+        try:
+            if stmt is None:
+                # no ON CONFLICT support, existing names are skipped beforehand
+                existing = cls.ids_by_name(record['name'] for record in records)
+                new = [record for record in records if record['name'] not in existing]
+                stmt = insert(table)
+            else:
+                new = records
+
+            # skipped rows return nothing, new ids are matched by name
+            stmt = stmt.returning(table.c.name, table.c.id)
+            for start in range(0, len(new), BULK_BATCH_SIZE):
+                added.update(db.session.execute(stmt, new[start:start + BULK_BATCH_SIZE]).all())
+
+            if added:
+                counts = version_counts(table.name)
+                for record in records:
+                    if record['name'] in added:
+                        counts.update(cls.summary_counts(record))
+                apply_counts(counts)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # new ids can't be cached yet, only table version changes
+        cls.invalidate()
+        cls.search_index.add_many((row_id, name) for name, row_id in added.items())
+        return [added.get(record['name']) for record in records]
+
+    @classmethod
+    def import_records(cls, records):
+        """
+        Insert new records and update existing ones matched by unique name, in one transaction
+        (COPY FROM STDIN on Postgres, batched executemany elsewhere)
+
+        cls: class
+        records: dict name -> dict with all object parameters except id
+        return: tuple (number of inserted records, number of updated records)
+        """
+        table = cls.__table__
+        dialect = db.session.get_bind().dialect.name
+        names = sorted(records)
+        new, changed = [], []
+        counts = Counter()
+
+        try:
+            # existing records are locked, their old values move them between counters
+            existing = {}
+            for start in range(0, len(names), BULK_BATCH_SIZE):
+                stmt = (
+                    select(table).where(table.c.name.in_(names[start:start + BULK_BATCH_SIZE]))
+                    .order_by(table.c.id).with_for_update()
+                )
+                existing.update((row.name, row._mapping) for row in db.session.execute(stmt))
+
+            for name in names:
+                record, old = records[name], existing.get(name)
+                if old is None:
+                    new.append(record)
+                    counts.update(cls.summary_counts(record))
+                elif any(old[key] != value for key, value in record.items()):
+                    changed.append(dict(record, row_id=old['id']))
+                    counts.update(cls.summary_counts(record))
+                    counts.update(cls.summary_counts(old, -1))
+
+            # unchanged records are not written
+            if changed:
+                stmt = update(table).where(table.c.id == bindparam('row_id'))
+                for start in range(0, len(changed), BULK_BATCH_SIZE):
+                    db.session.execute(stmt, changed[start:start + BULK_BATCH_SIZE])
+
+            if new and dialect == 'postgresql':
+                copy_records(table.name, new)
+
+            elif new:
+                # no RETURNING, ordered RETURNING makes SQLite insert rows one by one
+                for start in range(0, len(new), BULK_BATCH_SIZE):
+                    db.session.execute(insert(table), new[start:start + BULK_BATCH_SIZE])
+
+            # ids of new records are read back by name for search index
+            added = cls.ids_by_name(record['name'] for record in new)
+
+            if new or changed:
+                counts.update(version_counts(table.name))
+            apply_counts(counts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # names of updated records are the same, only new ones go to search index
+        cls.invalidate(*(record['row_id'] for record in changed))
+        cls.search_index.add_many((row_id, name) for name, row_id in added.items())
+        return len(new), len(changed)
 
     @classmethod
     def update(cls, row_id, **kwargs):
         """
-        Update record by id
+        Update record by id in one statement (UPDATE ... RETURNING where supported)
 
         cls: class
         row_id: record id
         kwargs: dict with object parameters
+        return: dict with updated record columns
         """
-        obj = cls.query.get(row_id)
-        if not obj:
-            raise ValueError(f"ID {row_id} not found.")
-        
-        for key, value in kwargs.items():
-            if hasattr(obj, key):
-                setattr(obj, key, value)
+        table = cls.__table__
+        values = {key: value for key, value in kwargs.items() if key in table.c and key != 'id'}
+        dialect = db.session.get_bind().dialect
+
+        # old values of counted fields are needed to move record between counters
+        counted = [table.c[field] for field in cls.summary_fields if field in values]
+        old = None
+
+        try:
+            if counted:
+                stmt = select(*counted).where(table.c.id == row_id).with_for_update()
+                old = db.session.execute(stmt).first()
+                if old is None:
+                    raise ValueError(f"ID {row_id} not found.")
+
+            if not values:
+                row = db.session.execute(select(table).where(table.c.id == row_id)).first()
+
+            elif dialect.update_returning:
+                stmt = update(table).where(table.c.id == row_id).values(**values).returning(*table.c)
+                row = db.session.execute(stmt).first()
+
+            else:
+                # no RETURNING support, read the row back after update
+                result = db.session.execute(update(table).where(table.c.id == row_id).values(**values))
+                row = None
+                if result.rowcount:
+                    row = db.session.execute(select(table).where(table.c.id == row_id)).first()
+
+            if row is None:
+                raise ValueError(f"ID {row_id} not found.")
 
-        return commit(obj)
+            counts = version_counts(table.name)
+            if old is not None:
+                counts.update(cls.summary_counts({column.name: row._mapping[column] for column in counted}))
+                counts.update(cls.summary_counts(old._mapping, -1))
+            apply_counts(counts)
+
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        cls.invalidate(row_id)
+        if 'name' in values:
+            cls.search_index.add(row_id, row.name)
+        return dict(row._mapping)
     
     @classmethod
     def delete(cls, row_id):
         """
-        Delete record by id
+        Delete record by id in one statement (DELETE ... RETURNING where supported)
 
         cls: class
         row_id: record id
         return: int (1 if deleted else 0)
         """
-        obj = cls.query.get(row_id)
+        table = cls.__table__
+        dialect = db.session.get_bind().dialect
+
+        try:
+            _, counts = cls.delete_relations(row_id)
+
+            # deleted row is needed to decrement its counters
+            stmt = delete(table).where(table.c.id == row_id)
+            if dialect.delete_returning:
+                rows = db.session.execute(stmt.returning(*table.c)).all()
+            else:
+                rows = db.session.execute(select(table).where(table.c.id == row_id)).all()
+                db.session.execute(stmt)
+            deleted = len(rows)
+
+            if not deleted:
+                # nothing changed, counters and versions are left as they are
+                db.session.rollback()
+                return 0
+
+            # deleted movie first moves to cast size 0, then leaves it
+            for row in rows:
+                counts.update(cls.summary_counts(row._mapping, -1))
+            counts.update(version_counts(table.name, association.name))
+            apply_counts(counts)
 
-        if obj:
-            db.session.delete(obj)
             db.session.commit()
-            return 1
-        
-        return 0
+        except Exception:
+            db.session.rollback()
+            raise
+
+        cls.invalidate(row_id)
+        cls.versions.bump(association.name)
+        cls.search_index.remove(row_id)
+        cls.graph_remove(row_id)
+        return deleted
     
     @classmethod
     def add_relation(cls, row_id, rel_obj):  
@@ -73,14 +963,167 @@ class Model(object):
         if not obj:
             raise ValueError(f"ID {row_id} not found.")
 
-        if cls.__name__ == 'Actor':
-            obj.movies.append(rel_obj)
+        movie_ids = cls.cast_movie_ids(row_id, [rel_obj.id])
 
-        elif cls.__name__ == 'Movie':
-            obj.actors.append(rel_obj)
+        try:
+            before = cast_sizes(movie_ids)
+
+            if cls.__name__ == 'Actor':
+                obj.movies.append(rel_obj)
 
-        return commit(obj)
+            elif cls.__name__ == 'Movie':
+                obj.actors.append(rel_obj)
+
+            db.session.flush()
+            counts = cast_size_counts(before, cast_sizes(movie_ids, lock=False))
+            counts.update(version_counts(association.name))
+            apply_counts(counts)
+            obj = commit(obj)
+        except Exception:
+            db.session.rollback()
+            raise
+
+        cls.invalidate(row_id)
+        type(rel_obj).invalidate(rel_obj.id)
+        cls.versions.bump(association.name)
+        cls.graph_add(row_id, [rel_obj.id])
+        return obj
             
+    @classmethod
+    def add_relations(cls, row_id, rel_ids):
+        """
+        Add many relations to object in one batched insert (existing pairs are skipped)
+
+        cls: class
+        row_id: record id
+        rel_ids: list of related records ids
+        return: int (number of added relations)
+        """
+        own_col, rel_col, rel_cls = cls.relation_columns()
+        rel_ids = set(rel_ids)
+
+        # check all related records exist with a single IN query
+        found_ids = set(db.session.execute(select(rel_cls.id).where(rel_cls.id.in_(rel_ids))).scalars())
+        missing_ids = rel_ids - found_ids
+        if missing_ids:
+            raise ValueError(f"{rel_cls.__name__} IDs {', '.join(map(str, sorted(missing_ids)))} not found.")
+
+        stmt = insert_ignore(association)
+        if stmt is None:
+            # no ON CONFLICT support, filter out existing pairs beforehand
+            existing_ids = db.session.execute(
+                select(rel_col).where(own_col == row_id, rel_col.in_(rel_ids))
+            ).scalars()
+            rel_ids -= set(existing_ids)
+            stmt = insert(association)
+
+        pairs = [{own_col.name: row_id, rel_col.name: rel_id} for rel_id in sorted(rel_ids)]
+        movie_ids = cls.cast_movie_ids(row_id, rel_ids)
+        returning = db.session.get_bind().dialect.insert_returning
+        if returning:
+            stmt = stmt.returning(association.c.movie_id)
+        inserted = Counter()
+        added = 0
+
+        try:
+            before = cast_sizes(movie_ids)
+
+            for start in range(0, len(pairs), BULK_BATCH_SIZE):
+                result = db.session.execute(stmt.values(pairs[start:start + BULK_BATCH_SIZE]))
+                if returning:
+                    inserted.update(result.scalars())
+                else:
+                    added += result.rowcount
+
+            if returning:
+                # movies are locked, so sizes after follow from inserted rows without counting again
+                added = sum(inserted.values())
+                after = {movie_id: size + inserted[movie_id] for movie_id, size in before.items()}
+            else:
+                after = cast_sizes(movie_ids, lock=False)
+
+            counts = cast_size_counts(before, after)
+            counts.update(version_counts(association.name))
+            apply_counts(counts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        cls.invalidate(row_id)
+        rel_cls.invalidate(*rel_ids)
+        cls.versions.bump(association.name)
+        # pairs skipped as existing are ignored by the graph too
+        cls.graph_add(row_id, rel_ids)
+        return added
+
+    @classmethod
+    def import_relations(cls, pairs):
+        """
+        Add relations of many records in one transaction, existing pairs are skipped
+        (COPY FROM STDIN into temporary table on Postgres, batched executemany elsewhere)
+
+        cls: class
+        pairs: set of tuples (record id, related record id)
+        return: tuple (number of added relations, set of pairs with missing records)
+        """
+        own_col, rel_col, rel_cls = cls.relation_columns()
+        dialect = db.session.get_bind().dialect.name
+
+        own_ids = cls.existing_ids(own_id for own_id, _ in pairs)
+        rel_ids = rel_cls.existing_ids(rel_id for _, rel_id in pairs)
+        missing = {pair for pair in pairs if pair[0] not in own_ids or pair[1] not in rel_ids}
+
+        rows = [{own_col.name: own_id, rel_col.name: rel_id} for own_id, rel_id in sorted(pairs - missing)]
+        if not rows:
+            return 0, missing
+        movie_ids = {row[association.c.movie_id.name] for row in rows}
+
+        try:
+            before = cast_sizes(movie_ids)
+
+            if dialect == 'postgresql':
+                db.session.execute(text(
+                    f'CREATE TEMPORARY TABLE import_{association.name} (LIKE {association.name}) ON COMMIT DROP'
+                ))
+                copy_records(f'import_{association.name}', rows)
+                db.session.execute(text(
+                    f'INSERT INTO {association.name} SELECT * FROM import_{association.name} ON CONFLICT DO NOTHING'
+                ))
+
+            else:
+                stmt = insert_ignore(association)
+                for start in range(0, len(rows), BULK_BATCH_SIZE):
+                    batch = rows[start:start + BULK_BATCH_SIZE]
+
+                    if stmt is None:
+                        # no ON CONFLICT support, filter out existing pairs beforehand
+                        existing = set(db.session.execute(select(own_col, rel_col).where(
+                            own_col.in_({row[own_col.name] for row in batch}),
+                            rel_col.in_({row[rel_col.name] for row in batch}),
+                        )).all())
+                        batch = [row for row in batch if (row[own_col.name], row[rel_col.name]) not in existing]
+
+                    if batch:
+                        db.session.execute(stmt if stmt is not None else insert(association), batch)
+
+            # added rows are counted from cast sizes, rowcount of executemany differs between drivers
+            after = cast_sizes(movie_ids, lock=False)
+            counts = cast_size_counts(before, after)
+            counts.update(version_counts(association.name))
+            apply_counts(counts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        cls.invalidate(*{row[own_col.name] for row in rows})
+        rel_cls.invalidate(*{row[rel_col.name] for row in rows})
+        cls.versions.bump(association.name)
+        edges = [cls.graph_edges(row[own_col.name], [row[rel_col.name]])[0] for row in rows]
+        cls.recommender.mark(cls.graph.add_edges(edges))
+        return sum(after.values()) - sum(before.values()), missing
+
     @classmethod
     def remove_relation(cls, row_id, rel_obj):
         """
@@ -94,34 +1137,53 @@ class Model(object):
         if not obj:
             raise ValueError(f"ID {row_id} not found.")
 
-        if cls.__name__ == 'Actor':
-            if rel_obj in obj.movies:
-                obj.movies.remove(rel_obj)
+        movie_ids = cls.cast_movie_ids(row_id, [rel_obj.id])
 
-        elif cls.__name__ == 'Movie':
-            if rel_obj in obj.actors:
-                obj.actors.remove(rel_obj)
+        try:
+            before = cast_sizes(movie_ids)
+
+            if cls.__name__ == 'Actor':
+                if rel_obj in obj.movies:
+                    obj.movies.remove(rel_obj)
+
+            elif cls.__name__ == 'Movie':
+                if rel_obj in obj.actors:
+                    obj.actors.remove(rel_obj)
 
-        return commit(obj)
+            db.session.flush()
+            counts = cast_size_counts(before, cast_sizes(movie_ids, lock=False))
+            counts.update(version_counts(association.name))
+            apply_counts(counts)
+            obj = commit(obj)
+        except Exception:
+            db.session.rollback()
+            raise
+
+        cls.invalidate(row_id)
+        type(rel_obj).invalidate(rel_obj.id)
+        cls.versions.bump(association.name)
+        cls.graph_remove(row_id, [rel_obj.id])
+        return obj
 
     @classmethod
     def clear_relations(cls, row_id):
         """
-        Remove all relations by id
+        Remove all relations by id with a single DELETE on association table
 
         cls: class
         row_id: record id
+        return: int (number of removed relations)
         """
-        obj = cls.query.filter_by(id=row_id).first()
-        if not obj:
-            raise ValueError(f"ID {row_id} not found.")
-        
-        if cls.__name__ == 'Actor':
-            for movie in list(obj.movies.all()):
-                obj.movies.remove(movie)
-
-        elif cls.__name__ == 'Movie':
-            for actor in list(obj.actors.all()):
-                obj.actors.remove(actor)
+        try:
+            removed, counts = cls.delete_relations(row_id)
+            counts.update(version_counts(association.name))
+            apply_counts(counts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
 
-        return commit(obj)
\ No newline at end of file
+        cls.invalidate(row_id)
+        cls.versions.bump(association.name)
+        cls.graph_remove(row_id)
+        return removed
\ No newline at end of file
@@ -1,6 +1,7 @@
 from datetime import datetime as dt
 
 from core import db
+from core.search import PrefixIndex
 from models.relations import association
 from models.base import Model
 
@@ -8,11 +9,24 @@ from models.base import Model
 class Movie(Model, db.Model):
     __tablename__ = 'movies'
 
+    # names index for prefix search, built at startup
+    search_index = PrefixIndex()
+    # columns counted in summary table for /api/stats
+    summary_fields = ['genre', 'year']
+
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(50), unique=True, nullable=False)
     year = db.Column(db.Integer)
     genre = db.Column(db.String(20))
 
+    # (column, id) indexes give keyset pages of filtered and sorted lists as range scans
+    __table_args__ = (
+        db.Index('ix_movies_name_id', 'name', 'id'),
+        db.Index('ix_movies_genre_id', 'genre', 'id'),
+        db.Index('ix_movies_year_id', 'year', 'id'),
+        db.Index('ix_movies_genre_year_id', 'genre', 'year', 'id'),
+    )
+
     actors = db.relationship('Actor', 
                             secondary=association,
                             backref=db.backref('filmography', uselist=True), 
@@ -1,7 +1,9 @@
 from core import db
-from sqlalchemy import Table, Column, Integer, ForeignKey
+from sqlalchemy import Table, Column, Integer, ForeignKey, Index
 
 association = Table('association', db.metadata,
                     Column('actor_id', Integer, ForeignKey('actors.id'), primary_key = True),
-                    Column('movie_id', Integer, ForeignKey('movies.id'), primary_key = True)
+                    Column('movie_id', Integer, ForeignKey('movies.id'), primary_key = True),
+                    # primary key covers lookups by actor_id, this one covers lookups by movie_id
+                    Index('ix_association_movie_id', 'movie_id', 'actor_id')
                     )
\ No newline at end of file
@@ -0,0 +1,252 @@
+import random
+from collections import Counter
+
+from sqlalchemy import Table, Column, Integer, String, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects import postgresql, sqlite
+
+from core import db
+from models.relations import association
+from settings.constants import BULK_BATCH_SIZE, VERSION_SLOTS
+
+# counters for /api/stats, e.g. ('movies.genre', 'horror') -> number of horror movies,
+# changed by Model writes in the same transaction as the write itself
+summary = Table('summary', db.metadata,
+                Column('name', String(50), primary_key = True),
+                Column('key', String(50), primary_key = True),
+                Column('count', Integer, nullable = False, default = 0)
+                )
+
+CAST_SIZE = 'movies.cast_size'
+# table versions are counters too, e.g. ('versions', 'actors.3') -> number of committed writes to actors
+# that bumped slot 3, so all workers (and the import command) see the same versions (keys of cached
+# responses and ETags); version of table is the sum of its slots, a write bumps one random slot,
+# so concurrent writers of a table rarely wait for the lock of the same row
+VERSIONS = 'versions'
+# marker row inserted by the worker that fills the summary table, so it's filled only once
+BUILT = 'built'
+
+
+def summary_key(value):
+    """
+    Get counter key of column value (NULL is counted as '')
+    """
+    return '' if value is None else str(value)
+
+
+def version_counts(*tables):
+    """
+    Get counter changes bumping versions of written tables
+
+    tables: table names
+    return: Counter (name, key) -> change
+    """
+    return Counter({(VERSIONS, f'{table}.{random.randrange(VERSION_SLOTS)}'): 1 for table in tables})
+
+
+def version_keys(table):
+    """
+    Get counter keys of version slots of table
+    """
+    return [f'{table}.{slot}' for slot in range(VERSION_SLOTS)]
+
+
+def versions_statement(tables):
+    """
+    Get SELECT of version slots of tables, executed by get_versions or async views
+
+    tables: table names
+    return: select statement of (slot key, count)
+    """
+    keys = [key for table in tables for key in version_keys(table)]
+    return select(summary.c.key, summary.c.count).where(summary.c.name == VERSIONS, summary.c.key.in_(keys))
+
+
+def version_column(table):
+    """
+    Get scalar subquery of version of table, selected together with rows read for caches
+
+    table: table name
+    return: scalar subquery
+    """
+    stmt = select(func.coalesce(func.sum(summary.c.count), 0))
+    return stmt.where(summary.c.name == VERSIONS, summary.c.key.in_(version_keys(table))).scalar_subquery()
+
+
+def table_versions(rows, tables):
+    """
+    Get versions of tables from rows of versions_statement
+
+    rows: rows of versions_statement
+    tables: table names
+    return: tuple of versions (in order of tables, 0 for tables never written)
+    """
+    found = Counter()
+    for key, count in rows:
+        found[key.rpartition('.')[0]] += count
+
+    return tuple(found[table] for table in tables)
+
+
+def get_versions(tables):
+    """
+    Get current versions of tables (read from the same database as the data of request)
+
+    tables: table names
+    return: tuple of versions
+    """
+    return table_versions(db.session.execute(versions_statement(tables)), tables)
+
+
+def lock_movies(movie_ids):
+    """
+    Lock movie rows (in id order) in current transaction, so concurrent cast changes are counted one after another
+
+    movie_ids: sorted movies ids (at most BULK_BATCH_SIZE)
+    """
+    movies = db.metadata.tables['movies']
+    db.session.execute(select(movies.c.id).where(movies.c.id.in_(movie_ids)).order_by(movies.c.id).with_for_update())
+
+
+def cast_sizes(movie_ids, lock=True):
+    """
+    Count association rows of movies in current transaction (index-only scan on ix_association_movie_id)
+
+    movie_ids: movies ids
+    lock: lock movie rows first (False when they were locked earlier in the transaction)
+    return: dict movie id -> cast size
+    """
+    movie_ids = sorted(set(movie_ids))
+    sizes = dict.fromkeys(movie_ids, 0)
+
+    for start in range(0, len(movie_ids), BULK_BATCH_SIZE):
+        batch = movie_ids[start:start + BULK_BATCH_SIZE]
+        if lock:
+            lock_movies(batch)
+
+        stmt = (
+            select(association.c.movie_id, func.count())
+            .where(association.c.movie_id.in_(batch))
+            .group_by(association.c.movie_id)
+        )
+        sizes.update(db.session.execute(stmt).all())
+
+    return sizes
+
+
+def cast_size_counts(before, after):
+    """
+    Get counter changes of movies whose cast size changed
+
+    before: dict movie id -> cast size before write
+    after: dict movie id -> cast size after write
+    return: Counter (name, key) -> change
+    """
+    counts = Counter()
+
+    for movie_id, size in before.items():
+        if after[movie_id] != size:
+            counts[(CAST_SIZE, summary_key(size))] -= 1
+            counts[(CAST_SIZE, summary_key(after[movie_id]))] += 1
+
+    return counts
+
+
+def apply_counts(counts):
+    """
+    Add counter changes in current transaction (caller commits)
+
+    counts: Counter (name, key) -> change
+    """
+    # sorted, so concurrent transactions lock counters in the same order
+    rows = [dict(name=name, key=key, count=count) for (name, key), count in sorted(counts.items()) if count]
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(summary)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[summary.c.name, summary.c.key],
+            set_=dict(count=summary.c.count + stmt.excluded['count']),
+        )
+        db.session.execute(stmt, rows)
+
+    else:
+        # no ON CONFLICT support, update and insert missing counters
+        for row in rows:
+            stmt = (
+                update(summary)
+                .where(summary.c.name == row['name'], summary.c.key == row['key'])
+                .values(count=summary.c.count + row['count'])
+            )
+            if not db.session.execute(stmt).rowcount:
+                db.session.execute(insert(summary).values(**row))
+
+
+def get_summary():
+    """
+    Get all non-zero counters
+
+    return: dict name -> dict key -> count
+    """
+    found = {}
+    stmt = (
+        select(summary.c.name, summary.c.key, summary.c.count)
+        .where(summary.c.count != 0, summary.c.name.not_in([VERSIONS, BUILT]))
+    )
+
+    for name, key, count in db.session.execute(stmt):
+        found.setdefault(name, {})[key] = count
+
+    return found
+
+
+def insert_marker():
+    """
+    Insert BUILT marker row in current transaction (caller commits)
+
+    return: True if inserted, False if it exists (concurrent inserts wait for the first transaction)
+    """
+    row = dict(name=BUILT, key='', count=1)
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect in ('postgresql', 'sqlite'):
+        stmt = (postgresql if dialect == 'postgresql' else sqlite).insert(summary).on_conflict_do_nothing()
+        return db.session.execute(stmt.values(**row)).rowcount == 1
+
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(summary).values(**row))
+        return True
+    except IntegrityError:
+        return False
+
+
+def build_summary(models):
+    """
+    Fill summary table with full-table aggregates once (first start on existing data)
+
+    The marker row and the aggregates are written in one transaction, so workers starting
+    together fill the table only once.
+
+    models: model classes with summary_fields
+    """
+    try:
+        if not insert_marker():
+            db.session.rollback()
+            return
+
+        # counters written before the marker existed are kept up to date by writes already
+        stmt = select(summary.c.name).where(summary.c.name.not_in([VERSIONS, BUILT])).limit(1)
+        if db.session.execute(stmt).first() is None:
+            counts = Counter()
+            for model in models:
+                counts.update(model.summary_aggregates())
+            apply_counts(counts)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
@@ -34,18 +34,18 @@ with app.app_context():
     print('created movie:', movie.__dict__, '\n')
 
     upd_actor = Actor.update(1, **data_actor_upd)
-    print('updated actor:', upd_actor.__dict__, '\n')
+    print('updated actor:', upd_actor, '\n')
 
     upd_movie = Movie.update(1, **data_movie_upd)
-    print('updated movie:', upd_movie.__dict__, '\n')
+    print('updated movie:', upd_movie, '\n')
 
-    add_rels_actor = Actor.add_relation(1, upd_movie)
+    add_rels_actor = Actor.add_relation(1, Movie.query.get(upd_movie['id']))
     movie_2 = Movie.create(**data_movie)
     add_more_rels_actor = Actor.add_relation(1, movie_2)
     print('relations list:', add_more_rels_actor.filmography, '\n')
 
-    clear_rels_actor = Actor.clear_relations(1)
-    print('all relations cleared:', clear_rels_actor.filmography, '\n')
+    removed_rels = Actor.clear_relations(1)
+    print('all relations cleared:', removed_rels, '\n')
 
     del_actor = Actor.delete(1)
     print('actor deleted:', del_actor)
\ No newline at end of file
@@ -5,7 +5,100 @@ if DB_URL is None:
     raise Exception('ERROR: No DB_URL')         
 #print(DB_URL)                                                      
 
+# connection pool (not used for in-memory SQLite), recycle -1 keeps connections forever
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+# connections opened at startup (at most pool size)
+DB_POOL_WARMUP = int(os.environ.get('DB_POOL_WARMUP', DB_POOL_SIZE))
+
+# read replicas (comma-separated URLs, none by default), GET requests read from a random replica;
+# after a write, reads of the client stay on primary for the sticky window,
+# replica reads aren't cached until tables were not written for the max replica lag
+DB_REPLICA_URLS = [url.strip() for url in os.environ.get('DB_REPLICA_URLS', '').split(',') if url.strip()]
+DB_REPLICA_STICKY_SECONDS = float(os.environ.get('DB_REPLICA_STICKY_SECONDS', 5))
+DB_REPLICA_MAX_LAG = float(os.environ.get('DB_REPLICA_MAX_LAG', DB_REPLICA_STICKY_SECONDS))
+
 ACTOR_FIELDS = ['id', 'name', 'gender', 'date_of_birth']
 MOVIE_FIELDS = ['id', 'name', 'year', 'genre']
+# association rows of imports, records are given by id (actor_id) or by name (actor)
+RELATION_FIELDS = ['actor_id', 'movie_id', 'actor', 'movie']
+
+DATE_FORMAT = '%d.%m.%Y'
+
+# pagination
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 100))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 1000))
+
+# list filters (indexed columns) and sorting
+ACTOR_FILTER_FIELDS = ['gender']
+ACTOR_RANGE_FIELDS = ['date_of_birth']
+ACTOR_SORT_FIELDS = ['id', 'name', 'date_of_birth']
+
+MOVIE_FILTER_FIELDS = ['genre']
+MOVIE_RANGE_FIELDS = ['year']
+MOVIE_SORT_FIELDS = ['id', 'name', 'year']
+
+# export
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+
+# bulk writes
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE', 500))
+
+# CSV/NDJSON import (rows per transaction, bytes read from upload at once, errors listed in report)
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 5000))
+IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 65536))
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', 100))
+
+# get-by-id cache
+RECORD_CACHE_SIZE = int(os.environ.get('RECORD_CACHE_SIZE', 10000))
+RECORD_CACHE_TTL = float(os.environ.get('RECORD_CACHE_TTL', 60))
+
+# list responses cache
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1000))
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', 30))
+# table versions (keys of cached responses and ETags): counter rows per table, a write bumps a random one
+# (same value for all workers), seconds versions read from the database are reused by a worker
+VERSION_SLOTS = int(os.environ.get('VERSION_SLOTS', 16))
+VERSIONS_TTL = float(os.environ.get('VERSIONS_TTL', 1))
+
+# json encoder for responses ('orjson' if installed, 'default' for flask json provider)
+JSON_ENCODER = os.environ.get('JSON_ENCODER', 'orjson')
+
+# name search
+SEARCH_DEFAULT_LIMIT = int(os.environ.get('SEARCH_DEFAULT_LIMIT', 10))
+SEARCH_MAX_LIMIT = int(os.environ.get('SEARCH_MAX_LIMIT', 100))
+
+
+# search indexes and co-star graph: 'background' (thread started at startup, lookups and writes
+# meanwhile wait for it), 'startup' (before serving)
+INDEXES_WARMUP = os.environ.get('INDEXES_WARMUP', 'background')
+
+# co-star graph (max movies in shortest path, overlay share of edges before arrays are rebuilt)
+GRAPH_MAX_DEPTH = int(os.environ.get('GRAPH_MAX_DEPTH', 6))
+GRAPH_COMPACT_RATIO = float(os.environ.get('GRAPH_COMPACT_RATIO', 0.1))
+
+# recommendations (kept top records per actor/movie, max (row, shared, related) triples per sparse product batch,
+# about 60 bytes of build memory each)
+RECOMMEND_TOP_K = int(os.environ.get('RECOMMEND_TOP_K', 20))
+RECOMMEND_BATCH_NNZ = int(os.environ.get('RECOMMEND_BATCH_NNZ', 1000000))
+# when all rows are computed: 'background' (thread started at startup), 'startup' (before serving), 'lazy' (first lookup)
+RECOMMEND_WARMUP = os.environ.get('RECOMMEND_WARMUP', 'background')
+
+# request metrics for /metrics (latency histogram bounds in seconds)
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+METRICS_BUCKETS = [
+    float(bound) for bound in
+    os.environ.get('METRICS_BUCKETS', '0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10').split(',')
+]
+
+# SQL statements per request: X-Query-Count/-Time/-Repeated headers (always in debug mode),
+# warning when the same statement runs QUERY_REPEAT_THRESHOLD times in one request (N+1)
+QUERY_DEBUG = os.environ.get('QUERY_DEBUG', 'false').lower() in ('1', 'true', 'yes')
+QUERY_REPEAT_THRESHOLD = int(os.environ.get('QUERY_REPEAT_THRESHOLD', 5))
 
-DATE_FORMAT = '%d.%m.%Y'
\ No newline at end of file
+# ASGI mode (asgi.py): async database URL (derived from DB_URL if not set), threads for routes served by Flask
+ASYNC_DB_URL = os.environ.get('ASYNC_DB_URL', None)
+ASGI_WSGI_WORKERS = int(os.environ.get('ASGI_WSGI_WORKERS', 20))
\ No newline at end of file
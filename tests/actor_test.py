@@ -1,11 +1,29 @@
+import json
+import os
+import subprocess
+import sys
+import time
 import pytest
 import requests
 
 ACTOR_LIST_ROUTE = 'http://127.0.0.1:8000/api/actors'
 ACTOR_ID_ROUTE = 'http://127.0.0.1:8000/api/actor'
+ACTOR_EXPORT_ROUTE = 'http://127.0.0.1:8000/api/actors/export'
+ACTOR_BULK_ROUTE = 'http://127.0.0.1:8000/api/actors/bulk'
+CACHE_STATS_ROUTE = 'http://127.0.0.1:8000/internal/cache'
 
 
-@pytest.mark.parametrize(('body', 'expected_response'), [(dict([]), 200)])
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict([]), 200),
+        (dict(limit=5), 200),
+        (dict(limit=5, after=1), 200),
+        (dict(limit='five'), 400), # limit should be integer
+        (dict(limit=0), 400), # limit should be positive
+        (dict(after='one'), 400) # cursor should be integer
+    ]
+)
 def test_get_all_actors(body, expected_response):
     response = requests.get(ACTOR_LIST_ROUTE, data=body)
     assert response.status_code == expected_response
@@ -89,4 +107,213 @@ def test_delete_actor(body, expected_response):
         body = dict(id=post_response.json()['id'])  # get the actor id that was just created
 
     response = requests.delete(ACTOR_ID_ROUTE, data=body)
-    assert response.status_code == expected_response
\ No newline at end of file
+    assert response.status_code == expected_response
+
+
+def test_get_all_actors_pagination():
+    first_page = requests.get(ACTOR_LIST_ROUTE, params=dict(limit=1)).json()
+    assert len(first_page['actors']) <= 1
+
+    if first_page['next_cursor'] is not None:
+        second_page = requests.get(ACTOR_LIST_ROUTE, params=dict(limit=1, after=first_page['next_cursor'])).json()
+        assert all(row['id'] > first_page['next_cursor'] for row in second_page['actors'])
+
+
+def test_get_all_actors_sorted_nulls_last():
+    births = ['02.02.1972', None, '03.03.1973', None, '01.01.1971']
+    for i, date_of_birth in enumerate(births):
+        requests.post(ACTOR_ID_ROUTE, json=dict(name=f'Nulls last actor {i}', gender='nulls-last', date_of_birth=date_of_birth))
+
+    # pages go through records with dates first, then through records without, cursor crossing the boundary
+    for sort, expected in [('-date_of_birth', [2, 0, 4, 3, 1]), ('date_of_birth', [4, 0, 2, 1, 3])]:
+        params = dict(gender='nulls-last', sort=sort, limit=2)
+        names = []
+        while True:
+            page = requests.get(ACTOR_LIST_ROUTE, params=params).json()
+            names.extend(actor['name'] for actor in page['actors'])
+            if page['next_cursor'] is None:
+                break
+            params['after'] = page['next_cursor']
+
+        assert names == [f'Nulls last actor {i}' for i in expected]
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict([]), 200),
+        (dict(format='ndjson'), 200),
+        (dict(format='json'), 200),
+        (dict(format='xml'), 400) # format should be supported
+    ]
+)
+def test_export_actors(body, expected_response):
+    response = requests.get(ACTOR_EXPORT_ROUTE, params=body)
+    assert response.status_code == expected_response
+
+    if body.get('format') == 'json':
+        assert isinstance(response.json(), list)
+    elif expected_response == 200:
+        assert all(json.loads(line) for line in response.text.splitlines())
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response', 'created'),
+    [
+        ([dict(name='Cillian Murphy', gender='male', date_of_birth='25.05.1976'),
+            dict(name='Florence Pugh', gender='female', date_of_birth='03.01.1996')], 200, 2),
+        ([dict(name='Emily Blunt', gender='female', date_of_birth='23.02.1983'),
+            dict(name='Robert Downey Jr.', gender='male')], 200, 1), # invalid rows are reported per row
+        ([dict(name='Josh Hartnett', gender='male', date_of_birth='21/07/1978')], 400, 0), # no valid rows
+        ([dict(name='Emma Stone', gender='female', date_of_birth='06.11.1988'),
+            dict(name='Emma Stone', gender='female', date_of_birth='06.11.1988')], 200, 1), # names should be unique within records
+        ([dict(name='Cillian Murphy', gender='male', date_of_birth='25.05.1976'),
+            dict(name='Adam Driver', gender='male', date_of_birth='19.11.1983')], 200, 1), # existing names are reported per row
+        ([dict(name='Florence Pugh', gender='female', date_of_birth='03.01.1996')], 400, 0), # all names exist
+        ([dict(id=1, name='Barry Keoghan', gender='male', date_of_birth='18.10.1992'),
+            dict(name='Jacob Elordi', gender='male', date_of_birth='26.06.1997')], 200, 1), # ids should not be specified
+        (dict(name='Rami Malek'), 400, 0) # records should be a list
+    ]
+)
+def test_bulk_add_actors(body, expected_response, created):
+    response = requests.post(ACTOR_BULK_ROUTE, json=body)
+    assert response.status_code == expected_response
+
+    if expected_response == 200:
+        assert len(response.json()['ids']) == created
+        assert len(response.json()['errors']) == len(body) - created
+
+
+def test_bulk_add_actors_form():
+    records = [dict(name='Kenneth Branagh', gender='male', date_of_birth='10.12.1960')]
+    response = requests.post(ACTOR_BULK_ROUTE, data=dict(records=str(records)))
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict(name='Anya Taylor-Joy', gender='female', date_of_birth='16.04.1996'), 200),
+        (dict(name='Ralph Fiennes', gender='male'), 400), # all required fields should be specified
+        (dict(name='Rosamund Pike', gender='female', date_of_birth='27.01.1979', salary=100), 400), # inputted fields should exist
+        (dict(name='Nicholas Hoult', gender='male', date_of_birth=19891207), 400), # date of birth should be in format DATE_FORMAT
+        (dict(name=['Olivia Colman'], gender='female', date_of_birth='30.01.1974'), 400), # name should be a string
+        (dict(name=None, gender='female', date_of_birth='30.01.1974'), 400), # name should not be null
+        (dict(name='Olivia Colman' * 5, gender='female', date_of_birth='30.01.1974'), 400), # name should fit the column
+        (dict(name='Lily Gladstone', gender=None, date_of_birth=None), 200) # nullable fields may be null
+    ]
+)
+def test_add_actor_json(body, expected_response):
+    response = requests.post(ACTOR_ID_ROUTE, json=body)
+    assert response.status_code == expected_response
+
+    if expected_response == 200:
+        # fields of JSON body are validated like form fields, id is converted for update
+        actor_id = response.json()['id']
+        response = requests.put(ACTOR_ID_ROUTE, json=dict(id=str(actor_id), gender='unknown'))
+        assert response.json()['gender'] == 'unknown'
+
+
+@pytest.mark.parametrize(
+    ('method', 'body'),
+    [
+        ('GET', dict(id=None)), # id should not be null
+        ('GET', dict(id=[1])), # id should be integer
+        ('PUT', dict(id=None, gender='female')), # id should not be null
+        ('PUT', dict(id=True, gender='female')), # id should be integer, not bool
+        ('DELETE', dict(id=1.5)), # id should be integer, not fraction
+        ('DELETE', dict(id={'id': 1})) # id should be integer
+    ]
+)
+def test_actor_id_json(method, body):
+    response = requests.request(method, ACTOR_ID_ROUTE, json=body)
+    assert response.status_code == 400
+    assert 'error' in response.json()
+
+
+@pytest.mark.parametrize(
+    ('route', 'body'),
+    [
+        (ACTOR_LIST_ROUTE, dict(sort=1)), # sort should be string
+        (ACTOR_LIST_ROUTE, dict(sort=['-name'])), # sort should be string
+        (ACTOR_LIST_ROUTE, dict(expand=None)), # expand should be string
+        (ACTOR_ID_ROUTE, dict(id=1, expand=['filmography'])) # expand should be string
+    ]
+)
+def test_actor_query_params_json(route, body):
+    response = requests.get(route, json=body)
+    assert response.status_code == 400
+    assert 'error' in response.json()
+
+
+def test_add_actor_invalid_json():
+    response = requests.post(ACTOR_ID_ROUTE, data=b'{"name": ', headers={'Content-Type': 'application/json'})
+    assert response.status_code == 400
+    assert response.json()['error'] == 'Invalid JSON body.'
+
+
+def test_add_actors_msgpack():
+    msgpack = pytest.importorskip('msgpack')
+    headers = {'Content-Type': 'application/msgpack'}
+
+    body = msgpack.packb(dict(name='Jodie Comer', gender='female', date_of_birth='11.03.1993'))
+    response = requests.post(ACTOR_ID_ROUTE, data=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json()['name'] == 'Jodie Comer'
+
+    # array bodies are batches
+    body = msgpack.packb([dict(name='Paul Mescal', gender='male', date_of_birth='02.02.1996'), dict(name='Barry Keoghan')])
+    response = requests.post(ACTOR_BULK_ROUTE, data=body, headers=headers)
+    assert response.status_code == 200
+    assert (len(response.json()['ids']), len(response.json()['errors'])) == (1, 1)
+
+    response = requests.post(ACTOR_ID_ROUTE, data=b'\xc1', headers=headers)
+    assert response.status_code == 400
+
+
+def test_get_actor_by_id_cache():
+    actor_id = requests.post(ACTOR_ID_ROUTE, data=dict(name='Tilda Swinton', gender='female', date_of_birth='05.11.1960')).json()['id']
+
+    hits = requests.get(CACHE_STATS_ROUTE).json()['records']['hits']
+    requests.get(ACTOR_ID_ROUTE, data=dict(id=actor_id))
+    requests.get(ACTOR_ID_ROUTE, data=dict(id=actor_id))
+    assert requests.get(CACHE_STATS_ROUTE).json()['records']['hits'] >= hits + 1
+
+    # cached record is invalidated by update and delete
+    requests.put(ACTOR_ID_ROUTE, data=dict(id=actor_id, gender='male'))
+    assert requests.get(ACTOR_ID_ROUTE, data=dict(id=actor_id)).json()['gender'] == 'male'
+
+    requests.delete(ACTOR_ID_ROUTE, data=dict(id=actor_id))
+    assert requests.get(ACTOR_ID_ROUTE, data=dict(id=actor_id)).status_code == 400
+
+
+def test_get_actor_by_id_cache_other_process():
+    if not os.environ.get('DB_URL'):
+        pytest.skip('DB_URL of the server is not set')
+
+    actor_id = requests.post(ACTOR_ID_ROUTE, data=dict(name='Ewan McGregor', gender='male', date_of_birth='31.03.1971')).json()['id']
+    assert requests.get(ACTOR_ID_ROUTE, data=dict(id=actor_id)).json()['gender'] == 'male'
+
+    # cached record is checked against table version, so updates by another process are seen too
+    subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'run', 'import-data', 'actors', '-'],
+        input=b'name,gender,date_of_birth\nEwan McGregor,unknown,31.03.1971\n', cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True, capture_output=True,
+    )
+    time.sleep(1)  # servers reuse versions read from the database for VERSIONS_TTL (1 s)
+    assert requests.get(ACTOR_ID_ROUTE, data=dict(id=actor_id)).json()['gender'] == 'unknown'
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict(gender='female', date_of_birth_from='01.01.1990'), 200),
+        (dict(sort='-date_of_birth'), 200),
+        (dict(date_of_birth_from='1990-01-01'), 400), # date should be in format DATE_FORMAT
+        (dict(sort='salary'), 400), # sort field should be allowed
+        (dict(sort='name', after='not a cursor'), 400) # cursor should be valid
+    ]
+)
+def test_get_all_actors_filters(body, expected_response):
+    response = requests.get(ACTOR_LIST_ROUTE, params=body)
+    assert response.status_code == expected_response
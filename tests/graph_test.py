@@ -0,0 +1,81 @@
+import pytest
+import requests
+
+ACTOR_PATH_ROUTE = 'http://127.0.0.1:8000/api/actor-path'
+ACTOR_COSTARS_ROUTE = 'http://127.0.0.1:8000/api/actor-costars'
+ACTOR_ID_ROUTE = 'http://127.0.0.1:8000/api/actor'
+MOVIE_ID_ROUTE = 'http://127.0.0.1:8000/api/movie'
+ACTOR_REL_ROUTE = 'http://127.0.0.1:8000/api/actor-relations'
+MOVIE_REL_ROUTE = 'http://127.0.0.1:8000/api/movie-relations'
+
+
+def create_actor(name):
+    return requests.post(ACTOR_ID_ROUTE, data=dict(name=name, gender='female', date_of_birth='01.01.1980')).json()['id']
+
+
+def create_movie(name):
+    return requests.post(MOVIE_ID_ROUTE, data=dict(name=name, genre='drama', year='2000')).json()['id']
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict([]), 400), # ids should be specified
+        (dict(to=1), 400), # both ids should be specified
+        (dict(to=1, **{'from': 'one'}), 400), # ids should be integers
+        (dict(to=1, max_depth=0, **{'from': 1}), 400), # max depth should be positive
+        (dict(to=1, max_depth=-2, **{'from': 1}), 400), # max depth should be positive
+        (dict(to=7**10, **{'from': 7**10}), 400), # such actor id record should exist
+    ]
+)
+def test_get_actor_path(body, expected_response):
+    response = requests.get(ACTOR_PATH_ROUTE, params=body)
+    assert response.status_code == expected_response
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict([]), 400), # id should be specified
+        (dict(id='one'), 400), # id should be integer
+        (dict(id=7**10), 400), # such actor id record should exist
+    ]
+)
+def test_get_actor_costars(body, expected_response):
+    response = requests.get(ACTOR_COSTARS_ROUTE, params=body)
+    assert response.status_code == expected_response
+
+
+def test_actor_path_follows_relations():
+    # a - first - b - second - c, d is not connected
+    a, b, c, d = [create_actor(f'Graph actor {name}') for name in 'abcd']
+    first, second = create_movie('Graph movie first'), create_movie('Graph movie second')
+
+    requests.put(MOVIE_REL_ROUTE, data=dict(id=first, relation_id=f'{a},{b}'))
+    requests.put(ACTOR_REL_ROUTE, data=dict(id=c, relation_id=second))
+    requests.put(ACTOR_REL_ROUTE, data=dict(id=b, relation_id=second))
+
+    found = requests.get(ACTOR_PATH_ROUTE, params={'from': a, 'to': c}).json()
+    assert found['degrees'] == 2
+    assert [(step['type'], step['id']) for step in found['path']] == [
+        ('actor', a), ('movie', first), ('actor', b), ('movie', second), ('actor', c)
+    ]
+    assert found['path'][0]['name'] == 'Graph actor a'
+
+    assert requests.get(ACTOR_PATH_ROUTE, params={'from': a, 'to': c, 'max_depth': 1}).json()['path'] is None
+    assert requests.get(ACTOR_PATH_ROUTE, params={'from': a, 'to': d}).json()['path'] is None
+
+    costars = requests.get(ACTOR_COSTARS_ROUTE, params=dict(id=b, limit=1)).json()
+    assert [costar['id'] for costar in costars['costars']] == [a]
+    costars = requests.get(ACTOR_COSTARS_ROUTE, params=dict(id=b, after=costars['next_cursor'])).json()
+    assert [costar['id'] for costar in costars['costars']] == [c]
+
+    # cleared relations and deleted records leave the graph
+    requests.delete(ACTOR_REL_ROUTE, data=dict(id=b))
+    assert requests.get(ACTOR_PATH_ROUTE, params={'from': a, 'to': c}).json()['path'] is None
+
+    requests.put(MOVIE_REL_ROUTE, data=dict(id=first, relation_id=c))
+    assert requests.get(ACTOR_PATH_ROUTE, params={'from': a, 'to': c}).json()['degrees'] == 1
+
+    requests.delete(MOVIE_ID_ROUTE, data=dict(id=first))
+    assert requests.get(ACTOR_COSTARS_ROUTE, params=dict(id=a)).json()['costars'] == []
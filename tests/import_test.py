@@ -0,0 +1,114 @@
+import json
+import os
+import pytest
+import requests
+
+ACTOR_IMPORT_ROUTE = 'http://127.0.0.1:8000/api/actors/import'
+MOVIE_IMPORT_ROUTE = 'http://127.0.0.1:8000/api/movies/import'
+RELATION_IMPORT_ROUTE = 'http://127.0.0.1:8000/api/relations/import'
+ACTOR_ID_ROUTE = 'http://127.0.0.1:8000/api/actor'
+MOVIE_CAST_ROUTE = 'http://127.0.0.1:8000/api/movie-cast'
+SEARCH_ROUTE = 'http://127.0.0.1:8000/api/search'
+STATS_ROUTE = 'http://127.0.0.1:8000/api/stats'
+
+
+def ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+@pytest.mark.parametrize(
+    ('route', 'params', 'body', 'expected_response'),
+    [
+        (ACTOR_IMPORT_ROUTE, dict(), 'name,gender,date_of_birth\nKeira Knightley,female,26.03.1985\n', 200),
+        (ACTOR_IMPORT_ROUTE, dict(format='ndjson'), ndjson(dict(name='Orlando Bloom', gender='male', date_of_birth='13.01.1977')), 200),
+        (MOVIE_IMPORT_ROUTE, dict(), 'id,name,year,genre\n7,Pirates of the Caribbean,2003,adventure\n', 200), # ids of dumps are ignored
+        (ACTOR_IMPORT_ROUTE, dict(format='xml'), '<actors/>', 400), # format should exist
+        (ACTOR_IMPORT_ROUTE, dict(), 'name,gender\nGeoffrey Rush,male\n', 400), # all required fields should be specified
+        (ACTOR_IMPORT_ROUTE, dict(), 'name,gender,date_of_birth,salary\nJack Davenport,male,01.03.1973,100\n', 400), # inputted fields should exist
+        (ACTOR_IMPORT_ROUTE, dict(), 'name,gender,date_of_birth\nJonathan Pryce,male,1947-06-01\n', 400), # date of birth should be in format DATE_FORMAT
+        (MOVIE_IMPORT_ROUTE, dict(format='ndjson'), '{"name": "Troy", "year": "two thousand four", "genre": "war"}\n', 400), # year should be integer
+        (MOVIE_IMPORT_ROUTE, dict(format='ndjson'), '["Troy", 2004, "war"]\n{"name": \n', 400) # lines should be JSON objects
+    ]
+)
+def test_import(route, params, body, expected_response):
+    response = requests.post(route, params=params, data=body.encode(), headers={'Content-Type': 'text/csv'})
+    assert response.status_code == expected_response
+
+
+def test_import_upserts_by_name():
+    body = 'name,gender,date_of_birth\nNaomie Harris,female,06.09.1976\nStellan Skarsgard,male,13.06.1951\n'
+    report = requests.post(ACTOR_IMPORT_ROUTE, data=body.encode()).json()
+    assert (report['inserted'], report['updated'], report['failed']) == (2, 0, 0)
+
+    actor_id = requests.get(SEARCH_ROUTE, params=dict(q='Naomie Harris', type='actors')).json()['actors'][0]['id']
+    assert requests.get(ACTOR_ID_ROUTE, params=dict(id=actor_id)).json()['gender'] == 'female' # cached record
+
+    # same names update existing records, unchanged rows are not written, bad rows are reported by line
+    body = 'name,gender,date_of_birth\nNaomie Harris,unknown,06.09.1976\nStellan Skarsgard,male,13.06.1951\nBill Nighy,male,12-12-1949\n'
+    report = requests.post(ACTOR_IMPORT_ROUTE, data=body.encode()).json()
+    assert (report['rows'], report['inserted'], report['updated'], report['unchanged'], report['failed']) == (3, 0, 1, 1, 1)
+    assert report['errors'][0]['line'] == 4
+
+    assert requests.get(ACTOR_ID_ROUTE, params=dict(id=actor_id)).json()['gender'] == 'unknown'
+    assert requests.get(STATS_ROUTE).json()['actors']['gender'].get('unknown', 0) >= 1
+
+
+def test_import_ndjson_json_content_type():
+    # NDJSON body is not one JSON document, it is read line by line by the import, not decoded up front
+    body = ndjson(dict(name='Hugh Grant', gender='male', date_of_birth='09.09.1960'), dict(name='Emma Thompson', gender='female', date_of_birth='15.04.1959'))
+    response = requests.post(ACTOR_IMPORT_ROUTE, params=dict(format='ndjson'), data=body.encode(), headers={'Content-Type': 'application/json'})
+    assert response.status_code == 200
+    assert (response.json()['rows'], response.json()['failed']) == (2, 0)
+
+
+def test_import_relations():
+    requests.post(ACTOR_IMPORT_ROUTE, data=b'name,gender,date_of_birth\nTom Hiddleston,male,09.02.1981\nBrie Larson,female,01.10.1989\n')
+    requests.post(MOVIE_IMPORT_ROUTE, params=dict(format='ndjson'), data=ndjson(dict(name='Kong: Skull Island', year=2017, genre='action')).encode())
+    movie_id = requests.get(SEARCH_ROUTE, params=dict(q='Kong: Skull', type='movies')).json()['movies'][0]['id']
+    actor_id = requests.get(SEARCH_ROUTE, params=dict(q='Brie Larson', type='actors')).json()['actors'][0]['id']
+
+    # records by name or by id, repeated pairs are added once
+    body = f'actor,movie_id,actor_id\nTom Hiddleston,{movie_id},\n,{movie_id},{actor_id}\n,{movie_id},{actor_id}\nNobody,{movie_id},\n,{7**10},{actor_id}\n'
+    response = requests.post(RELATION_IMPORT_ROUTE, data=body.encode())
+    report = response.json()
+    assert response.status_code == 200
+    assert (report['inserted'], report['failed']) == (2, 2)
+
+    cast = requests.get(MOVIE_CAST_ROUTE, params=dict(id=movie_id)).json()['cast']
+    assert {actor['name'] for actor in cast} == {'Tom Hiddleston', 'Brie Larson'}
+
+    # existing pairs are skipped
+    report = requests.post(RELATION_IMPORT_ROUTE, params=dict(format='ndjson'), data=ndjson(dict(actor_id=actor_id, movie_id=movie_id)).encode()).json()
+    assert (report['inserted'], report['unchanged']) == (0, 1)
+
+
+def test_import_copy_postgres():
+    if not os.environ.get('DB_URL', '').startswith('postgresql'):
+        pytest.skip('server runs without Postgres DB_URL')
+
+    # COPY text format escapes tabs, newlines and backslashes of values
+    actors = [dict(name='Copy\tTab Actor', gender='female', date_of_birth='01.02.1990'), dict(name='Copy\\Slash Actor', gender='male', date_of_birth='03.04.1980')]
+    report = requests.post(ACTOR_IMPORT_ROUTE, params=dict(format='ndjson'), data=ndjson(*actors).encode()).json()
+    assert (report['inserted'], report['failed']) == (2, 0)
+    report = requests.post(MOVIE_IMPORT_ROUTE, params=dict(format='ndjson'), data=ndjson(dict(name='Copy\nLine Movie', year=2001, genre='drama')).encode()).json()
+    assert (report['inserted'], report['failed']) == (1, 0)
+
+    # relations go through temporary table, existing pairs are skipped
+    pairs = [dict(actor=actor['name'], movie='Copy\nLine Movie') for actor in actors]
+    report = requests.post(RELATION_IMPORT_ROUTE, params=dict(format='ndjson'), data=ndjson(*pairs, pairs[0]).encode()).json()
+    assert (report['inserted'], report['failed']) == (2, 0)
+    report = requests.post(RELATION_IMPORT_ROUTE, params=dict(format='ndjson'), data=ndjson(*pairs).encode()).json()
+    assert (report['inserted'], report['unchanged']) == (0, 2)
+
+    movie_id = requests.get(SEARCH_ROUTE, params=dict(q='Copy\nLine Movie', type='movies')).json()['movies'][0]['id']
+    cast = requests.get(MOVIE_CAST_ROUTE, params=dict(id=movie_id)).json()['cast']
+    assert {actor['name'] for actor in cast} == {actor['name'] for actor in actors}
+
+
+def test_import_file_upload():
+    files = dict(file=('movies.csv', b'name,year,genre\nAbout Time,2013,romance\n', 'text/csv'))
+    report = requests.post(MOVIE_IMPORT_ROUTE, files=files).json()
+    assert report['inserted'] == 1
+
+    found = requests.get(SEARCH_ROUTE, params=dict(q='About Time', type='movies')).json()
+    assert [movie['name'] for movie in found['movies']] == ['About Time']
@@ -0,0 +1,79 @@
+import time
+import requests
+
+POOL_STATS_ROUTE = 'http://127.0.0.1:8000/internal/pool'
+ACTOR_LIST_ROUTE = 'http://127.0.0.1:8000/api/actors'
+ACTOR_ID_ROUTE = 'http://127.0.0.1:8000/api/actor'
+METRICS_ROUTE = 'http://127.0.0.1:8000/metrics'
+
+
+def get_metrics():
+    response = requests.get(METRICS_ROUTE)
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain')
+
+    samples = {}
+    for line in response.text.splitlines():
+        if line and not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+
+def total(stats, counter):
+    return sum(pool[counter] for pool in stats.values())
+
+
+def test_pool_stats():
+    before = requests.get(POOL_STATS_ROUTE).json()
+    requests.get(ACTOR_LIST_ROUTE, params=dict(limit=1, sort='name'))
+    after = requests.get(POOL_STATS_ROUTE).json()
+
+    # connections were opened at startup and are reused
+    assert total(after, 'checkouts') > total(before, 'checkouts')
+    assert total(after, 'connects') == total(before, 'connects')
+    assert total(after, 'timeouts') == 0
+    assert all(pool['checked_out'] <= pool['size'] + max(pool['overflow'], 0) for pool in after.values())
+
+
+def test_metrics_count_requests():
+    key = '{route="/api/actor",method="GET"}'
+    before = get_metrics()
+
+    requests.get(ACTOR_ID_ROUTE, params=dict(id=10 ** 9))
+    requests.get(ACTOR_ID_ROUTE, params=dict(id='abc'))
+    requests.get('http://127.0.0.1:8000/api/no-such-route')
+
+    after = get_metrics()
+    assert after['http_requests_total' + key] == before.get('http_requests_total' + key, 0) + 2
+    assert after['http_request_duration_seconds_count' + key] == after['http_requests_total' + key]
+    assert after['http_request_duration_seconds_bucket{route="/api/actor",method="GET",le="+Inf"}'] == after['http_requests_total' + key]
+    assert after['http_responses_total{route="/api/actor",method="GET",status="400"}'] >= 2
+    assert after['http_responses_total{route="<unmatched>",method="GET",status="404"}'] >= 1
+    assert after['http_requests_in_flight' + key] == 0
+
+
+def test_metrics_buckets_are_cumulative():
+    requests.get(ACTOR_LIST_ROUTE, params=dict(limit=1))
+    samples = get_metrics()
+
+    buckets = [
+        (float(name.split('le="')[1].split('"')[0]), count) for name, count in samples.items()
+        if name.startswith('http_request_duration_seconds_bucket{route="/api/actors",method="GET"')
+    ]
+    counts = [count for _, count in sorted(buckets)]
+    assert counts == sorted(counts)
+    assert counts[-1] == samples['http_requests_total{route="/api/actors",method="GET"}']
+
+
+def test_startup_timings():
+    # search indexes and graph are loaded in background, steps are added when they're loaded
+    for _ in range(100):
+        timings = requests.get('http://127.0.0.1:8000/internal/startup').json()
+        if timings['indexes_loaded']:
+            break
+        time.sleep(0.1)
+
+    assert set(timings['steps']) == {'app', 'imports', 'pool', 'schema', 'summary', 'search_index', 'graph'}
+    assert timings['total'] >= sum(timings['steps'].values()) - 0.01
+    assert isinstance(timings['schema_created'], bool)
@@ -1,11 +1,28 @@
+import json
+import os
+import subprocess
+import sys
+import time
 import pytest
 import requests
 
 MOVIE_LIST_ROUTE = 'http://127.0.0.1:8000/api/movies'
 MOVIE_ID_ROUTE = 'http://127.0.0.1:8000/api/movie'
+MOVIE_EXPORT_ROUTE = 'http://127.0.0.1:8000/api/movies/export'
+MOVIE_BULK_ROUTE = 'http://127.0.0.1:8000/api/movies/bulk'
 
 
-@pytest.mark.parametrize(('body', 'expected_response'), [(dict([]), 200)])
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict([]), 200),
+        (dict(limit=5), 200),
+        (dict(limit=5, after=1), 200),
+        (dict(limit='five'), 400), # limit should be integer
+        (dict(limit=0), 400), # limit should be positive
+        (dict(after='one'), 400) # cursor should be integer
+    ]
+)
 def test_get_all_movies(body, expected_response):
     response = requests.get(MOVIE_LIST_ROUTE, data=body)
     assert response.status_code == expected_response
@@ -75,6 +92,34 @@ def test_update_movie(body_create, body_update, expected_response):
     assert response.status_code == expected_response
 
 
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict(name='Drive', genre='crime', year=2011.0), 200),
+        (dict(name='Gravity', genre='sci-fi', year=True), 400), # year should be integer, not bool
+        (dict(name='Her', genre='romance', year=2013.5), 400), # year should be integer, not fraction
+        (dict(name='Prisoners', genre={'thriller': True}, year=2013), 400) # genre should be a string
+    ]
+)
+def test_add_movie_json(body, expected_response):
+    response = requests.post(MOVIE_ID_ROUTE, json=body)
+    assert response.status_code == expected_response
+
+    if expected_response == 200:
+        assert response.json()['year'] == int(body['year'])
+
+
+def test_update_movie_json():
+    movie_id = requests.post(MOVIE_ID_ROUTE, json=dict(name='Sicario', genre='drama', year=2015)).json()['id']
+
+    response = requests.put(MOVIE_ID_ROUTE, json=dict(id=movie_id, genre='thriller', year='2015'))
+    assert response.status_code == 200
+    assert (response.json()['genre'], response.json()['year']) == ('thriller', 2015) # year is stored as integer
+
+    response = requests.put(MOVIE_ID_ROUTE, json=dict(id=movie_id, year=[2015]))
+    assert response.status_code == 400
+
+
 @pytest.mark.parametrize(
     ('body', 'expected_response'),
     [
@@ -90,4 +135,132 @@ def test_delete_movie(body, expected_response):
         body = dict(id=post_response.json()['id'])  # get the movie id that was just created
 
     response = requests.delete(MOVIE_ID_ROUTE, data=body)
-    assert response.status_code == expected_response
\ No newline at end of file
+    assert response.status_code == expected_response
+
+
+def test_get_all_movies_pagination():
+    first_page = requests.get(MOVIE_LIST_ROUTE, params=dict(limit=1)).json()
+    assert len(first_page['movies']) <= 1
+
+    if first_page['next_cursor'] is not None:
+        second_page = requests.get(MOVIE_LIST_ROUTE, params=dict(limit=1, after=first_page['next_cursor'])).json()
+        assert all(row['id'] > first_page['next_cursor'] for row in second_page['movies'])
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict([]), 200),
+        (dict(format='ndjson'), 200),
+        (dict(format='json'), 200),
+        (dict(format='xml'), 400) # format should be supported
+    ]
+)
+def test_export_movies(body, expected_response):
+    response = requests.get(MOVIE_EXPORT_ROUTE, params=body)
+    assert response.status_code == expected_response
+
+    if body.get('format') == 'json':
+        assert isinstance(response.json(), list)
+    elif expected_response == 200:
+        assert all(json.loads(line) for line in response.text.splitlines())
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response', 'created'),
+    [
+        ([dict(name='Oppenheimer', genre='drama', year=2023),
+            dict(name='Dunkirk', genre='war', year='2017')], 200, 2),
+        ([dict(name='Tenet', genre='sci-fi', year=2020),
+            dict(name='Memento', genre='thriller', year='two thousand')], 200, 1), # invalid rows are reported per row
+        ([dict(name='Insomnia', year=2002)], 400, 0), # no valid rows
+        ([dict(name='Past Lives', genre='drama', year=2023),
+            dict(name='Past Lives', genre='drama', year=2023)], 200, 1), # names should be unique within records
+        ([dict(name='Dunkirk', genre='war', year=2017), dict(name='Barbie', genre='comedy', year=2023)], 200, 1), # existing names are reported per row
+        ([dict(id=1, name='Saltburn', genre='thriller', year=2023)], 400, 0), # ids should not be specified
+        (dict(name='Following'), 400, 0) # records should be a list
+    ]
+)
+def test_bulk_add_movies(body, expected_response, created):
+    response = requests.post(MOVIE_BULK_ROUTE, json=body)
+    assert response.status_code == expected_response
+
+    if expected_response == 200:
+        assert len(response.json()['ids']) == created
+        assert len(response.json()['errors']) == len(body) - created
+
+
+def test_update_and_delete_movie_roundtrip():
+    movie_id = requests.post(MOVIE_ID_ROUTE, data=dict(name='Heat', genre='crime', year='1994')).json()['id']
+
+    response = requests.put(MOVIE_ID_ROUTE, data=dict(id=movie_id, year='1995'))
+    assert response.status_code == 200
+    assert response.json() == dict(id=movie_id, name='Heat', genre='crime', year=1995)
+
+    assert requests.delete(MOVIE_ID_ROUTE, data=dict(id=movie_id)).status_code == 200
+    assert requests.delete(MOVIE_ID_ROUTE, data=dict(id=movie_id)).status_code == 400 # already deleted
+    assert requests.put(MOVIE_ID_ROUTE, data=dict(id=movie_id, year='1996')).status_code == 400
+
+
+def test_get_all_movies_etag():
+    response = requests.get(MOVIE_LIST_ROUTE, params=dict(limit=3))
+    etag = response.headers['ETag']
+
+    # unchanged table gives 304 Not Modified
+    response = requests.get(MOVIE_LIST_ROUTE, params=dict(limit=3), headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+    # any write changes the ETag
+    requests.post(MOVIE_ID_ROUTE, data=dict(name='Collateral', genre='thriller', year='2004'))
+    response = requests.get(MOVIE_LIST_ROUTE, params=dict(limit=3), headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_get_all_movies_etag_other_process():
+    if not os.environ.get('DB_URL'):
+        pytest.skip('DB_URL of the server is not set')
+
+    etag = requests.get(MOVIE_LIST_ROUTE, params=dict(limit=3)).headers['ETag']
+
+    # write by another process (like another worker) changes the ETag as well
+    subprocess.run(
+        [sys.executable, '-m', 'flask', '--app', 'run', 'import-data', 'movies', '-'],
+        input=b'name,year,genre\nRonin,1998,crime\n', cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        check=True, capture_output=True,
+    )
+    time.sleep(1)  # servers reuse versions read from the database for VERSIONS_TTL (1 s)
+    response = requests.get(MOVIE_LIST_ROUTE, params=dict(limit=3), headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict(genre='horror', year_from=2010, year_to=2019, sort='-year'), 200),
+        (dict(sort='name'), 200),
+        (dict(year_from='twenty ten'), 400), # year should be integer
+        (dict(sort='budget'), 400) # sort field should be allowed
+    ]
+)
+def test_get_all_movies_filters(body, expected_response):
+    response = requests.get(MOVIE_LIST_ROUTE, params=body)
+    assert response.status_code == expected_response
+
+
+def test_get_all_movies_filtered_pages():
+    years = [2009, 2011, 2013, 2013, 2015, 2019, 2021]
+    for i, year in enumerate(years):
+        requests.post(MOVIE_ID_ROUTE, data=dict(name=f'Keyset horror {i}', genre='keyset-horror', year=year))
+
+    params = dict(genre='keyset-horror', year_from=2010, year_to=2019, sort='-year', limit=2)
+    movies = []
+    while True:
+        page = requests.get(MOVIE_LIST_ROUTE, params=params).json()
+        movies.extend(page['movies'])
+        if page['next_cursor'] is None:
+            break
+        params['after'] = page['next_cursor']
+
+    assert [movie['year'] for movie in movies] == [2019, 2015, 2013, 2013, 2011]
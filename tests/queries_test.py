@@ -0,0 +1,81 @@
+import pytest
+import requests
+
+BASE = 'http://127.0.0.1:8000'
+
+
+@pytest.fixture(scope='module')
+def records():
+    actor_id = requests.post(f'{BASE}/api/actor', data=dict(name='Budget actor', gender='male', date_of_birth='01.01.1980')).json()['id']
+    movie_id = requests.post(f'{BASE}/api/movie', data=dict(name='Budget movie', genre='budget', year='1990')).json()['id']
+    requests.put(f'{BASE}/api/movie-relations', data=dict(id=movie_id, relation_id=actor_id))
+    return dict(actor=actor_id, movie=movie_id)
+
+
+def query_count(method, route, data):
+    response = requests.request(method, BASE + route, data=data)
+    assert response.status_code == 200, response.text
+
+    if 'X-Query-Count' not in response.headers:
+        pytest.skip('server runs without debug mode or QUERY_DEBUG')
+
+    # no statement runs again for every row
+    assert response.headers['X-Query-Repeated'] == '0'
+    return int(response.headers['X-Query-Count'])
+
+
+@pytest.mark.parametrize('method, route, data, budget', [
+    ('GET', '/api/actor', lambda ids: dict(id=ids['actor']), 1),  # read-through cache, at most one select
+    ('GET', '/api/actors', lambda ids: dict(limit=10, sort='name'), 2),  # table version and keyset page
+    ('GET', '/api/actor-filmography', lambda ids: dict(id=ids['actor']), 2),  # actor and page of movies
+    ('GET', '/api/movie-cast', lambda ids: dict(id=ids['movie']), 2),  # movie and page of actors
+    ('GET', '/api/stats', lambda ids: dict(), 2),  # table versions and summary counters
+    ('GET', '/api/movie', lambda ids: dict(id=ids['movie'], expand='cast'), 2),  # movie and cast of movie
+    ('GET', '/api/movies', lambda ids: dict(limit=10, expand='cast'), 3),  # versions, page and cast of all movies in page
+    ('GET', '/api/actors', lambda ids: dict(limit=10, sort='name', expand='filmography'), 3),  # versions, page and filmographies
+    ('POST', '/api/actor', lambda ids: dict(name='Budget actor 2', gender='female', date_of_birth='01.01.1981'), 3),  # counters, insert, refresh
+    ('PUT', '/api/actor', lambda ids: dict(id=ids['actor'], name='Budget actor 3'), 2),  # UPDATE ... RETURNING, table version
+    # movie, actors check, lock and count of cast sizes, INSERT ... RETURNING, counters and version, cast of response
+    ('PUT', '/api/movie-relations', lambda ids: dict(id=ids['movie'], relation_id=ids['actor']), 7),
+    # actor, movies of actor, lock and count of cast sizes, DELETE ... RETURNING, counters and version
+    ('DELETE', '/api/actor-relations', lambda ids: dict(id=ids['actor'], relation_id=ids['movie']), 6),
+    # movie, lock of movie (its whole cast is removed, no count), DELETE ... RETURNING, counters and version
+    ('DELETE', '/api/movie-relations', lambda ids: dict(id=ids['movie']), 4),
+])
+def test_query_budget(records, method, route, data, budget):
+    assert query_count(method, route, data(records)) <= budget
+
+
+def test_delete_query_budget():
+    actor_id = requests.post(f'{BASE}/api/actor', data=dict(name='Budget actor 4', gender='male', date_of_birth='01.01.1982')).json()['id']
+    # relations, association rows, DELETE ... RETURNING, counters
+    assert query_count('DELETE', '/api/actor', dict(id=actor_id)) <= 4
+
+    movie_id = requests.post(f'{BASE}/api/movie', data=dict(name='Budget movie 2', genre='budget', year='1991')).json()['id']
+    # lock of movie, association rows, DELETE ... RETURNING, counters
+    assert query_count('DELETE', '/api/movie', dict(id=movie_id)) <= 4
+
+
+@pytest.mark.parametrize('route, header, row, budget', [
+    # names of batch, upsert, counters and version
+    ('/api/actors/import', 'name,gender,date_of_birth\n', 'Budget import actor {},male,01.01.1980\n', 4),
+    ('/api/movies/import', 'name,genre,year\n', 'Budget import movie {},budget,1990\n', 4),
+])
+def test_import_query_budget(route, header, row, budget):
+    # statements run per batch, not per row
+    one = query_count('POST', route, (header + row.format(0)).encode())
+    many = query_count('POST', route, (header + ''.join(row.format(number) for number in range(1, 51))).encode())
+    assert one <= budget
+    assert many == one
+
+
+def test_not_modified_query_budget():
+    etag = requests.get(f'{BASE}/api/movies', params=dict(limit=10)).headers['ETag']
+    response = requests.get(f'{BASE}/api/movies', params=dict(limit=10), headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+    if 'X-Query-Count' not in response.headers:
+        pytest.skip('server runs without debug mode or QUERY_DEBUG')
+
+    # versions read by the first request are reused
+    assert response.headers['X-Query-Count'] == '0'
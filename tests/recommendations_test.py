@@ -0,0 +1,81 @@
+import pytest
+import requests
+
+SIMILAR_MOVIES_ROUTE = 'http://127.0.0.1:8000/api/similar-movies'
+ACTOR_COLLABORATORS_ROUTE = 'http://127.0.0.1:8000/api/actor-collaborators'
+ACTOR_ID_ROUTE = 'http://127.0.0.1:8000/api/actor'
+MOVIE_ID_ROUTE = 'http://127.0.0.1:8000/api/movie'
+ACTOR_REL_ROUTE = 'http://127.0.0.1:8000/api/actor-relations'
+MOVIE_REL_ROUTE = 'http://127.0.0.1:8000/api/movie-relations'
+
+
+@pytest.mark.parametrize(
+    ('route', 'body', 'expected_response'),
+    [
+        (SIMILAR_MOVIES_ROUTE, dict([]), 400), # id should be specified
+        (SIMILAR_MOVIES_ROUTE, dict(id='one'), 400), # id should be integer
+        (SIMILAR_MOVIES_ROUTE, dict(id=7**10), 400), # such movie id record should exist
+        (SIMILAR_MOVIES_ROUTE, dict(id=1, limit=-3), 400), # limit should be positive
+        (SIMILAR_MOVIES_ROUTE, dict(id=1, limit=0), 400), # limit should be positive
+        (ACTOR_COLLABORATORS_ROUTE, dict([]), 400), # id should be specified
+        (ACTOR_COLLABORATORS_ROUTE, dict(id='one'), 400), # id should be integer
+        (ACTOR_COLLABORATORS_ROUTE, dict(id=7**10), 400) # such actor id record should exist
+    ]
+)
+def test_get_recommendations(route, body, expected_response):
+    response = requests.get(route, params=body)
+    assert response.status_code == expected_response
+
+
+def test_recommendations_follow_relations():
+    a, b, c = [
+        requests.post(ACTOR_ID_ROUTE, data=dict(name=f'Recommend actor {name}', gender='male', date_of_birth='01.01.1970')).json()['id']
+        for name in 'abc'
+    ]
+    first, second, third = [
+        requests.post(MOVIE_ID_ROUTE, data=dict(name=f'Recommend movie {name}', genre='drama', year='1999')).json()['id']
+        for name in ('first', 'second', 'third')
+    ]
+
+    requests.put(MOVIE_REL_ROUTE, data=dict(id=first, relation_id=f'{a},{b},{c}'))
+    requests.put(MOVIE_REL_ROUTE, data=dict(id=second, relation_id=f'{a},{b}'))
+    requests.put(ACTOR_REL_ROUTE, data=dict(id=a, relation_id=third))
+
+    found = requests.get(ACTOR_COLLABORATORS_ROUTE, params=dict(id=a)).json()
+    assert [(actor['id'], actor['shared_movies']) for actor in found['actors']] == [(b, 2), (c, 1)]
+    assert found['actors'][0]['name'] == 'Recommend actor b'
+
+    found = requests.get(SIMILAR_MOVIES_ROUTE, params=dict(id=first, limit=1)).json()
+    assert [(movie['id'], movie['shared_cast']) for movie in found['movies']] == [(second, 2)]
+
+    # cleared relations change counts
+    requests.delete(ACTOR_REL_ROUTE, data=dict(id=b))
+    found = requests.get(ACTOR_COLLABORATORS_ROUTE, params=dict(id=a)).json()
+    assert [(actor['id'], actor['shared_movies']) for actor in found['actors']] == [(c, 1)]
+
+    found = requests.get(SIMILAR_MOVIES_ROUTE, params=dict(id=first)).json()
+    assert [(movie['id'], movie['shared_cast']) for movie in found['movies']] == [(second, 1), (third, 1)]
+
+
+def test_recommendations_after_cleared_new_actor():
+    a, b = [
+        requests.post(ACTOR_ID_ROUTE, data=dict(name=f'Cleared actor {name}', gender='female', date_of_birth='01.01.1980')).json()['id']
+        for name in 'ab'
+    ]
+    first, second = [
+        requests.post(MOVIE_ID_ROUTE, data=dict(name=f'Cleared movie {name}', genre='drama', year='2001')).json()['id']
+        for name in ('first', 'second')
+    ]
+    requests.put(MOVIE_REL_ROUTE, data=dict(id=first, relation_id=f'{a},{b}'))
+    requests.put(MOVIE_REL_ROUTE, data=dict(id=second, relation_id=a))
+    assert requests.get(SIMILAR_MOVIES_ROUTE, params=dict(id=first)).status_code == 200
+
+    # new actor is linked and cleared before the next lookup, its row is past the matrices
+    new = requests.post(ACTOR_ID_ROUTE, data=dict(name='Cleared actor new', gender='male', date_of_birth='01.01.1990')).json()['id']
+    requests.put(ACTOR_REL_ROUTE, data=dict(id=new, relation_id=first))
+    requests.delete(ACTOR_REL_ROUTE, data=dict(id=new))
+    requests.put(MOVIE_REL_ROUTE, data=dict(id=second, relation_id=b))
+
+    response = requests.get(SIMILAR_MOVIES_ROUTE, params=dict(id=first))
+    assert response.status_code == 200
+    assert [(movie['id'], movie['shared_cast']) for movie in response.json()['movies']] == [(second, 2)]
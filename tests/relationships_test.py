@@ -1,11 +1,16 @@
+import hashlib
 import pytest
 import requests
 
 ACTOR_ID_ROUTE = 'http://127.0.0.1:8000/api/actor'
 ACTOR_REL_ROUTE = 'http://127.0.0.1:8000/api/actor-relations'
+ACTOR_FILMOGRAPHY_ROUTE = 'http://127.0.0.1:8000/api/actor-filmography'
 
 MOVIE_ID_ROUTE = 'http://127.0.0.1:8000/api/movie'
 MOVIE_REL_ROUTE = 'http://127.0.0.1:8000/api/movie-relations'
+MOVIE_CAST_ROUTE = 'http://127.0.0.1:8000/api/movie-cast'
+MOVIE_LIST_ROUTE = 'http://127.0.0.1:8000/api/movies'
+ACTOR_LIST_ROUTE = 'http://127.0.0.1:8000/api/actors'
 
 
 @pytest.mark.parametrize(
@@ -121,4 +126,158 @@ def test_delete_movie_relation(body_add_movie, movie_id_corrected, body_add_acto
     body_clear_rels = dict(id=movie_id)
     resp_clear_rels = requests.delete(MOVIE_REL_ROUTE, data={**body_clear_rels, **movie_id_corrected})
 
-    assert resp_clear_rels.status_code == expected_response
\ No newline at end of file
+    assert resp_clear_rels.status_code == expected_response
+
+@pytest.mark.parametrize(
+    ('relation_ids_corrected', 'expected_response', 'expected_added'),
+    [
+        (None, 200, 3),
+        ('[{}, {}, {}]', 200, 3), # list literal is accepted
+        ('{}, {}, {}, {}', 200, 3), # duplicates are skipped
+        ('{}, one', 400, 0), # ids should be integers
+        ('{}, ' + str(7**10), 400, 0) # all related records should exist
+    ]
+)
+def test_movie_add_relations_bulk(relation_ids_corrected, expected_response, expected_added, request):
+    suffix = request.node.callspec.id
+    movie_id = requests.post(MOVIE_ID_ROUTE, data=dict(name=f'Ensemble {suffix}', genre='drama', year='2020')).json()['id']
+    actor_ids = [
+        requests.post(ACTOR_ID_ROUTE, data=dict(name=f'Ensemble actor {i} {suffix}', gender='male', date_of_birth='01.01.1980')).json()['id']
+        for i in range(3)
+    ]
+
+    relation_id = ','.join(map(str, actor_ids))
+    if relation_ids_corrected is not None:
+        relation_id = relation_ids_corrected.format(*actor_ids, *actor_ids)
+
+    resp_add_rel = requests.put(MOVIE_REL_ROUTE, data=dict(id=movie_id, relation_id=relation_id))
+    assert resp_add_rel.status_code == expected_response
+
+    if expected_response == 200:
+        assert resp_add_rel.json()['added'] == expected_added
+
+        # adding the same actors again is a no-op
+        resp_again = requests.put(MOVIE_REL_ROUTE, data=dict(id=movie_id, relation_id=','.join(map(str, actor_ids))))
+        assert resp_again.json()['added'] == 0
+
+
+def test_actor_clear_relations_count():
+    actor_id = requests.post(ACTOR_ID_ROUTE, data=dict(name='Willem Dafoe', gender='male', date_of_birth='22.07.1955')).json()['id']
+    movie_ids = [
+        requests.post(MOVIE_ID_ROUTE, data=dict(name=name, genre='drama', year='2019')).json()['id']
+        for name in ('The Lighthouse', 'At Eternity\'s Gate')
+    ]
+    requests.put(ACTOR_REL_ROUTE, data=dict(id=actor_id, relation_id=','.join(map(str, movie_ids))))
+
+    resp_clear_rels = requests.delete(ACTOR_REL_ROUTE, data=dict(id=actor_id))
+    assert resp_clear_rels.status_code == 200
+    assert resp_clear_rels.json()['removed'] == 2
+
+    # clearing again removes nothing
+    assert requests.delete(ACTOR_REL_ROUTE, data=dict(id=actor_id)).json()['removed'] == 0
+
+
+@pytest.mark.parametrize(
+    ('body_corrected', 'expected_response'),
+    [
+        ({}, 200),
+        ({'id': None}, 400), # id should be specified
+        ({'id': 'one'}, 400), # id should be integer
+        ({'id': 7**10}, 400), # such movie id record should exist
+        ({'after': 'one'}, 400) # cursor should be integer
+    ]
+)
+def test_get_movie_cast(body_corrected, expected_response, request):
+    suffix = request.node.callspec.id
+    movie_id = requests.post(MOVIE_ID_ROUTE, data=dict(name=f'Big cast {suffix}', genre='drama', year='2001')).json()['id']
+    actor_ids = [
+        requests.post(ACTOR_ID_ROUTE, data=dict(name=f'Cast member {i} {suffix}', gender='female', date_of_birth='01.01.1990')).json()['id']
+        for i in range(5)
+    ]
+    requests.put(MOVIE_REL_ROUTE, data=dict(id=movie_id, relation_id=','.join(map(str, actor_ids))))
+
+    params = {**dict(id=movie_id, limit=2), **body_corrected}
+    response = requests.get(MOVIE_CAST_ROUTE, params=params)
+    assert response.status_code == expected_response
+
+    if expected_response == 200:
+        cast = []
+        while True:
+            page = response.json()
+            cast.extend(actor['id'] for actor in page['cast'])
+            if page['next_cursor'] is None:
+                break
+            response = requests.get(MOVIE_CAST_ROUTE, params=dict(params, after=page['next_cursor']))
+
+        assert cast == actor_ids
+
+
+def test_get_actor_filmography():
+    actor_id = requests.post(ACTOR_ID_ROUTE, data=dict(name='Samuel L. Jackson', gender='male', date_of_birth='21.12.1948')).json()['id']
+    movie_id = requests.post(MOVIE_ID_ROUTE, data=dict(name='Pulp Fiction', genre='crime', year='1994')).json()['id']
+    requests.put(ACTOR_REL_ROUTE, data=dict(id=actor_id, relation_id=movie_id))
+
+    response = requests.get(ACTOR_FILMOGRAPHY_ROUTE, params=dict(id=actor_id))
+    assert response.status_code == 200
+    assert [movie['name'] for movie in response.json()['filmography']] == ['Pulp Fiction']
+
+
+@pytest.mark.parametrize(
+    ('route', 'relation', 'body_corrected', 'expected_response'),
+    [
+        (MOVIE_ID_ROUTE, 'cast', {}, 200),
+        (MOVIE_LIST_ROUTE, 'cast', {}, 200),
+        (ACTOR_ID_ROUTE, 'filmography', {}, 200),
+        (ACTOR_LIST_ROUTE, 'filmography', {}, 200),
+        (MOVIE_ID_ROUTE, 'cast', {'expand': 'filmography'}, 400), # movies expand only cast
+        (ACTOR_LIST_ROUTE, 'filmography', {'expand': 'cast'}, 400) # actors expand only filmography
+    ]
+)
+def test_expand_relations(route, relation, body_corrected, expected_response, request):
+    # short unique suffix, names must fit the name column
+    suffix = hashlib.sha1(request.node.callspec.id.encode()).hexdigest()[:8]
+    movie_ids = [requests.post(MOVIE_ID_ROUTE, data=dict(name=f'Expanded {i} {suffix}', genre='expand', year='2005')).json()['id'] for i in range(2)]
+    actor_ids = [
+        requests.post(ACTOR_ID_ROUTE, data=dict(name=f'Expanded actor {i} {suffix}', gender='male', date_of_birth='01.01.1975')).json()['id']
+        for i in range(2)
+    ]
+    # first movie with both actors, second movie without cast
+    requests.put(MOVIE_REL_ROUTE, data=dict(id=movie_ids[0], relation_id=','.join(map(str, actor_ids))))
+
+    if relation == 'cast':
+        ids, rel_ids, expected = movie_ids, actor_ids, {movie_ids[0]: actor_ids, movie_ids[1]: []}
+    else:
+        ids, rel_ids, expected = actor_ids, movie_ids, {actor_ids[0]: movie_ids[:1], actor_ids[1]: movie_ids[:1]}
+
+    if route in (MOVIE_ID_ROUTE, ACTOR_ID_ROUTE):
+        params = [dict(id=row_id, expand=relation) for row_id in ids]
+    else:
+        params = [dict(after=ids[0] - 1, limit=2, expand=relation)]
+
+    records = []
+    for param in params:
+        response = requests.get(route, params={**param, **body_corrected})
+        assert response.status_code == expected_response
+        if expected_response != 200:
+            return
+        body = response.json()
+        records.extend(body.get('movies', body.get('actors', [body])))
+
+    assert {record['id']: [related['id'] for related in record[relation]] for record in records} == expected
+    assert all(set(related) >= {'id', 'name'} for record in records for related in record[relation])
+
+
+def test_expand_follows_writes():
+    movie_id = requests.post(MOVIE_ID_ROUTE, data=dict(name='Expanded follows writes', genre='expand', year='2006')).json()['id']
+    actor_id = requests.post(ACTOR_ID_ROUTE, data=dict(name='Expanded cast member', gender='female', date_of_birth='01.01.1985')).json()['id']
+    params = dict(after=movie_id - 1, limit=1, expand='cast')
+    assert requests.get(MOVIE_LIST_ROUTE, params=params).json()['movies'][0]['cast'] == [] # cached page
+
+    # relations response has structured cast, cached expanded page changes with relations and actor names
+    response = requests.put(MOVIE_REL_ROUTE, data=dict(id=movie_id, relation_id=actor_id))
+    assert [actor['name'] for actor in response.json()['cast']] == ['Expanded cast member']
+    requests.put(ACTOR_ID_ROUTE, data=dict(id=actor_id, name='Renamed cast member'))
+    assert [actor['name'] for actor in requests.get(MOVIE_LIST_ROUTE, params=params).json()['movies'][0]['cast']] == ['Renamed cast member']
+
+    response = requests.delete(MOVIE_REL_ROUTE, data=dict(id=movie_id))
+    assert response.json()['cast'] == []
@@ -0,0 +1,55 @@
+import pytest
+import requests
+
+ACTOR_ID_ROUTE = 'http://127.0.0.1:8000/api/actor'
+POOL_STATS_ROUTE = 'http://127.0.0.1:8000/internal/pool'
+
+
+def checkouts(replica):
+    stats = requests.get(POOL_STATS_ROUTE).json()
+    return sum(pool.get('checkouts', 0) for name, pool in stats.items() if ('replica' in name) == replica)
+
+
+@pytest.fixture
+def replicas():
+    stats = requests.get(POOL_STATS_ROUTE).json()
+    if not any('replica' in name for name in stats):
+        pytest.skip('server runs without DB_REPLICA_URLS')
+
+
+def test_get_reads_replica(replicas):
+    replica, primary = checkouts(True), checkouts(False)
+
+    # missing records aren't cached, so every request reads the db
+    response = requests.get(ACTOR_ID_ROUTE, params=dict(id=10 ** 9))
+    assert response.status_code == 400
+    assert 'primary_until' not in response.cookies
+
+    assert checkouts(True) > replica
+    assert checkouts(False) == primary
+
+
+def test_write_sticks_to_primary(replicas):
+    client = requests.Session()
+    response = client.post(ACTOR_ID_ROUTE, data=dict(name='Replica actor', gender='female', date_of_birth='01.01.1970'))
+    assert response.status_code == 200
+    assert 'primary_until' in client.cookies
+
+    replica, primary = checkouts(True), checkouts(False)
+
+    # client reads its own write from primary, other clients read from replica
+    response = client.get(ACTOR_ID_ROUTE, params=dict(id=response.json()['id']))
+    assert response.status_code == 200
+    assert response.json()['name'] == 'Replica actor'
+    assert checkouts(True) == replica
+    assert checkouts(False) > primary
+
+    requests.get(ACTOR_ID_ROUTE, params=dict(id=10 ** 9))
+    assert checkouts(True) > replica
+
+
+def test_failed_write_does_not_stick(replicas):
+    client = requests.Session()
+    response = client.post(ACTOR_ID_ROUTE, data=dict(name='Replica actor'))
+    assert response.status_code == 400
+    assert 'primary_until' not in client.cookies
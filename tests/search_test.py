@@ -0,0 +1,56 @@
+import pytest
+import requests
+
+SEARCH_ROUTE = 'http://127.0.0.1:8000/api/search'
+ACTOR_ID_ROUTE = 'http://127.0.0.1:8000/api/actor'
+MOVIE_ID_ROUTE = 'http://127.0.0.1:8000/api/movie'
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict(q='a'), 200),
+        (dict(q='a', type='movies', limit=5), 200),
+        (dict([]), 400), # query should be specified
+        (dict(q='a', limit='five'), 400), # limit should be integer
+        (dict(q='a', limit=0), 400), # limit should be positive
+        (dict(q='a', limit=-3), 400), # limit should be positive
+        (dict(q='a', type='directors'), 400) # type should exist
+    ]
+)
+def test_search(body, expected_response):
+    response = requests.get(SEARCH_ROUTE, params=body)
+    assert response.status_code == expected_response
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected_response'),
+    [
+        (dict(q='a', type='movies'), 200),
+        (dict(q=5), 400), # query should be string
+        (dict(q=['a']), 400), # query should be string
+        (dict(q='a', type=['movies']), 400), # type should be string
+        (dict(q='a', type=None), 400), # type should be string
+    ]
+)
+def test_search_json_body(body, expected_response):
+    response = requests.get(SEARCH_ROUTE, json=body)
+    assert response.status_code == expected_response
+
+
+def test_search_follows_writes():
+    actor_id = requests.post(ACTOR_ID_ROUTE, data=dict(name='Quvenzhane Wallis', gender='female', date_of_birth='28.08.2003')).json()['id']
+    movie_id = requests.post(MOVIE_ID_ROUTE, data=dict(name='Quiz Show', genre='drama', year='1994')).json()['id']
+
+    found = requests.get(SEARCH_ROUTE, params=dict(q='qu')).json()
+    assert dict(id=actor_id, name='Quvenzhane Wallis') in found['actors']
+    assert dict(id=movie_id, name='Quiz Show') in found['movies']
+
+    # renamed and deleted records leave the index
+    requests.put(MOVIE_ID_ROUTE, data=dict(id=movie_id, name='Zodiac'))
+    requests.delete(ACTOR_ID_ROUTE, data=dict(id=actor_id))
+
+    found = requests.get(SEARCH_ROUTE, params=dict(q='qu')).json()
+    assert all(actor['id'] != actor_id for actor in found['actors'])
+    assert all(movie['id'] != movie_id for movie in found['movies'])
+    assert dict(id=movie_id, name='Zodiac') in requests.get(SEARCH_ROUTE, params=dict(q='zod')).json()['movies']
@@ -0,0 +1,66 @@
+from collections import Counter
+
+import requests
+
+STATS_ROUTE = 'http://127.0.0.1:8000/api/stats'
+ACTOR_ID_ROUTE = 'http://127.0.0.1:8000/api/actor'
+MOVIE_ID_ROUTE = 'http://127.0.0.1:8000/api/movie'
+ACTOR_EXPORT_ROUTE = 'http://127.0.0.1:8000/api/actors/export'
+MOVIE_EXPORT_ROUTE = 'http://127.0.0.1:8000/api/movies/export'
+MOVIE_REL_ROUTE = 'http://127.0.0.1:8000/api/movie-relations'
+
+
+def counts(records, field):
+    return dict(Counter('' if record[field] is None else str(record[field]) for record in records))
+
+
+def test_stats_match_tables():
+    stats = requests.get(STATS_ROUTE).json()
+    actors = requests.get(ACTOR_EXPORT_ROUTE, params=dict(format='json')).json()
+    movies = requests.get(MOVIE_EXPORT_ROUTE, params=dict(format='json')).json()
+
+    assert stats['actors']['total'] == len(actors)
+    assert stats['actors']['gender'] == counts(actors, 'gender')
+    assert stats['movies']['total'] == len(movies)
+    assert stats['movies']['genre'] == counts(movies, 'genre')
+    assert stats['movies']['year'] == counts(movies, 'year')
+    assert sum(stats['movies']['cast_size'].values()) == len(movies)
+
+
+def test_stats_follow_writes():
+    movie_id = requests.post(MOVIE_ID_ROUTE, data=dict(name='Stats movie', genre='stats-genre', year='1901')).json()['id']
+    actor_ids = [
+        requests.post(ACTOR_ID_ROUTE, data=dict(name=f'Stats actor {i}', gender='stats-sex', date_of_birth='01.01.1950')).json()['id']
+        for i in range(2)
+    ]
+
+    stats = requests.get(STATS_ROUTE).json()
+    assert stats['movies']['genre']['stats-genre'] == 1
+    assert stats['movies']['year']['1901'] == 1
+    assert stats['actors']['gender']['stats-sex'] == 2
+    before = stats['movies']['cast_size']
+
+    # movie moves from cast size 0 to 2
+    requests.put(MOVIE_REL_ROUTE, data=dict(id=movie_id, relation_id=f'{actor_ids[0]},{actor_ids[1]}'))
+    after = requests.get(STATS_ROUTE).json()['movies']['cast_size']
+    assert after.get('0', 0) == before['0'] - 1
+    assert after.get('2', 0) == before.get('2', 0) + 1
+
+    # deleted actor leaves the cast
+    requests.delete(ACTOR_ID_ROUTE, data=dict(id=actor_ids[0]))
+    stats = requests.get(STATS_ROUTE).json()
+    assert stats['actors']['gender']['stats-sex'] == 1
+    assert stats['movies']['cast_size'].get('1', 0) == before.get('1', 0) + 1
+
+    # updated and deleted movies move between counters
+    requests.put(MOVIE_ID_ROUTE, data=dict(id=movie_id, genre='stats-genre-updated'))
+    stats = requests.get(STATS_ROUTE).json()
+    assert 'stats-genre' not in stats['movies']['genre']
+    assert stats['movies']['genre']['stats-genre-updated'] == 1
+
+    requests.delete(MOVIE_ID_ROUTE, data=dict(id=movie_id))
+    stats = requests.get(STATS_ROUTE).json()
+    assert 'stats-genre-updated' not in stats['movies']['genre']
+    assert '1901' not in stats['movies']['year']
+    expected = dict(before, **{'0': before['0'] - 1}) # movie was counted with cast size 0 before relations
+    assert stats['movies']['cast_size'] == {key: count for key, count in expected.items() if count}